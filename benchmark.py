@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the HTML to Framer CMS CSV converter (reference_script.py).
+
+Generates synthetic Google Docs style exports from 1 KB to 50 MB and times
+every conversion stage separately: file read, parse, body split, HTML
+rendering, text tokenising, each rule-based fallback, the category
+classifier and CSV writing. Every size runs in a fresh process so its peak
+memory can be reported. Results are written as JSON; pass an earlier
+result file to --compare to see per-stage regressions between versions.
+
+Usage:
+    python3 benchmark.py [--sizes 1KB,10KB,...] [--parser html.parser] [--output results.json]
+
+Example:
+    python3 benchmark.py --sizes 1KB,100KB,10MB --output after.json --compare before.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from framer_csv import batch, fallbacks, metrics, parsing, rows
+
+
+DEFAULT_SIZES = '1KB,10KB,100KB,1MB,10MB,50MB'
+DEFAULT_MIN_TIME = 1.0
+DEFAULT_MAX_REPEAT = 20
+
+IMAGE_URL = 'https://example.com/benchmark.jpg'
+
+_UNITS = {'B': 1, 'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3}
+
+_WORDS = (
+    'de het een en van in op voor met aan bij naar uit over door dat deze die niet ook maar nog '
+    'startup founder oprichter bedrijf ondernemer team product klanten markt groei schaal '
+    'investering kapitaal financiering venture funding ronde miljoen miljard investeerders '
+    'europa amerika wereld internationaal succes model data training inferentie modellen '
+    'beleid regels wet klimaat overheid subsidie ecosysteem talent universiteit onderzoek '
+    'amsterdam delft eindhoven utrecht rotterdam nederlandse technologie platform software'
+).split()
+
+# Generated Google Docs class names: c3 plain, c9 bold, c26 italic, c9+c26 both
+_STYLE_RULES = (
+    '@import url(https://themes.googleusercontent.com/fonts/css?kit=abc);',
+    'ul.lst-kix_a1-0{list-style-type:none}.lst-kix_a1-0>li:before{content:"\\0025cf  "}',
+    'ol{margin:0;padding:0}table td,table th{padding:0}',
+    '.c2{padding-top:0pt;padding-bottom:0pt;line-height:1.15;orphans:2;widows:2;text-align:left}',
+    '.c3{color:#000000;font-weight:400;text-decoration:none;vertical-align:baseline;font-size:11pt;'
+    'font-family:"Arial";font-style:normal}',
+    '.c9{color:#000000;font-weight:700;text-decoration:none;vertical-align:baseline;font-size:11pt;'
+    'font-family:"Arial";font-style:normal}',
+    '.c26{color:#000000;font-weight:400;text-decoration:none;vertical-align:baseline;font-size:11pt;'
+    'font-family:"Arial";font-style:italic}',
+    '.c11{color:#1155cc;text-decoration:underline}',
+    '.c14{border-right-style:solid;padding:5pt 5pt 5pt 5pt;border-bottom-color:#000000;border-top-width:1pt}',
+    '.c20{background-color:#ffffff;max-width:451.4pt;padding:72pt 72pt 72pt 72pt}',
+    '.title{padding-top:0pt;color:#000000;font-size:26pt;padding-bottom:3pt}',
+    'h1{padding-top:20pt;color:#000000;font-size:20pt;padding-bottom:6pt}',
+    'h2{padding-top:18pt;color:#000000;font-size:16pt;padding-bottom:6pt}',
+    'h4{padding-top:14pt;color:#666666;font-size:12pt;padding-bottom:4pt}',
+)
+
+
+def parse_size(text):
+    """'10KB' -> 10240 bytes (units B, KB, MB, GB; a bare number is bytes)."""
+    text = text.strip().upper()
+    for unit in ('GB', 'MB', 'KB', 'B'):
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * _UNITS[unit])
+    return int(text)
+
+
+def format_size(size):
+    """10240 -> '10KB'."""
+    for unit in ('GB', 'MB', 'KB'):
+        if size >= _UNITS[unit] and size % _UNITS[unit] == 0:
+            return f"{size // _UNITS[unit]}{unit}"
+    return f"{size}B"
+
+
+def _sentence(rng, words=None):
+    words = [rng.choice(_WORDS) for _ in range(words or rng.randint(8, 22))]
+    return ' '.join(words).capitalize() + '.'
+
+
+def _google_redirect(url, rng):
+    return (f"https://www.google.com/url?q={url}&amp;sa=D&amp;source=editors&amp;"
+            f"ust={rng.randrange(10 ** 15, 10 ** 16)}&amp;usg=AOvVaw{rng.randrange(10 ** 8):08d}")
+
+
+def _paragraph(rng):
+    spans = []
+    for _ in range(rng.randint(1, 5)):
+        style = rng.choices(('c3', 'c9', 'c26', 'c9 c26'), weights=(10, 2, 2, 1))[0]
+        spans.append(f'<span class="{style}">{_sentence(rng)} </span>')
+        if rng.random() < 0.1:
+            spans.append('<br>')
+        if rng.random() < 0.1:
+            url = _google_redirect(f"https://example.com/{rng.choice(_WORDS)}", rng)
+            spans.append(f'<span class="c11 c3"><a class="c11" href="{url}">{rng.choice(_WORDS)}</a></span>')
+    return f'<p class="c2">{"".join(spans)}</p>'
+
+
+def _table(rng):
+    table_rows = []
+    for _ in range(rng.randint(2, 6)):
+        cells = ''.join(
+            f'<td class="c14" colspan="1" rowspan="1"><p class="c2"><span class="c3">{_sentence(rng, 3)}</span></p></td>'
+            for _ in range(rng.randint(2, 4))
+        )
+        table_rows.append(f'<tr class="c8">{cells}</tr>')
+    return f'<table class="c17"><tbody>{"".join(table_rows)}</tbody></table>'
+
+
+def _bullet_list(rng):
+    items = ''.join(
+        f'<li class="c2 li-bullet-0"><span class="c3">{_sentence(rng)}</span></li>'
+        for _ in range(rng.randint(2, 6))
+    )
+    return f'<ul class="c7 lst-kix_a1-0 start">{items}</ul>'
+
+
+def _block(rng):
+    kind = rng.choices(('p', 'empty', 'h2', 'h3', 'table', 'list'), weights=(30, 4, 2, 2, 1, 2))[0]
+    if kind == 'p':
+        return _paragraph(rng)
+    if kind == 'empty':
+        return '<p class="c2 c16"><span class="c3"></span></p>'
+    if kind in ('h2', 'h3'):
+        return f'<{kind} class="c5"><span class="c9">{_sentence(rng, 4)}</span></{kind}>'
+    if kind == 'table':
+        return _table(rng)
+    return _bullet_list(rng)
+
+
+# Markup of an empty filler paragraph plus its closing full stop
+_FILLER_MIN = len('<p class="c2"><span class="c3">.</span></p>')
+
+
+def _filler_paragraph(rng, length):
+    """A plain paragraph of exactly length characters (at least _FILLER_MIN)."""
+    text = ''
+    while len(text) < length - _FILLER_MIN:
+        text += _sentence(rng) + ' '
+    return f'<p class="c2"><span class="c3">{text[:length - _FILLER_MIN]}.</span></p>'
+
+
+def generate_google_docs_html(size, seed=0):
+    """
+    Synthetic Google Docs HTML export of exactly size bytes.
+
+    Mirrors the structure of real exports: a generated stylesheet with c3/c9/c26
+    span classes, an H1 title and H4 intro, paragraphs of styled spans with
+    <br> breaks and Google redirect links, headings, lists and tables, and an
+    <hr> followed by a sources section. Below 8 KB the stylesheet, intro and
+    sources are cut down so they leave room for body text; the last body block
+    is a paragraph sized to hit size exactly. The same size and seed always
+    give the same document.
+
+    Raises:
+        ValueError: If size is too small to hold the document skeleton
+    """
+    rng = random.Random(f"{seed}:{size}")
+    small = size < 8 * 1024
+    stylesheet = list(_STYLE_RULES)
+    if small:
+        # Real exports of short documents still carry a stylesheet, just fewer rules
+        budget, stylesheet = size // 8, []
+        for rule in _STYLE_RULES:
+            if len(rule) > budget:
+                break
+            stylesheet.append(rule)
+            budget -= len(rule)
+    intro = _sentence(rng, 8) if small else f"{_sentence(rng, 25)} {_sentence(rng, 20)}"
+    head = [
+        '<html><head><meta content="text/html; charset=UTF-8" http-equiv="content-type">',
+        f'<style type="text/css">{"".join(stylesheet)}</style></head>',
+        '<body class="c20 doc-content">',
+        f'<h1 class="c4" id="h.title"><span class="c9">{_sentence(rng, 4 if small else 7)}</span></h1>',
+        f'<h4 class="c2"><span class="c3">{intro}</span></h4>',
+    ]
+    sources = ['<hr>', '<h2 class="c5"><span class="c9">Referenties</span></h2>']
+    links = rng.randint(3, 8)
+    for number in range(1, min(links, max(2, size // 2048 + 1))):
+        url = _google_redirect(f"https://source{number}.example.com/artikel", rng)
+        sources.append(f'<p class="c2"><span class="c3">Bron {number}: </span>'
+                       f'<span class="c11 c3"><a class="c11" href="{url}">{_sentence(rng, 5)}</a></span></p>')
+    tail = '</body></html>'
+
+    # Every generated character is ASCII, so characters are bytes
+    remaining = size - sum(map(len, head)) - sum(map(len, sources)) - len(tail)
+    if remaining < _FILLER_MIN:
+        raise ValueError(f"{format_size(size)} is too small for a Google Docs export")
+    blocks = []
+    while remaining:
+        block = _block(rng)
+        # Keep room for a filler paragraph unless the block fits exactly
+        if len(block) != remaining and len(block) > remaining - _FILLER_MIN:
+            block = _filler_paragraph(rng, remaining)
+        blocks.append(block)
+        remaining -= len(block)
+
+    return ''.join(head + blocks + sources) + tail
+
+
+def _timed(timings, stage, function, *args, **kwargs):
+    started = time.perf_counter()
+    result = function(*args, **kwargs)
+    timings[stage] = time.perf_counter() - started
+    return result
+
+
+def run_pipeline(html_file, csv_file, parser='html.parser'):
+    """
+    Convert html_file once without AI, timing each stage.
+
+    Returns:
+        Dict mapping stage name to seconds, in pipeline order
+    """
+    timings = {}
+    html_content = _timed(timings, 'read', Path(html_file).read_text, encoding='utf-8')
+
+    if parser == 'stream':
+        article = _timed(timings, 'extract', parsing.extract_article_streaming, html_content)
+    else:
+        parsing._load_bs4()
+        soup = _timed(timings, 'parse', parsing.BeautifulSoup, html_content, parser)
+        parts = _timed(timings, 'split', parsing._split_article_tree, soup)
+        content_html, sources_html = _timed(timings, 'render', parsing._render_article_sections, parts)
+        title_tag, first_p_tag = parts['title_tag'], parts['first_p_tag']
+        article = _timed(
+            timings, 'tokenize', parsing._article_fields,
+            title_tag.get_text().strip() if title_tag else '',
+            first_p_tag.get_text().strip() if first_p_tag else '',
+            content_html, sources_html, parts['text'],
+        )
+
+    title, first_paragraph, content_text = article['title'], article['first_paragraph'], article['content_text']
+    fallback_values = {
+        'meta_title': _timed(timings, 'fallback_meta_title', fallbacks.generate_meta_title_fallback,
+                             title, max_length=60),
+        'meta_description': _timed(timings, 'fallback_meta_description',
+                                   fallbacks.generate_meta_description_fallback, first_paragraph, max_length=155),
+        'keywords': _timed(timings, 'fallback_keywords', fallbacks.generate_keywords_fallback,
+                           title, content_text, count=5, tokens=article.get('keyword_tokens')),
+        'preview': _timed(timings, 'fallback_preview', fallbacks.generate_preview_fallback,
+                          first_paragraph, max_sentences=2),
+        'image_alt': _timed(timings, 'fallback_image_alt', fallbacks.generate_image_alt_fallback,
+                            title, max_length=125),
+        'category': _timed(timings, 'category', fallbacks.determine_category_fallback, title, content_text),
+    }
+
+    row = _timed(timings, 'assemble', rows._assemble_framer_row, article, IMAGE_URL,
+                 {'date': '01-01-2026'}, fallback_values=fallback_values)
+    _timed(timings, 'csv', rows.write_framer_csv, [row], csv_file)
+    return timings
+
+
+def benchmark_file(html_file, parser='html.parser', min_time=DEFAULT_MIN_TIME, max_repeat=DEFAULT_MAX_REPEAT):
+    """
+    Repeat run_pipeline() on one file until min_time has passed (at most max_repeat runs).
+
+    Returns:
+        JSON-serialisable result with the median and minimum of every stage,
+        throughput based on the median total, and this process's peak memory
+    """
+    size = os.path.getsize(html_file)
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_file = os.path.join(tmp, 'benchmark.csv')
+        started = time.perf_counter()
+        while not runs or (len(runs) < max_repeat and time.perf_counter() - started < min_time):
+            runs.append(run_pipeline(html_file, csv_file, parser=parser))
+
+    totals = [sum(run.values()) for run in runs]
+    total = statistics.median(totals)
+    peak = metrics.peak_memory_mb()
+    return {
+        'size': format_size(size),
+        'bytes': size,
+        'parser': parser,
+        'repeats': len(runs),
+        'total_ms': round(total * 1000, 3),
+        'articles_per_second': round(1 / total, 3) if total else None,
+        'mb_per_second': round(size / (1024 * 1024) / total, 3) if total else None,
+        'peak_memory_mb': round(peak, 1) if peak is not None else None,
+        'stages': {
+            stage: {
+                'median_ms': round(statistics.median(run[stage] for run in runs) * 1000, 3),
+                'min_ms': round(min(run[stage] for run in runs) * 1000, 3),
+            }
+            for stage in runs[0]
+        },
+    }
+
+
+def benchmark_size(size, parser='html.parser', min_time=DEFAULT_MIN_TIME, max_repeat=DEFAULT_MAX_REPEAT, seed=0):
+    """Generate a document of size bytes and benchmark it in a fresh process (for a clean peak memory)."""
+    with tempfile.TemporaryDirectory() as tmp:
+        html_file = os.path.join(tmp, f"article_{format_size(size)}.html")
+        Path(html_file).write_text(generate_google_docs_html(size, seed=seed), encoding='utf-8')
+
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--run-file', html_file, '--parser', parser,
+             '--min-time', str(min_time), '--max-repeat', str(max_repeat)],
+            stdout=subprocess.PIPE, check=True, text=True,
+        )
+    # Label results by the requested size; 'bytes' keeps the generated size
+    return {**json.loads(result.stdout), 'size': format_size(size)}
+
+
+def compare_results(results, baseline):
+    """
+    Per-stage median ratios (current / baseline) for the sizes both runs measured.
+
+    Returns:
+        List of (size, stage, baseline_ms, current_ms, ratio)
+    """
+    previous = {result['size']: result for result in baseline['results']}
+    comparison = []
+    for result in results['results']:
+        before = previous.get(result['size'])
+        if not before:
+            continue
+        stages = [('total', before['total_ms'], result['total_ms'])]
+        stages += [
+            (stage, before['stages'][stage]['median_ms'], timing['median_ms'])
+            for stage, timing in result['stages'].items() if stage in before['stages']
+        ]
+        for stage, old, new in stages:
+            comparison.append((result['size'], stage, old, new, round(new / old, 3) if old else None))
+    return comparison
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark the HTML to Framer CSV converter on synthetic Google Docs exports'
+    )
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help=f'Comma-separated document sizes (default: {DEFAULT_SIZES})')
+    parser.add_argument('--parser', default='html.parser', choices=['html.parser', 'lxml', 'stream'],
+                        help='Parser backend to benchmark (default: html.parser)')
+    parser.add_argument('--min-time', type=float, default=DEFAULT_MIN_TIME,
+                        help=f'Seconds to keep repeating each size (default: {DEFAULT_MIN_TIME})')
+    parser.add_argument('--max-repeat', type=int, default=DEFAULT_MAX_REPEAT,
+                        help=f'Maximum runs per size (default: {DEFAULT_MAX_REPEAT})')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the generated documents (default: 0)')
+    parser.add_argument('--output', '-o', help='Write the JSON results to this file instead of stdout')
+    parser.add_argument('--compare', metavar='BASELINE', help='Earlier JSON results to compare the stage timings with')
+    parser.add_argument('--generate', metavar='SIZE', help='Only print a generated document of SIZE and exit')
+    parser.add_argument('--run-file', help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+
+    if args.parser not in parsing.available_parser_backends():
+        parser.error(f"parser backend '{args.parser}' is not available (pip3 install {args.parser})")
+
+    if args.generate:
+        sys.stdout.write(generate_google_docs_html(parse_size(args.generate), seed=args.seed))
+        return
+
+    if args.run_file:
+        json.dump(benchmark_file(args.run_file, args.parser, args.min_time, args.max_repeat), sys.stdout)
+        return
+
+    try:
+        sizes = [parse_size(size) for size in args.sizes.split(',') if size.strip()]
+    except ValueError:
+        parser.error(f'invalid --sizes: {args.sizes}')
+
+    results = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'converter_version': batch.CONVERTER_VERSION,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'parser': args.parser,
+        'seed': args.seed,
+        'results': [],
+    }
+    for size in sizes:
+        print(f"⏱️  Benchmarking {format_size(size)}...", file=sys.stderr)
+        result = benchmark_size(size, args.parser, args.min_time, args.max_repeat, seed=args.seed)
+        print(f"   {result['total_ms']:.1f} ms, {result['articles_per_second']} articles/s, "
+              f"{result['mb_per_second']} MB/s, peak {result['peak_memory_mb']} MB", file=sys.stderr)
+        results['results'].append(result)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✅ Results written to {args.output}", file=sys.stderr)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"\n📊 Compared with {args.compare} (ratio > 1 is slower):", file=sys.stderr)
+        for size, stage, old, new, ratio in compare_results(results, baseline):
+            marker = ' ⚠️' if ratio and ratio > 1.1 else ''
+            print(f"   {size:>6} {stage:<26} {old:>10.3f} ms -> {new:>10.3f} ms  x{ratio}{marker}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
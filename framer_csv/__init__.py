@@ -0,0 +1,3 @@
+"""
+HTML to Framer CMS CSV converter as a library; reference_script.py is its command line interface.
+"""
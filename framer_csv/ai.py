@@ -0,0 +1,434 @@
+"""
+The async OpenAI client scope, the persistent AI result cache and the AIScheduler
+(rate limits, retries and a circuit breaker) every AI request goes through.
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import hashlib
+import json
+import random
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from .common import DEFAULT_CACHE_DIR, logger, _require
+from .metrics import get_metrics
+
+
+DEFAULT_AI_CONCURRENCY = 8
+
+DEFAULT_CACHE_MAX_AGE_DAYS = 30
+DEFAULT_CACHE_MAX_MB = 50
+
+DEFAULT_AI_MAX_RETRIES = 4
+DEFAULT_AI_RETRY_BASE_DELAY = 1.0
+DEFAULT_AI_RETRY_MAX_DELAY = 30.0
+DEFAULT_AI_BREAKER_THRESHOLD = 5
+DEFAULT_AI_BREAKER_COOLDOWN = 30.0
+
+# Holder list for the AsyncOpenAI client of the current run_async()/AIRunner scope
+_async_openai_scope = contextvars.ContextVar('async_openai_scope', default=None)
+
+
+class AICache:
+    """
+    Persistent SQLite cache for AI results, keyed by content hashes.
+    
+    Entries older than max_age_days are dropped, and the least recently used
+    entries are evicted once the stored values exceed max_mb. With
+    refresh=True lookups always miss, so every result is regenerated and
+    overwritten.
+    """
+    
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_age_days=DEFAULT_CACHE_MAX_AGE_DAYS,
+                 max_mb=DEFAULT_CACHE_MAX_MB, refresh=False):
+        Path(cache_dir).mkdir(parents=True, exist_ok=True)
+        self.path = Path(cache_dir) / 'ai_cache.sqlite3'
+        self.max_age_days = max_age_days
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            'kind TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, size INTEGER NOT NULL, '
+            'created_at REAL NOT NULL, accessed_at REAL NOT NULL, PRIMARY KEY (kind, key))'
+        )
+        self.evict()
+    
+    def get(self, kind, key):
+        """Return the cached value for (kind, key), or None on a miss."""
+        if not self.refresh:
+            with self._lock:
+                row = self._db.execute(
+                    'SELECT value FROM entries WHERE kind = ? AND key = ? AND created_at >= ?',
+                    (kind, key, time.time() - self.max_age_days * 86400)
+                ).fetchone()
+                if row:
+                    self._db.execute('UPDATE entries SET accessed_at = ? WHERE kind = ? AND key = ?',
+                                     (time.time(), kind, key))
+                    self.hits += 1
+                    get_metrics().count('ai_cache_hits')
+                    return json.loads(row[0])
+        self.misses += 1
+        get_metrics().count('ai_cache_misses')
+        return None
+    
+    def put(self, kind, key, value):
+        """Store a JSON-serialisable value under (kind, key)."""
+        data = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._db.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)',
+                             (kind, key, data, len(data), now, now))
+    
+    def evict(self):
+        """Drop expired entries, then least recently used ones until under the size limit."""
+        with self._lock:
+            self._db.execute('DELETE FROM entries WHERE created_at < ?',
+                             (time.time() - self.max_age_days * 86400,))
+            total = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+            if total > self.max_bytes:
+                evicted = 0
+                stale = []
+                for kind, key, size in self._db.execute('SELECT kind, key, size FROM entries ORDER BY accessed_at'):
+                    if total - evicted <= self.max_bytes:
+                        break
+                    stale.append((kind, key))
+                    evicted += size
+                self._db.executemany('DELETE FROM entries WHERE kind = ? AND key = ?', stale)
+    
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_ai_cache = None
+_ai_cache_enabled = True
+
+
+def configure_ai_cache(enabled=True, **options):
+    """
+    (Re)configure the AI result cache used by the AI helpers.
+    
+    Args:
+        enabled: Set to False to bypass the cache entirely
+        **options: Passed to AICache (cache_dir, max_age_days, max_mb, refresh)
+    
+    Returns:
+        The active AICache, or None when disabled
+    """
+    global _ai_cache, _ai_cache_enabled
+    if _ai_cache is not None:
+        _ai_cache.close()
+    _ai_cache = AICache(**options) if enabled else None
+    _ai_cache_enabled = enabled
+    return _ai_cache
+
+
+def get_ai_cache():
+    """Return the active AI cache, opening the default one on first use."""
+    global _ai_cache
+    if _ai_cache is None and _ai_cache_enabled:
+        try:
+            _ai_cache = AICache()
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Warning: AI cache unavailable ({e}), continuing without cache")
+            configure_ai_cache(enabled=False)
+    return _ai_cache
+
+
+def _hash_key(*parts):
+    """Stable SHA-256 hex digest of the given JSON-serialisable parts."""
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def get_async_openai_client():
+    """Return the AsyncOpenAI client (pooled connections) of the current run_async() or AIRunner scope."""
+    holder = _async_openai_scope.get()
+    if holder is None:
+        raise RuntimeError("async AI calls must run inside run_async() or an AIRunner")
+    if not holder:
+        # Retries are handled by the AIScheduler
+        holder.append(_require('openai', 'openai').AsyncOpenAI(max_retries=0))
+    return holder[0]
+
+
+async def _in_openai_scope(coro, holder, close):
+    """Await coro with holder as the AsyncOpenAI client scope, closing the client afterwards if close."""
+    token = _async_openai_scope.set(holder)
+    try:
+        return await coro
+    finally:
+        _async_openai_scope.reset(token)
+        if close and holder:
+            # Close on the loop that opened the connections, before asyncio.run() tears it down
+            await holder.pop().close()
+
+
+def run_async(coro, runner=None):
+    """
+    Run coro to completion from synchronous code.
+    
+    With an AIRunner the coroutine shares its event loop and AsyncOpenAI
+    client; otherwise it gets a fresh loop and a client that is closed before
+    the loop is.
+    """
+    if runner is not None:
+        return runner.run(coro)
+    return asyncio.run(_in_openai_scope(coro, [], close=True))
+
+
+class AIRunner:
+    """
+    One event loop and AsyncOpenAI client reused across conversions (watch and daemon mode).
+    
+    Use as a context manager; leaving it closes the client on its own loop,
+    then the loop.
+    """
+    
+    def __init__(self):
+        self._runner = asyncio.Runner() if hasattr(asyncio, 'Runner') else None
+        self._client = []
+    
+    def run(self, coro):
+        if self._runner is None:
+            # No asyncio.Runner before Python 3.11: every call gets its own loop and client
+            return run_async(coro)
+        return self._runner.run(_in_openai_scope(coro, self._client, close=False))
+    
+    def close(self):
+        if self._runner is None:
+            return
+        try:
+            if self._client:
+                self._runner.run(self._client.pop().close())
+        finally:
+            self._runner.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class AICircuitOpenError(RuntimeError):
+    """Raised instead of sending an AI request while the circuit breaker is open."""
+
+
+def _is_retryable_ai_error(error):
+    """Rate limits, timeouts, connection problems and server errors are worth retrying."""
+    status = getattr(error, 'status_code', None)
+    if status is not None:
+        return status in (408, 409, 429) or status >= 500
+    return (type(error).__name__ in ('APIConnectionError', 'APITimeoutError')
+            or isinstance(error, (ConnectionError, TimeoutError)))
+
+
+def _retry_after_seconds(error):
+    """Server-requested delay from a Retry-After header, if any."""
+    response = getattr(error, 'response', None)
+    try:
+        return float(response.headers.get('retry-after'))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class AIScheduler:
+    """
+    Shared gate for every AI request: rate limits, retries and a circuit breaker.
+    
+    Requests draw from token buckets holding rpm requests and tpm tokens per
+    minute (None disables a budget); token use is estimated up front and
+    corrected from the response's usage. Retryable errors are retried up to
+    max_retries times with exponential backoff and full jitter (or the
+    server's Retry-After). After breaker_threshold consecutive failed
+    requests the circuit opens and requests fail fast with AICircuitOpenError,
+    so callers go straight to their fallbacks; once breaker_cooldown seconds
+    have passed a single probe request is let through, and its success
+    closes the circuit again.
+    """
+    
+    def __init__(self, rpm=None, tpm=None, max_retries=DEFAULT_AI_MAX_RETRIES,
+                 base_delay=DEFAULT_AI_RETRY_BASE_DELAY, max_delay=DEFAULT_AI_RETRY_MAX_DELAY,
+                 breaker_threshold=DEFAULT_AI_BREAKER_THRESHOLD, breaker_cooldown=DEFAULT_AI_BREAKER_COOLDOWN):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.budgets = {'requests': rpm, 'tokens': tpm}
+        now = time.monotonic()
+        self.buckets = {name: [float(budget or 0), now] for name, budget in self.budgets.items()}
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.retries = 0
+        self.lock = threading.Lock()
+    
+    def _reserve(self, tokens):
+        """Take one request and tokens from the buckets; return seconds to wait before sending."""
+        wait = 0.0
+        with self.lock:
+            now = time.monotonic()
+            for name, amount in (('requests', 1), ('tokens', tokens)):
+                budget = self.budgets[name]
+                if not budget:
+                    continue
+                bucket = self.buckets[name]
+                rate = budget / 60.0
+                bucket[0] = min(budget, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+                # Going negative reserves capacity for this request; later callers wait longer
+                bucket[0] -= min(amount, budget)
+                if bucket[0] < 0:
+                    wait = max(wait, -bucket[0] / rate)
+        return wait
+    
+    def _settle_tokens(self, estimated, response):
+        """Count the usage the API reported and correct the token bucket with it."""
+        usage = getattr(response, 'usage', None)
+        for field in ('prompt_tokens', 'completion_tokens'):
+            used = getattr(usage, field, None)
+            if isinstance(used, int):
+                get_metrics().count(f'ai_{field}', used)
+        actual = getattr(usage, 'total_tokens', None)
+        if self.budgets['tokens'] and isinstance(actual, int):
+            with self.lock:
+                self.buckets['tokens'][0] += estimated - actual
+    
+    def _admit(self, probe=False):
+        """
+        Circuit breaker check before each attempt; raises AICircuitOpenError while open.
+        
+        Returns True when this request is the half-open probe (pass that back
+        in for its retries).
+        """
+        with self.lock:
+            if self.opened_at is None or probe:
+                return probe
+            if self.probing or time.monotonic() - self.opened_at < self.breaker_cooldown:
+                get_metrics().count('ai_breaker_rejections')
+                raise AICircuitOpenError('AI circuit breaker is open')
+            self.probing = True
+            return True
+    
+    def _abandon(self, probe):
+        """A request ended without a verdict (e.g. cancelled at a deadline): free the probe slot."""
+        if probe:
+            with self.lock:
+                self.probing = False
+    
+    def _record(self, success):
+        with self.lock:
+            self.probing = False
+            if success:
+                if self.opened_at is not None:
+                    logger.info("🔌 AI circuit breaker closed, probe request succeeded")
+                self.consecutive_failures = 0
+                self.opened_at = None
+                return
+            self.consecutive_failures += 1
+            if self.opened_at is not None or self.consecutive_failures >= self.breaker_threshold:
+                if self.opened_at is None:
+                    logger.warning(f"🔌 AI circuit breaker opened after {self.consecutive_failures} consecutive failures, "
+                          f"using fallbacks for {self.breaker_cooldown:g}s")
+                self.opened_at = time.monotonic()
+    
+    def _backoff(self, attempt, error, max_retries):
+        """Delay before retry number attempt (1-based), or None when the error is final."""
+        if attempt > max_retries or not _is_retryable_ai_error(error):
+            return None
+        retry_after = _retry_after_seconds(error)
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+    
+    async def call_async(self, request, tokens=0, semaphore=None, max_retries=None):
+        """
+        Await request() (returning an API call awaitable) under the rate limits, retries and breaker.
+        
+        semaphore is held per attempt only, not while backing off; max_retries
+        overrides the scheduler's for this request (0 gives a single attempt).
+        """
+        if max_retries is None:
+            max_retries = self.max_retries
+        attempt = 0
+        probe = False
+        try:
+            while True:
+                probe = self._admit(probe)
+                await asyncio.sleep(self._reserve(tokens))
+                get_metrics().count('ai_requests')
+                try:
+                    async with semaphore or contextlib.nullcontext():
+                        response = await request()
+                except Exception as e:
+                    attempt += 1
+                    delay = self._backoff(attempt, e, max_retries)
+                    if delay is None:
+                        self._record(False)
+                        get_metrics().count('ai_failures')
+                        probe = False
+                        raise
+                    self._log_retry(e, delay, attempt, max_retries)
+                    await asyncio.sleep(delay)
+                    continue
+                self._record(True)
+                probe = False
+                self._settle_tokens(tokens, response)
+                return response
+        finally:
+            self._abandon(probe)
+    
+    def _log_retry(self, error, delay, attempt, max_retries):
+        with self.lock:
+            self.retries += 1
+        get_metrics().count('ai_retries')
+        reason = getattr(error, 'status_code', None) or type(error).__name__
+        logger.info(f"⏳ AI request failed ({reason}), retrying in {delay:.1f}s ({attempt}/{max_retries})")
+
+
+_ai_scheduler = None
+
+
+def configure_ai_scheduler(**options):
+    """
+    Replace the shared AIScheduler used by the AI helpers.
+    
+    Args:
+        **options: Passed to AIScheduler (rpm, tpm, max_retries, breaker_threshold, ...)
+    
+    Returns:
+        The new AIScheduler
+    """
+    global _ai_scheduler
+    _ai_scheduler = AIScheduler(**options)
+    return _ai_scheduler
+
+
+def get_ai_scheduler():
+    """Return the shared AIScheduler, creating a default one (no rate limits) on first use."""
+    global _ai_scheduler
+    if _ai_scheduler is None:
+        _ai_scheduler = AIScheduler()
+    return _ai_scheduler
+
+
+def _estimate_tokens(messages, max_tokens):
+    """Rough token estimate for rate limiting: ~4 characters per prompt token plus the completion budget."""
+    chars = 0
+    for message in messages:
+        content = message['content']
+        if isinstance(content, str):
+            chars += len(content)
+        else:
+            chars += sum(len(part.get('text', '')) for part in content)
+    return chars // 4 + max_tokens
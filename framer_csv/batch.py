@@ -0,0 +1,700 @@
+"""
+Batch conversion with a manifest for incremental rebuilds, watch mode and the
+JSON Lines daemon.
+"""
+
+import asyncio
+import contextlib
+import ctypes
+import ctypes.util
+import glob
+import hashlib
+import json
+import logging
+import os
+import select
+import socketserver
+import struct
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from pathlib import Path
+
+from .ai import DEFAULT_AI_CONCURRENCY, AIRunner, run_async
+from .common import logger
+from .convert import read_article
+from .fallbacks import get_category_classifier, get_keyword_index, index_article_keywords
+from .links import BrokenLinksError, check_article_links, _check_one_article_links, _log_link_results
+from .metrics import collect_metric_events, get_metrics
+from .rows import METADATA_FIELDS, build_framer_row_async, _needs_seo_ai, write_framer_csv
+from .seo import DEFAULT_SEO_BATCH_SIZE, SEO_PROMPT_VERSION, generate_seo_fields_batch
+from .upsert import SlugCollisionError, _log_upsert, upsert_framer_csv
+from .vision import VISION_PROMPT_VERSION
+
+
+# Bump whenever extraction or row assembly changes the generated CSV, so
+# conversion manifests no longer reuse rows built by the old converter.
+CONVERTER_VERSION = 1
+MANIFEST_VERSION = 1
+
+DEFAULT_WATCH_DEBOUNCE = 1.0
+DEFAULT_WATCH_POLL_INTERVAL = 1.0
+
+
+def load_batch_jobs(source, image_url=None):
+    """
+    Collect conversion jobs from a directory, glob pattern or JSON manifest.
+    
+    A manifest maps HTML paths to either an image URL or an object with
+    'image_url' plus optional per-article metadata overrides (slug, category, ...).
+    It may also be a list of such objects with an 'html_file' key. Relative
+    paths in a manifest are resolved against the manifest's directory.
+    Entries with keys other than METADATA_FIELDS get an 'error' instead of
+    being converted with part of their metadata silently dropped.
+    
+    Returns:
+        List of job dicts (html_file, image_url, metadata, and 'error' for
+        invalid entries) in deterministic order
+    """
+    path = Path(source)
+    
+    if path.is_file() and path.suffix.lower() == '.json':
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        
+        if isinstance(manifest, dict):
+            entries = []
+            for html_file, value in manifest.items():
+                entry = dict(value) if isinstance(value, dict) else {'image_url': value}
+                entry['html_file'] = html_file
+                entries.append(entry)
+        else:
+            entries = [dict(entry) for entry in manifest]
+        
+        jobs = []
+        for entry in entries:
+            html_file = Path(entry.pop('html_file'))
+            if not html_file.is_absolute():
+                html_file = path.parent / html_file
+            job = {
+                'html_file': str(html_file),
+                'image_url': entry.pop('image_url', image_url),
+                'metadata': {k: v for k, v in entry.items() if k in METADATA_FIELDS and v is not None},
+            }
+            unknown = set(entry) - set(METADATA_FIELDS)
+            if unknown:
+                job['error'] = f"unknown metadata fields in {path.name}: {', '.join(sorted(unknown))}"
+            jobs.append(job)
+        return jobs
+    
+    if path.is_dir():
+        html_files = sorted(p for p in path.iterdir() if p.suffix.lower() in ('.html', '.htm'))
+    else:
+        html_files = sorted(Path(p) for p in glob.glob(source))
+    
+    return [{'html_file': str(p), 'image_url': image_url, 'metadata': {}} for p in html_files]
+
+
+def conversion_manifest_path(output_file):
+    """Path of the conversion manifest kept next to a batch output CSV."""
+    output_file = Path(output_file)
+    return output_file.with_name(output_file.stem + '.manifest.json')
+
+
+def load_conversion_manifest(manifest_path):
+    """Load manifest entries keyed by absolute HTML path ({} if missing, unreadable or outdated)."""
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    
+    if not isinstance(manifest, dict) or manifest.get('version') != MANIFEST_VERSION:
+        return {}
+    return manifest.get('articles', {})
+
+
+def write_conversion_manifest(manifest_path, entries):
+    """Atomically replace the conversion manifest with the given entries."""
+    manifest_path = Path(manifest_path)
+    handle, temp_path = tempfile.mkstemp(dir=manifest_path.parent or '.', suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'articles': entries}, f, ensure_ascii=False, indent=1)
+        os.replace(temp_path, manifest_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def _file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(partial(f.read, chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def conversion_inputs(job, use_ai, previous=None, check_links=None):
+    """
+    Describe everything a batch row depends on, for comparison with the manifest.
+    
+    The HTML content hash is taken from the previous manifest entry when the
+    file's size and mtime are unchanged, so unchanged files are not re-read.
+    
+    Returns:
+        Manifest entry without 'row' (inputs dict plus the file's stat signature)
+    """
+    html_file = job['html_file']
+    stat = os.stat(html_file)
+    signature = [stat.st_size, stat.st_mtime_ns]
+    
+    if previous and previous.get('stat') == signature:
+        content_hash = previous['inputs']['content_hash']
+    else:
+        content_hash = _file_sha256(html_file)
+    
+    inputs = {
+        'content_hash': content_hash,
+        'image_url': job['image_url'],
+        'metadata': job['metadata'],
+        'use_ai': use_ai,
+        'converter_version': CONVERTER_VERSION,
+        'seo_prompt_version': SEO_PROMPT_VERSION if use_ai else None,
+        'vision_prompt_version': VISION_PROMPT_VERSION,
+    }
+    inputs['category_taxonomy'] = get_category_classifier().fingerprint
+    if check_links:
+        inputs['check_links'] = check_links
+    index = get_keyword_index()
+    if index is not None:
+        # TF-IDF keyword fallbacks differ from the plain frequency ones
+        inputs['keyword_index'] = {'path': str(index.path), 'bigrams': index.bigrams}
+    
+    return {'stat': signature, 'inputs': inputs}
+
+
+def _extract_article_job(html_file, parser='html.parser', low_memory=False, assets_dir=None):
+    """
+    Process pool worker: read and parse one HTML file, never raising.
+    
+    Returns (article, error, metric events); a worker process's own metrics
+    are lost with it, so the caller replays the events into its RunMetrics.
+    """
+    with collect_metric_events() as events:
+        try:
+            return read_article(html_file, parser=parser, low_memory=low_memory, assets_dir=assets_dir), None, events
+        except Exception as e:
+            return None, f"{type(e).__name__}: {e}", events
+
+
+async def build_framer_rows_async(articles, use_ai=True, ai_concurrency=DEFAULT_AI_CONCURRENCY,
+                                  deadline=None, fallbacks=None, seo_batch_size=DEFAULT_SEO_BATCH_SIZE):
+    """
+    Build rows for many (article, job) pairs with at most ai_concurrency AI requests in flight.
+    
+    deadline applies to every row from the start of the batch, so time spent
+    waiting for a free AI slot counts against it. fallbacks, if given, is a
+    list of lists (one per article) receiving the rule-based column names.
+    With seo_batch_size > 1, SEO fields are requested for that many articles
+    at once, see generate_seo_fields_batch().
+    
+    Returns:
+        List of rows or exceptions, in input order
+    """
+    semaphore = asyncio.Semaphore(ai_concurrency)
+    if fallbacks is None:
+        fallbacks = [None] * len(articles)
+    
+    seo_requests = [None] * len(articles)
+    if use_ai and seo_batch_size > 1:
+        batched = [index for index, (_, job) in enumerate(articles) if _needs_seo_ai(use_ai, job['metadata'])]
+        futures = generate_seo_fields_batch([
+            (articles[index][0]['title'], articles[index][0]['first_paragraph'], articles[index][0]['content_preview'])
+            for index in batched
+        ], seo_batch_size, semaphore=semaphore)
+        for index, future in zip(batched, futures):
+            seo_requests[index] = future
+    
+    return await asyncio.gather(*[
+        build_framer_row_async(article, job['image_url'], use_ai=use_ai, semaphore=semaphore, deadline=deadline,
+                               fallbacks=article_fallbacks, seo_request=seo_request, **job['metadata'])
+        for (article, job), article_fallbacks, seo_request in zip(articles, fallbacks, seo_requests)
+    ], return_exceptions=True)
+
+
+def convert_batch_to_framer_csv(jobs, output_file, use_ai=True, workers=None,
+                                ai_concurrency=DEFAULT_AI_CONCURRENCY, parser='html.parser',
+                                low_memory=False, assets_dir=None, incremental=True, backfill=False,
+                                deadline=None, seo_batch_size=DEFAULT_SEO_BATCH_SIZE, executor=None, runner=None,
+                                check_links=None, upsert=None, on_slug_collision='error', **metadata):
+    """
+    Convert many HTML articles into a single multi-row Framer CMS CSV.
+    
+    Parsing and rendering are spread across a process pool, AI requests run
+    concurrently on the shared async client; rows are written in job order.
+    A failing article is reported and skipped instead of aborting the run.
+    
+    A conversion manifest next to the output (see conversion_manifest_path())
+    records each article's content hash, image URL, metadata and converter
+    and prompt versions together with its row and the fields that fell back to
+    rule-based values. With incremental=True, rows of articles whose inputs are
+    unchanged are reused without parsing or AI calls; backfill=True still
+    reconverts those with fallback fields, to upgrade them with AI results.
+    
+    Args:
+        jobs: List of job dicts as returned by load_batch_jobs()
+        output_file: Output CSV file path
+        use_ai: Whether to use AI for SEO generation (default: True)
+        workers: Number of worker processes (default: CPU count)
+        ai_concurrency: Maximum number of AI requests in flight
+        parser: Parser backend, see extract_article() (default: 'html.parser')
+        low_memory: Stream each file with bounded memory, see extract_article_low_memory()
+        assets_dir: With low_memory, directory to externalize embedded base64 images to
+        incremental: Reuse manifest rows for unchanged articles (default: True)
+        backfill: Reconvert unchanged articles whose row has rule-based fallback fields
+        deadline: Seconds to wait for AI results before using the rule-based fallbacks
+        seo_batch_size: Articles per batched SEO request (default: one request per article)
+        executor: Process pool to reuse for parsing instead of starting one per call
+        runner: AIRunner to reuse, keeping the async AI client's connections warm
+        check_links: Check the Sources links of all converted articles together, see
+            check_article_links(); with 'fail', articles with broken links are failures
+        upsert: Master CSV to also replace or append the converted rows in, see
+            upsert_framer_csv() (raises SlugCollisionError with on_slug_collision='error')
+        on_slug_collision: One of SLUG_COLLISION_MODES, for upsert (default: 'error')
+        **metadata: Metadata defaults applied to every article (per-job overrides win)
+    
+    Returns:
+        Tuple of (output_file, list of (html_file, error) for failed articles)
+    """
+    
+    manifest_path = conversion_manifest_path(output_file)
+    previous = load_conversion_manifest(manifest_path) if incremental else {}
+    
+    jobs = [{**job, 'metadata': {**metadata, **job['metadata']}} for job in jobs]
+    keys = [os.path.abspath(job['html_file']) for job in jobs]
+    entries = {}
+    rows_by_index = {}
+    fallbacks_by_index = {}
+    broken_by_index = {}
+    unknown_by_index = {}
+    failures = []
+    
+    pending = []
+    for index, (job, key) in enumerate(zip(jobs, keys)):
+        if job.get('error'):
+            logger.warning(f"⚠️  Skipping {job['html_file']}: {job['error']}")
+            failures.append((job['html_file'], job['error']))
+            continue
+        try:
+            entry = conversion_inputs(job, use_ai, previous.get(key), check_links=check_links)
+        except OSError:
+            # Missing or unreadable: let extraction report the error
+            pending.append(index)
+            continue
+        
+        entries[key] = entry
+        cached = previous.get(key)
+        if (incremental and cached and cached.get('inputs') == entry['inputs'] and 'row' in cached
+                and not (backfill and cached.get('fallback_fields'))
+                # Links that couldn't be checked are checked again next run
+                and not (check_links and cached.get('unknown_links'))):
+            rows_by_index[index] = cached['row']
+            fallbacks_by_index[index] = cached.get('fallback_fields', [])
+            if check_links:
+                broken_by_index[index] = cached.get('broken_links', {})
+        else:
+            pending.append(index)
+    
+    if rows_by_index:
+        logger.info(f"♻️  Reusing {len(rows_by_index)} unchanged articles from {manifest_path}")
+    
+    html_files = [jobs[index]['html_file'] for index in pending]
+    extract_job = partial(_extract_article_job, parser=parser, low_memory=low_memory, assets_dir=assets_dir)
+    
+    if workers == 1 or len(html_files) <= 1:
+        extracted = [extract_job(html_file) for html_file in html_files]
+    elif executor is not None:
+        extracted = list(executor.map(extract_job, html_files, chunksize=4))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            extracted = list(pool.map(extract_job, html_files, chunksize=4))
+    
+    articles = []
+    converted = []
+    metrics = get_metrics()
+    for index, (article, error, events) in zip(pending, extracted):
+        for event in events:
+            metrics.replay(event)
+        job = jobs[index]
+        if error is None:
+            articles.append((article, job))
+            converted.append(index)
+        else:
+            logger.warning(f"⚠️  Skipping {job['html_file']}: {error}")
+            failures.append((job['html_file'], error))
+    
+    if check_links and articles:
+        unknown = []
+        broken_links = check_article_links([article for article, _ in articles], mode=check_links, unknown=unknown)
+        checked = zip(converted, articles, broken_links, unknown)
+        articles, converted = [], []
+        for index, (article, job), broken, unchecked in checked:
+            _log_link_results(job['html_file'], broken, unchecked)
+            if unchecked:
+                unknown_by_index[index] = unchecked
+            if broken and check_links == 'fail':
+                error = str(BrokenLinksError(broken))
+                logger.warning(f"⚠️  Skipping {job['html_file']}: {error}")
+                failures.append((job['html_file'], error))
+                continue
+            broken_by_index[index] = broken
+            articles.append((article, job))
+            converted.append(index)
+    
+    index_article_keywords([(keys[index], article) for index, (article, _) in zip(converted, articles)])
+    
+    fallbacks = [[] for _ in articles]
+    results = run_async(build_framer_rows_async(articles, use_ai=use_ai, ai_concurrency=ai_concurrency,
+                                                deadline=deadline, fallbacks=fallbacks,
+                                                seo_batch_size=seo_batch_size), runner)
+    for index, (_, job), result, article_fallbacks in zip(converted, articles, results, fallbacks):
+        if isinstance(result, Exception):
+            error = f"{type(result).__name__}: {result}"
+            logger.warning(f"⚠️  Skipping {job['html_file']}: {error}")
+            failures.append((job['html_file'], error))
+        else:
+            rows_by_index[index] = result
+            fallbacks_by_index[index] = article_fallbacks if use_ai else []
+    
+    rows = [rows_by_index[index] for index in range(len(jobs)) if index in rows_by_index]
+    write_framer_csv(rows, output_file)
+    
+    # Only successfully converted articles are recorded, failures are retried next run
+    write_conversion_manifest(manifest_path, {
+        keys[index]: {
+            **entries[keys[index]], 'row': row, 'fallback_fields': fallbacks_by_index[index],
+            **({'broken_links': broken_by_index[index]} if index in broken_by_index else {}),
+            **({'unknown_links': unknown_by_index[index]} if index in unknown_by_index else {}),
+        }
+        for index, row in rows_by_index.items()
+        if keys[index] in entries
+    })
+    # After the manifest: every run upserts all rows, reused ones included, so a
+    # crash in between is repaired by the next run instead of converting again
+    if upsert:
+        pinned_slugs = {row['Slug'] for index, row in rows_by_index.items() if jobs[index]['metadata'].get('slug')}
+        _log_upsert(upsert, upsert_framer_csv(rows, upsert, on_collision=on_slug_collision, pinned_slugs=pinned_slugs))
+    
+    logger.info(f"\n📊 Converted {len(rows)} of {len(jobs)} articles")
+    with_fallbacks = sum(1 for article_fallbacks in fallbacks_by_index.values() if article_fallbacks)
+    if with_fallbacks:
+        logger.info(f"   {with_fallbacks} with rule-based fallback fields (upgrade later with --backfill)")
+    with_broken_links = sum(1 for broken in broken_by_index.values() if broken)
+    if with_broken_links:
+        logger.info(f"   {with_broken_links} with broken source links (marked with data-link-status)")
+    if unknown_by_index:
+        logger.info(f"   {len(unknown_by_index)} with source links that couldn't be checked (checked again next run)")
+    
+    return output_file, failures
+
+
+class _InotifyWatcher:
+    """Directory change notifications through Linux inotify (via ctypes, no extra dependency)."""
+    
+    name = 'inotify'
+    
+    IN_MODIFY = 0x002
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_FROM = 0x040
+    IN_MOVED_TO = 0x080
+    IN_DELETE = 0x200
+    IN_Q_OVERFLOW = 0x4000
+    EVENT_HEADER = struct.Struct('iIII')
+    
+    def __init__(self, directory):
+        libc_name = ctypes.util.find_library('c')
+        if not sys.platform.startswith('linux') or not libc_name:
+            raise OSError('inotify is only available on Linux')
+        
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.directory = Path(directory)
+        self.fd = libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        
+        mask = self.IN_CLOSE_WRITE | self.IN_MOVED_FROM | self.IN_MOVED_TO | self.IN_DELETE
+        if libc.inotify_add_watch(self.fd, os.fsencode(self.directory), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f'inotify_add_watch failed for {directory}')
+    
+    def wait(self, timeout=None):
+        """Block up to timeout seconds; return the set of changed paths (empty on timeout)."""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        
+        data = os.read(self.fd, 64 * 1024)
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            _, mask, _, length = self.EVENT_HEADER.unpack_from(data, offset)
+            offset += self.EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if mask & self.IN_Q_OVERFLOW:
+                # Events were lost; report the directory so everything is rechecked
+                changed.add(self.directory)
+            elif name:
+                changed.add(self.directory / os.fsdecode(name))
+        return changed
+    
+    def close(self):
+        os.close(self.fd)
+
+
+class _PollingWatcher:
+    """Portable fallback that compares size and mtime of the directory's files every poll_interval."""
+    
+    name = 'polling'
+    
+    def __init__(self, directory, poll_interval=DEFAULT_WATCH_POLL_INTERVAL):
+        self.directory = Path(directory)
+        self.poll_interval = poll_interval
+        self.snapshot = self._scan()
+    
+    def _scan(self):
+        snapshot = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    stat = entry.stat()
+                    snapshot[entry.path] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+    
+    def wait(self, timeout=None):
+        """Block up to timeout seconds; return the set of changed paths (empty on timeout)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return set()
+            time.sleep(self.poll_interval if remaining is None else min(self.poll_interval, remaining))
+            
+            snapshot = self._scan()
+            changed = {Path(path) for path in snapshot.keys() | self.snapshot.keys()
+                       if snapshot.get(path) != self.snapshot.get(path)}
+            self.snapshot = snapshot
+            if changed:
+                return changed
+    
+    def close(self):
+        pass
+
+
+def _is_html_path(path):
+    return path.suffix.lower() in ('.html', '.htm')
+
+
+def watch_directory(directory, output_file, image_url=None, debounce=DEFAULT_WATCH_DEBOUNCE,
+                    poll_interval=DEFAULT_WATCH_POLL_INTERVAL, polling=False, workers=None, **options):
+    """
+    Keep a batch CSV up to date while HTML exports land in a directory.
+    
+    Converts the directory once, then waits for new, modified, moved or
+    deleted HTML files (inotify on Linux, polling elsewhere or with
+    polling=True). A burst of writes is debounced until the directory has
+    been quiet for debounce seconds, then the batch is rebuilt through the
+    conversion manifest, so only the affected articles are parsed and sent
+    to the AI. The process pool, event loop, AI clients and caches stay
+    warm between events. Runs until interrupted.
+    
+    Args:
+        directory: Directory to watch
+        output_file: Batch output CSV file path
+        image_url: Default featured image URL for the articles
+        debounce: Seconds of quiet before a burst of changes is converted
+        poll_interval: Seconds between scans for the polling watcher
+        polling: Force the polling watcher
+        workers: Number of worker processes (default: CPU count)
+        **options: Passed on to convert_batch_to_framer_csv() (use_ai, parser, metadata, ...)
+    """
+    watcher = None
+    if not polling:
+        try:
+            watcher = _InotifyWatcher(directory)
+        except (OSError, AttributeError):
+            pass
+    if watcher is None:
+        watcher = _PollingWatcher(directory, poll_interval)
+    
+    def convert(reason):
+        nonlocal executor
+        started = time.perf_counter()
+        try:
+            jobs = load_batch_jobs(directory, image_url)
+            _, failures = convert_batch_to_framer_csv(
+                jobs, output_file, workers=workers, executor=executor, runner=runner, incremental=True, **options
+            )
+        except SlugCollisionError as e:
+            # Keep watching: renaming one of the articles resolves it
+            logger.error(f"❌ {e}")
+            return
+        except Exception as e:
+            # Keep watching: the next change rebuilds the batch again
+            logger.error(f"❌ Updating {output_file} failed ({reason}): {type(e).__name__}: {e}",
+                         exc_info=logger.isEnabledFor(logging.DEBUG))
+            if isinstance(e, BrokenProcessPool):
+                # A crashed worker takes the whole pool down; start a fresh one
+                executor = stack.enter_context(ProcessPoolExecutor(max_workers=workers))
+            return
+        for html_file, error in failures:
+            logger.error(f"❌ {html_file}: {error}")
+        logger.info(f"✅ {output_file} updated ({reason}) in {time.perf_counter() - started:.2f}s")
+        get_metrics().export()
+    
+    with contextlib.ExitStack() as stack:
+        stack.callback(watcher.close)
+        executor = stack.enter_context(ProcessPoolExecutor(max_workers=workers)) if workers != 1 else None
+        runner = stack.enter_context(AIRunner())
+        
+        convert('initial build')
+        logger.info(f"\n👀 Watching {directory} for HTML changes ({watcher.name}), press Ctrl+C to stop")
+        
+        while True:
+            changed = watcher.wait()
+            while True:
+                more = watcher.wait(debounce)
+                if not more:
+                    break
+                changed |= more
+            
+            changed = sorted(path for path in changed if _is_html_path(path) or path == Path(directory))
+            if changed:
+                convert(', '.join(path.name for path in changed[:5]) + (' ...' if len(changed) > 5 else ''))
+
+
+def run_conversion_job(job, runner=None):
+    """
+    Convert one daemon job and describe the result.
+    
+    A job is a dict with 'html_file' and 'image_url', optionally 'output'
+    (CSV path to write), 'upsert' (master CSV to upsert the row into) with
+    'on_slug_collision', 'use_ai' (default true), 'deadline', 'parser',
+    'low_memory', 'assets_dir', 'check_links', an 'id' echoed back, and any of
+    METADATA_FIELDS.
+    Progress messages go to the log, never to the response stream.
+    
+    Returns:
+        JSON-serialisable dict with 'ok' plus 'row', 'fallback_fields', 'output_file',
+        (with check_links) 'broken_links' and 'unknown_links' and (with upsert) 'upserted', or 'error'
+    """
+    started = time.perf_counter()
+    response = {'id': job.get('id')} if 'id' in job else {}
+    
+    try:
+        unknown = set(job) - {'id', 'html_file', 'image_url', 'output', 'use_ai', 'deadline', 'parser',
+                              'low_memory', 'assets_dir', 'check_links', 'upsert', 'on_slug_collision',
+                              *METADATA_FIELDS}
+        if unknown:
+            raise ValueError(f"unknown job fields: {', '.join(sorted(unknown))}")
+        if not job.get('html_file') or not job.get('image_url'):
+            raise ValueError("'html_file' and 'image_url' are required")
+        
+        metadata = {k: job[k] for k in METADATA_FIELDS if job.get(k) is not None}
+        
+        article = read_article(job['html_file'], parser=job.get('parser', 'html.parser'),
+                               low_memory=job.get('low_memory', False), assets_dir=job.get('assets_dir'))
+        if job.get('check_links'):
+            response['unknown_links'] = {}
+            response['broken_links'] = _check_one_article_links(job['html_file'], article, job['check_links'],
+                                                                unknown=response['unknown_links'])
+        index_article_keywords([(os.path.abspath(job['html_file']), article)])
+        fallbacks = []
+        row = run_async(build_framer_row_async(article, job['image_url'], use_ai=job.get('use_ai', True),
+                                               deadline=job.get('deadline'), fallbacks=fallbacks, **metadata),
+                        runner)
+        if job.get('output'):
+            write_framer_csv([row], job['output'])
+        if job.get('upsert'):
+            stats = upsert_framer_csv([row], job['upsert'], on_collision=job.get('on_slug_collision', 'error'),
+                                      pinned_slugs=[row['Slug']] if metadata.get('slug') else ())
+            response['upserted'] = {**stats, 'master': job['upsert']}
+        
+        response.update(ok=True, output_file=job.get('output'), row=row, fallback_fields=fallbacks)
+    except Exception as e:
+        response.update(ok=False, error=f"{type(e).__name__}: {e}")
+    
+    response['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    get_metrics().export()
+    return response
+
+
+def serve_json_lines(input_stream, output_stream, runner=None):
+    """Answer one JSON job per input line with one JSON response line, until EOF."""
+    for line in input_stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            job = json.loads(line)
+            if not isinstance(job, dict):
+                raise ValueError('a job must be a JSON object')
+        except ValueError as e:
+            response = {'ok': False, 'error': f"invalid job: {e}"}
+        else:
+            response = run_conversion_job(job, runner=runner)
+        output_stream.write(json.dumps(response, ensure_ascii=False) + '\n')
+        output_stream.flush()
+
+
+def serve_daemon(socket_path=None):
+    """
+    Keep modules, AI clients and caches loaded and convert jobs as they arrive.
+    
+    Without socket_path, jobs are read as JSON lines from stdin and answered on
+    stdout. With socket_path, a Unix domain socket is served; every connection
+    speaks the same JSON lines protocol and jobs are handled one at a time on
+    the shared event loop.
+    """
+    with contextlib.ExitStack() as stack:
+        runner = stack.enter_context(AIRunner())
+        
+        if not socket_path:
+            logger.info("🟢 Daemon ready, reading JSON jobs from stdin")
+            serve_json_lines(sys.stdin, sys.stdout, runner=runner)
+            return
+        
+        class JobHandler(socketserver.StreamRequestHandler):
+            def handle(self):
+                serve_json_lines(
+                    (line.decode('utf-8') for line in self.rfile),
+                    _SocketTextWriter(self.wfile),
+                    runner=runner,
+                )
+        
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)  # stale socket from an earlier run
+        server = stack.enter_context(socketserver.UnixStreamServer(socket_path, JobHandler))
+        stack.callback(os.unlink, socket_path)
+        os.chmod(socket_path, 0o600)
+        
+        logger.info(f"🟢 Daemon listening on {socket_path}")
+        server.serve_forever()
+
+
+class _SocketTextWriter:
+    """Minimal text stream over a socket's binary file for serve_json_lines()."""
+    
+    def __init__(self, wfile):
+        self.wfile = wfile
+    
+    def write(self, text):
+        self.wfile.write(text.encode('utf-8'))
+    
+    def flush(self):
+        self.wfile.flush()
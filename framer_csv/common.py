@@ -0,0 +1,62 @@
+"""
+Shared logger, cache location, lazy imports, new file permissions and the
+pooled HTTP session.
+"""
+
+import importlib.util
+import logging
+import os
+from pathlib import Path
+
+
+# Progress and warnings; silent unless the embedding application configures
+# logging (main() logs plain messages to stdout, or to stderr for --daemon)
+logger = logging.getLogger('html_to_framer_csv')
+logger.addHandler(logging.NullHandler())
+
+
+DEFAULT_CACHE_DIR = Path(os.environ.get('FRAMER_CSV_CACHE_DIR', Path.home() / '.cache' / 'html_to_framer_csv'))
+
+HTTP_TIMEOUT = 10
+HTTP_POOL_SIZE = 16
+
+
+# bs4, openai and requests are imported on first use, so runs that never
+# touch a tree parser or the AI don't pay for the imports.
+def _require(module, package):
+    """Import a third-party dependency on first use, with an install hint if it is missing."""
+    try:
+        return importlib.import_module(module)
+    except ImportError as e:
+        raise ImportError(f"{package} is required for this feature. Install with: pip3 install {package}") from e
+
+
+def _new_file_mode():
+    """Permissions open() gives a new file: 0o666 minus the process umask."""
+    try:
+        # Reading the umask from /proc leaves it alone for other threads
+        with open('/proc/self/status', encoding='ascii') as f:
+            for line in f:
+                if line.startswith('Umask:'):
+                    return 0o666 & ~int(line.split()[1], 8)
+    except (OSError, ValueError):
+        pass
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+_http_session = None
+
+
+def get_http_session():
+    """Return the shared requests.Session (pooled keep-alive connections), creating it on first use."""
+    global _http_session
+    if _http_session is None:
+        requests = _require('requests', 'requests')
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        _http_session = session
+    return _http_session
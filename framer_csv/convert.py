@@ -0,0 +1,144 @@
+"""
+Converting single articles, in memory (convert_article) or from an HTML file to
+a CSV (convert_html_to_framer_csv).
+"""
+
+import io
+import os
+
+from .ai import run_async
+from .common import logger
+from .fallbacks import index_article_keywords
+from .links import _check_one_article_links
+from .metrics import get_metrics
+from .parsing import extract_article, extract_article_low_memory, _iter_html_chunks
+from .rows import FramerRow, build_framer_row_async, write_framer_csv
+from .upsert import _log_upsert, upsert_framer_csv
+
+
+def read_article(html_file, parser='html.parser', low_memory=False, assets_dir=None):
+    """
+    Read and parse one HTML file into an extract_article() dict.
+    
+    With low_memory=True the file is streamed through extract_article_low_memory()
+    instead of being loaded whole (the parser backend is then always 'stream').
+    """
+    if low_memory:
+        # Reading, parsing and rendering are interleaved chunk by chunk
+        with get_metrics().span('parse'):
+            return extract_article_low_memory(html_file, assets_dir=assets_dir)
+    
+    with get_metrics().span('read'):
+        with open(html_file, 'r', encoding='utf-8') as f:
+            html_content = f.read()
+    
+    return extract_article(html_content, parser=parser)
+
+
+def _html_text(source):
+    """HTML source as text from a str, UTF-8 bytes or a file-like object."""
+    if isinstance(source, str):
+        return source
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source).decode('utf-8')
+    if hasattr(source, 'read'):
+        return ''.join(_iter_html_chunks(source, 1024 * 1024))
+    raise TypeError(f'expected HTML as str, bytes or a file-like object, not {type(source).__name__}')
+
+
+async def convert_article_async(source, image_url, use_ai=True, parser='html.parser', low_memory=False,
+                                assets_dir=None, deadline=None, fallbacks=None, doc_id=None, **metadata):
+    """
+    Convert one article held in memory into a FramerRow, without touching the disk.
+    
+    Args:
+        source: HTML as str, UTF-8 bytes, or a text or binary file-like object
+        image_url: URL of the article's featured image
+        use_ai: Whether to use AI for SEO generation (default: True)
+        parser: Parser backend, see extract_article() (default: 'html.parser')
+        low_memory: Stream a file-like source through extract_article_low_memory()
+        assets_dir: With low_memory, directory to externalize embedded base64 images to
+        deadline: Seconds to wait for AI results before using the rule-based fallbacks
+        fallbacks: Optional list; column names of rule-based fields are appended to it
+        doc_id: Key to add the article to the keyword index under (default: not indexed)
+        **metadata: Optional metadata fields (slug, meta_title, meta_description, etc.)
+    
+    Returns:
+        FramerRow
+    """
+    if low_memory:
+        stream = source if hasattr(source, 'read') else io.StringIO(_html_text(source))
+        article = extract_article_low_memory(stream, assets_dir=assets_dir)
+    else:
+        article = extract_article(_html_text(source), parser=parser)
+    if doc_id is not None:
+        index_article_keywords([(doc_id, article)])
+    
+    row = await build_framer_row_async(article, image_url, use_ai=use_ai, deadline=deadline,
+                                       fallbacks=fallbacks, **metadata)
+    return FramerRow.from_dict(row)
+
+
+def convert_article(source, image_url, **options):
+    """Blocking convert_article_async(), for callers without a running event loop."""
+    return run_async(convert_article_async(source, image_url, **options))
+
+
+def convert_html_to_framer_csv(html_file, image_url, output_file=None, use_ai=True, parser='html.parser',
+                               low_memory=False, assets_dir=None, deadline=None, fallbacks=None, check_links=None,
+                               upsert=None, on_slug_collision='error', **metadata):
+    """
+    Convert HTML blog article to Framer CMS CSV format.
+    
+    Args:
+        html_file: Path to HTML file (Google Docs export)
+        image_url: URL of the article's featured image
+        output_file: Output CSV file path (optional, auto-generated unless upserting)
+        use_ai: Whether to use AI for SEO generation (default: True)
+        parser: Parser backend, see extract_article() (default: 'html.parser')
+        low_memory: Stream the file with bounded memory, see extract_article_low_memory()
+        assets_dir: With low_memory, directory to externalize embedded base64 images to
+        deadline: Seconds to wait for AI results before using the rule-based fallbacks
+        fallbacks: Optional list; column names of rule-based fields are appended to it
+        check_links: Check the Sources links, see check_article_links() ('annotate' or
+            'fail', which raises BrokenLinksError; default: no check)
+        upsert: Master CSV to replace or append the row in, see upsert_framer_csv()
+        on_slug_collision: One of SLUG_COLLISION_MODES, for upsert (default: 'error')
+        **metadata: Optional metadata fields (slug, meta_title, meta_description, etc.)
+    
+    Returns:
+        Path to generated CSV file (the master CSV when upserting without output_file)
+    """
+    
+    article = read_article(html_file, parser=parser, low_memory=low_memory, assets_dir=assets_dir)
+    if check_links:
+        _check_one_article_links(html_file, article, check_links)
+    index_article_keywords([(os.path.abspath(html_file), article)])
+    if fallbacks is None:
+        fallbacks = []
+    row = run_async(build_framer_row_async(article, image_url, use_ai=use_ai, deadline=deadline,
+                                           fallbacks=fallbacks, **metadata))
+    
+    if upsert:
+        stats = upsert_framer_csv([row], upsert, on_collision=on_slug_collision,
+                                  pinned_slugs=[row['Slug']] if metadata.get('slug') else ())
+        _log_upsert(upsert, stats)
+        if not output_file:
+            output_file = upsert
+        else:
+            write_framer_csv([row], output_file)
+    else:
+        # Generate output filename if not provided
+        if not output_file:
+            output_file = f"{row['Slug']}.csv"
+        
+        # Create CSV
+        write_framer_csv([row], output_file)
+    
+    logger.info(f"\n📊 Generated fields:")
+    logger.info(f"   Category: {row['Category']}")
+    logger.info(f"   Image Alt: {row['Image:alt']}")
+    if use_ai and fallbacks:
+        logger.info(f"   Rule-based fallback: {', '.join(fallbacks)}")
+    
+    return output_file
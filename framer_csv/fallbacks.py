@@ -0,0 +1,482 @@
+"""
+Rule-based SEO fields used when the AI is off, slow or failing: the category
+classifier, the corpus keyword index and the other fallbacks.
+"""
+
+import hashlib
+import heapq
+import json
+import math
+import re
+import sqlite3
+import threading
+from functools import lru_cache
+from pathlib import Path
+
+from .common import DEFAULT_CACHE_DIR, _require
+
+
+DEFAULT_KEYWORD_INDEX_PATH = DEFAULT_CACHE_DIR / 'keyword_index.sqlite3'
+
+CATEGORY_MATCH_MODES = ('word', 'prefix', 'substring')
+
+# Built-in taxonomy; --taxonomy FILE replaces it with the same structure in JSON.
+# A keyword maps to its weight or to {"weight": ..., "match": ...}; "match" is
+# 'substring' (anywhere, so Dutch compounds such as "financieringsronde" match
+# too), 'prefix' (start of a word) or 'word' (whole word), defaulting to the
+# taxonomy-wide "match" ('substring' when absent). Short stems such as "wet"
+# are whole words only, or "wetenschap" and "netwerk" would match too.
+DEFAULT_CATEGORY_TAXONOMY = {
+    'default': 'Founders & Startups',
+    'match': 'substring',
+    'categories': {
+        'Founders & Startups': {
+            'founder': 1, 'oprichter': 1, 'startup': 1, 'bedrijf': 1, 'ceo': {'weight': 1, 'match': 'word'},
+            'ondernemer': 1, 'profiel': 1,
+        },
+        'Nederlandse AI in de wereld': {
+            'internationaal': 1, 'wereld': 1, 'global': 1, 'europa': 1, 'amerika': 1, 'succes': 1, 'groei': 1,
+            'schaal': 1,
+        },
+        'Investeren in Nederlandse AI': {
+            'investering': 1, 'kapitaal': 1, 'funding': 1, 'venture': 1, 'regels': 1,
+            'wet': {'weight': 1, 'match': 'word'}, 'wetgeving': 1, 'beleid': 1, 'klimaat': 1, 'financiering': 1,
+        },
+    },
+}
+
+
+def _is_word_char(char):
+    return char.isalnum() or char == '_'
+
+
+def _trie_pattern(keywords):
+    """
+    Regex alternation of keywords as a trie ('we(?:t|reld)' for 'wet' and
+    'wereld'), so the engine follows one branch per character instead of
+    trying every keyword in turn; the longest keyword at a position wins.
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = True
+    
+    def pattern(node):
+        branches = [re.escape(char) + pattern(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        alternation = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            # Greedy, so the longer keyword is tried before this one ends here
+            return '(?:' + alternation + ')?'
+        return alternation
+    
+    return pattern(trie)
+
+
+class CategoryClassifier:
+    """
+    Weighted keyword classifier compiled from a category taxonomy.
+    
+    All keywords of all categories are compiled into one regex, a trie of
+    alternations, that a single finditer() pass over the lowercased article
+    tries at every position, so the cost grows with the article length, not
+    with the number of keywords. Each keyword counts once per article, with
+    its weight, when its match rule holds; the category with the highest
+    score wins.
+    """
+    
+    def __init__(self, taxonomy):
+        categories = taxonomy.get('categories')
+        if not isinstance(categories, dict) or not categories:
+            raise ValueError("taxonomy needs a non-empty 'categories' object")
+        default_match = taxonomy.get('match', 'substring')
+        self.categories = list(categories)
+        self.default = taxonomy.get('default', self.categories[0])
+        if self.default not in categories:
+            raise ValueError(f"default category '{self.default}' is not in the taxonomy")
+        
+        # keyword -> [(category, weight, match)]
+        self.rules = {}
+        for category, keywords in categories.items():
+            if not isinstance(keywords, dict):
+                raise ValueError(f"keywords of '{category}' must be an object of keyword: weight")
+            for keyword, rule in keywords.items():
+                if not isinstance(rule, dict):
+                    rule = {'weight': rule}
+                weight = rule.get('weight', 1)
+                match = rule.get('match', default_match)
+                if isinstance(weight, bool) or not isinstance(weight, (int, float)):
+                    raise ValueError(f"weight of '{keyword}' in '{category}' must be a number")
+                if match not in CATEGORY_MATCH_MODES:
+                    raise ValueError(f"match of '{keyword}' in '{category}' must be one of {', '.join(CATEGORY_MATCH_MODES)}")
+                keyword = keyword.strip().lower()
+                if not keyword:
+                    raise ValueError(f"empty keyword in '{category}'")
+                self.rules.setdefault(keyword, []).append((category, weight, match))
+        
+        # Each position reports the longest keyword starting there; the others
+        # starting at the same position are its prefixes.
+        self._prefixes = {keyword: [other for other in self.rules if keyword.startswith(other)] for keyword in self.rules}
+        # Without substring rules only positions at the start of a word can match
+        word_start = '' if any(match == 'substring' for rules in self.rules.values() for _, _, match in rules) else r'(?<!\w)'
+        self._pattern = re.compile(word_start + '(?=(' + _trie_pattern(self.rules) + '))')
+        self.fingerprint = hashlib.sha256(json.dumps(taxonomy, sort_keys=True).encode('utf-8')).hexdigest()
+    
+    @classmethod
+    def from_file(cls, path):
+        """Load a JSON taxonomy file (see DEFAULT_CATEGORY_TAXONOMY for the structure)."""
+        with open(path, 'r', encoding='utf-8') as f:
+            taxonomy = json.load(f)
+        if not isinstance(taxonomy, dict):
+            raise ValueError('taxonomy file must contain a JSON object')
+        return cls(taxonomy)
+    
+    def scores(self, *texts):
+        """Weighted keyword score per category over texts, scanned one after another."""
+        found = set()
+        scores = dict.fromkeys(self.categories, 0)
+        for text in texts:
+            # Lowercasing once is much cheaper than a case-insensitive scan
+            text = text.lower()
+            seen = set()
+            for found_match in self._pattern.finditer(text):
+                start = found_match.start()
+                longest = found_match.group(1)
+                word_start = start == 0 or not _is_word_char(text[start - 1])
+                longest_end = start + len(longest)
+                occurrence = (longest, word_start, longest_end == len(text) or not _is_word_char(text[longest_end]))
+                if occurrence in seen:
+                    continue
+                seen.add(occurrence)
+                for keyword in self._prefixes[longest]:
+                    end = start + len(keyword)
+                    word_end = end == len(text) or not _is_word_char(text[end])
+                    for category, weight, match in self.rules[keyword]:
+                        if (category, keyword) in found:
+                            continue
+                        if match == 'substring' or (word_start and (match == 'prefix' or word_end)):
+                            found.add((category, keyword))
+                            scores[category] += weight
+        return scores
+    
+    def classify(self, *texts):
+        """Highest scoring category (earliest in the taxonomy on ties), or the default without any match."""
+        scores = self.scores(*texts)
+        best = max(self.categories, key=lambda category: scores[category])
+        return best if scores[best] > 0 else self.default
+
+
+_category_classifier = None
+
+
+def configure_category_classifier(taxonomy_file=None):
+    """
+    Classify fallback categories with the taxonomy in taxonomy_file.
+    
+    Args:
+        taxonomy_file: JSON taxonomy path, or None for the built-in taxonomy
+    
+    Returns:
+        The active CategoryClassifier
+    """
+    global _category_classifier
+    _category_classifier = CategoryClassifier.from_file(taxonomy_file) if taxonomy_file else None
+    return get_category_classifier()
+
+
+@lru_cache(maxsize=1)
+def _builtin_category_classifier():
+    return CategoryClassifier(DEFAULT_CATEGORY_TAXONOMY)
+
+
+def get_category_classifier():
+    """Return the active category classifier (the built-in taxonomy unless configured)."""
+    return _category_classifier or _builtin_category_classifier()
+
+
+def determine_category_fallback(title, content, classifier=None):
+    """Fallback: Determine category based on content analysis."""
+    return (classifier or get_category_classifier()).classify(title, content)
+
+
+def generate_meta_title_fallback(title, max_length=60):
+    """Fallback: Generate SEO-optimized meta title (50-60 characters)."""
+    if len(title) <= max_length:
+        return title
+    
+    # Try to truncate at word boundary
+    truncated = title[:max_length].rsplit(' ', 1)[0]
+    return truncated
+
+
+def generate_meta_description_fallback(first_paragraph, max_length=155):
+    """Fallback: Generate SEO-optimized meta description (150-155 characters)."""
+    # Clean the text
+    clean_text = re.sub(r'\s+', ' ', first_paragraph).strip()
+    
+    if len(clean_text) <= max_length:
+        return clean_text
+    
+    # Truncate at sentence boundary if possible
+    sentences = re.split(r'[.!?]\s+', clean_text)
+    description = ""
+    for sentence in sentences:
+        if len(description) + len(sentence) + 1 <= max_length:
+            description += sentence + ". "
+        else:
+            break
+    
+    # If we have a good description, return it
+    if len(description.strip()) >= 100:
+        return description.strip()
+    
+    # Otherwise truncate at word boundary
+    truncated = clean_text[:max_length].rsplit(' ', 1)[0]
+    if not truncated.endswith('.'):
+        truncated += '.'
+    return truncated
+
+
+# Common Dutch stop words, never used as keywords
+DUTCH_STOP_WORDS = frozenset({
+    'de', 'het', 'een', 'en', 'van', 'in', 'op', 'is', 'voor', 'met',
+    'aan', 'als', 'dat', 'die', 'dit', 'te', 'zijn', 'er', 'ook', 'om',
+    'naar', 'bij', 'door', 'maar', 'niet', 'heeft', 'kan', 'wordt', 'deze',
+    'worden', 'werd', 'was', 'uit', 'over', 'onder', 'na', 'nog',
+    'zich', 'meer', 'geen', 'wel', 'waar', 'dan', 'zo',
+})
+
+
+def _keyword_candidates(tokens, bigrams=False):
+    """Non-stopword tokens, plus 'word word' bigrams of adjacent ones when requested."""
+    terms = [token for token in tokens if token not in DUTCH_STOP_WORDS]
+    if bigrams:
+        terms += [f'{a} {b}' for a, b in zip(tokens, tokens[1:])
+                  if a not in DUTCH_STOP_WORDS and b not in DUTCH_STOP_WORDS]
+    return terms
+
+
+class KeywordIndex:
+    """
+    Persistent document-frequency index over the article archive for TF-IDF keywords.
+    
+    Every indexed article contributes its distinct unigrams and bigrams once;
+    re-adding an article under the same doc_id only applies the difference,
+    so the index is updated incrementally and never rebuilt. The document
+    frequencies are mirrored in memory for scoring.
+    """
+    
+    def __init__(self, path=DEFAULT_KEYWORD_INDEX_PATH, bigrams=False):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = Path(path)
+        self.bigrams = bigrams
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('CREATE TABLE IF NOT EXISTS documents (doc_id TEXT PRIMARY KEY, terms TEXT NOT NULL)')
+        self._db.execute('CREATE TABLE IF NOT EXISTS frequencies (term TEXT PRIMARY KEY, df INTEGER NOT NULL)')
+        self._db.commit()
+        self.df = dict(self._db.execute('SELECT term, df FROM frequencies'))
+        self.documents = self._db.execute('SELECT COUNT(*) FROM documents').fetchone()[0]
+    
+    def add_documents(self, documents):
+        """Index (doc_id, tokens) pairs, replacing earlier versions of the same doc_id, in one transaction."""
+        with self._lock, self._db:
+            changed = {}
+            for doc_id, tokens in documents:
+                terms = set(_keyword_candidates(tokens, bigrams=True))
+                row = self._db.execute('SELECT terms FROM documents WHERE doc_id = ?', (doc_id,)).fetchone()
+                old_terms = set(json.loads(row[0])) if row else set()
+                if row and old_terms == terms:
+                    continue
+                if not row:
+                    self.documents += 1
+                
+                for term in terms - old_terms:
+                    self.df[term] = self.df.get(term, 0) + 1
+                    changed[term] = self.df[term]
+                for term in old_terms - terms:
+                    self.df[term] -= 1
+                    changed[term] = self.df[term]
+                self._db.execute('INSERT OR REPLACE INTO documents VALUES (?, ?)',
+                                 (doc_id, json.dumps(sorted(terms), ensure_ascii=False)))
+            
+            self._db.executemany('INSERT OR REPLACE INTO frequencies VALUES (?, ?)',
+                                 [(term, df) for term, df in changed.items() if df > 0])
+            self._db.executemany('DELETE FROM frequencies WHERE term = ?',
+                                 [(term,) for term, df in changed.items() if df <= 0])
+            for term, df in changed.items():
+                if df <= 0:
+                    del self.df[term]
+    
+    def add_document(self, doc_id, tokens):
+        """Index one article's tokens under doc_id (see add_documents())."""
+        self.add_documents([(doc_id, tokens)])
+    
+    def idf(self, term):
+        """Smoothed inverse document frequency; unseen terms score highest."""
+        return math.log((1 + self.documents) / (1 + self.df.get(term, 0))) + 1
+    
+    def keywords(self, tokens, count=5, bigrams=None):
+        """Top count terms of one article by TF-IDF, chosen with a bounded heap (ties keep text order)."""
+        bigrams = self.bigrams if bigrams is None else bigrams
+        frequencies = {}
+        for term in _keyword_candidates(tokens, bigrams):
+            frequencies[term] = frequencies.get(term, 0) + 1
+        top = heapq.nlargest(count, frequencies.items(), key=lambda item: item[1] * self.idf(item[0]))
+        return [term for term, _ in top]
+    
+    def keywords_batch(self, token_lists, count=5, bigrams=None):
+        """
+        keywords() for many articles at once.
+        
+        With numpy installed the term counting, TF-IDF weighting and per-article
+        top-k selection run as array operations over the whole batch.
+        """
+        bigrams = self.bigrams if bigrams is None else bigrams
+        try:
+            np = _require('numpy', 'numpy')
+        except ImportError:
+            return [self.keywords(tokens, count, bigrams) for tokens in token_lists]
+        
+        vocabulary = {}
+        doc_ids, term_ids = [], []
+        for doc, tokens in enumerate(token_lists):
+            terms = _keyword_candidates(tokens, bigrams)
+            term_ids.extend(vocabulary.setdefault(term, len(vocabulary)) for term in terms)
+            doc_ids.extend([doc] * len(terms))
+        if not vocabulary:
+            return [[] for _ in token_lists]
+        
+        terms = list(vocabulary)
+        idf = np.array([self.idf(term) for term in terms])
+        size = len(terms)
+        codes = np.asarray(doc_ids, dtype=np.int64) * size + np.asarray(term_ids, dtype=np.int64)
+        pairs, first_seen, frequencies = np.unique(codes, return_index=True, return_counts=True)
+        docs, term_index = pairs // size, pairs % size
+        scores = frequencies * idf[term_index]
+        
+        # Per article: highest score first, ties in order of first appearance
+        order = np.lexsort((first_seen, -scores, docs))
+        docs, term_index = docs[order], term_index[order]
+        starts = np.searchsorted(docs, np.arange(len(token_lists)))
+        keep = np.arange(len(docs)) - starts[docs] < count
+        
+        results = [[] for _ in token_lists]
+        for doc, term in zip(docs[keep].tolist(), term_index[keep].tolist()):
+            results[doc].append(terms[term])
+        return results
+    
+    def close(self):
+        self._db.close()
+
+
+_keyword_index = None
+
+
+def configure_keyword_index(enabled=True, **options):
+    """
+    Open (or close, with enabled=False) the keyword index used by the fallbacks.
+    
+    Args:
+        **options: Passed to KeywordIndex (path, bigrams)
+    
+    Returns:
+        The active KeywordIndex, or None when disabled
+    """
+    global _keyword_index
+    if _keyword_index is not None:
+        _keyword_index.close()
+    _keyword_index = KeywordIndex(**options) if enabled else None
+    return _keyword_index
+
+
+def get_keyword_index():
+    """Return the active keyword index (None unless configure_keyword_index() enabled one)."""
+    return _keyword_index
+
+
+def _article_keyword_tokens(article):
+    return article.get('keyword_tokens') or re.findall(
+        r'\b[a-zà-ÿ]{3,}\b', f"{article['title']} {article['content_text']}".lower()
+    )
+
+
+def index_article_keywords(keyed_articles, count=5):
+    """
+    Add (doc_id, article) pairs to the active keyword index and precompute their keywords.
+    
+    Each article gets a 'fallback_keywords' entry scored against the updated
+    corpus in one batch, which generate_keywords_fallback() then doesn't
+    have to recompute. Does nothing without an active index.
+    """
+    index = get_keyword_index()
+    if index is None or not keyed_articles:
+        return
+    
+    token_lists = [_article_keyword_tokens(article) for _, article in keyed_articles]
+    index.add_documents(zip((doc_id for doc_id, _ in keyed_articles), token_lists))
+    for (_, article), keywords in zip(keyed_articles, index.keywords_batch(token_lists, count)):
+        article['fallback_keywords'] = ', '.join(keywords)
+
+
+def generate_keywords_fallback(title, content, count=5, tokens=None, index=None):
+    """
+    Fallback: Generate relevant keywords from title and content.
+    
+    Pass tokens (e.g. extract_article()['keyword_tokens']) to skip re-tokenising
+    the full text. With a KeywordIndex, terms are ranked by TF-IDF against the
+    archive instead of raw frequency, so words common to every article drop out.
+    """
+    
+    # Extract words (3+ characters)
+    if tokens is not None:
+        words = tokens
+    else:
+        words = re.findall(r'\b[a-zà-ÿ]{3,}\b', f"{title} {content}".lower())
+    
+    if index is not None:
+        return ', '.join(index.keywords(words, count))
+    
+    # Count word frequency, ignoring stop words
+    word_freq = {}
+    for word in words:
+        if word not in DUTCH_STOP_WORDS:
+            word_freq[word] = word_freq.get(word, 0) + 1
+    
+    # Get top keywords (bounded heap, same order as a stable full sort)
+    top_keywords = heapq.nlargest(count, word_freq.items(), key=lambda x: x[1])
+    
+    return ', '.join([word for word, _ in top_keywords])
+
+
+def generate_preview_fallback(first_paragraph, max_sentences=2):
+    """Fallback: Generate intriguing preview text (1-2 sentences)."""
+    # Split into sentences
+    sentences = re.split(r'[.!?]\s+', first_paragraph)
+    
+    # Take first 1-2 sentences
+    preview_sentences = sentences[:max_sentences]
+    preview = '. '.join(preview_sentences)
+    
+    # Ensure it ends with punctuation
+    if not preview.endswith(('.', '!', '?')):
+        preview += '.'
+    
+    return preview
+
+
+def generate_image_alt_fallback(title, max_length=125):
+    """Fallback: Generate SEO-friendly image alt text."""
+    # More contextual alt text for DutchStartup.ai
+    alt = f"Illustratie bij artikel over {title.lower()}"
+    
+    if len(alt) <= max_length:
+        return alt
+    
+    # Truncate at word boundary
+    truncated = alt[:max_length].rsplit(' ', 1)[0]
+    return truncated
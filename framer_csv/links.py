@@ -0,0 +1,299 @@
+"""
+Concurrent, cached checking of the links in an article's Sources section.
+"""
+
+import html
+import itertools
+import re
+import socket
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from .common import DEFAULT_CACHE_DIR, HTTP_TIMEOUT, logger, _require
+from .metrics import get_metrics
+
+
+# Source links are checked once per TTL across all articles (see LinkChecker)
+LINK_CHECK_MODES = ('annotate', 'fail')
+DEFAULT_LINK_CACHE_PATH = DEFAULT_CACHE_DIR / 'link_cache.sqlite3'
+DEFAULT_LINK_CACHE_TTL_HOURS = 24
+DEFAULT_LINK_CHECK_CONCURRENCY = 16
+DEFAULT_LINK_CHECK_PER_HOST = 4
+LINK_CHECK_USER_AGENT = 'Mozilla/5.0 (compatible; html-to-framer-csv link checker)'
+
+
+class BrokenLinksError(RuntimeError):
+    """Raised when check_links='fail' and an article's Sources contain broken links."""
+    
+    def __init__(self, broken):
+        super().__init__(f"{len(broken)} broken source link(s): {', '.join(broken)}")
+        self.broken = broken
+
+
+class LinkChecker:
+    """
+    Concurrent HTTP checker for source links, with a persistent SQLite result cache.
+    
+    Links are checked with HEAD (or a streamed GET for servers that refuse
+    HEAD) on a pooled session holding at most per_host connections to any one
+    host, and URLs are interleaved by host so one slow site doesn't occupy all
+    threads. A link is broken only on a definite answer: a 4xx response
+    (other than 401, 403, 408 and 429), a host name that doesn't resolve or a
+    malformed URL. Timeouts, refused connections, 5xx responses, 408, 429, and
+    401 and 403 (bot walls and paywalls of live sites) leave it unknown. Definite answers are cached for ttl_hours, unknown ones are
+    checked again next time. With refresh=True every link is checked again.
+    """
+    
+    def __init__(self, path=DEFAULT_LINK_CACHE_PATH, ttl_hours=DEFAULT_LINK_CACHE_TTL_HOURS,
+                 concurrency=DEFAULT_LINK_CHECK_CONCURRENCY, per_host=DEFAULT_LINK_CHECK_PER_HOST,
+                 timeout=HTTP_TIMEOUT, refresh=False):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_hours = ttl_hours
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self.refresh = refresh
+        self._session = None
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('CREATE TABLE IF NOT EXISTS links (url TEXT PRIMARY KEY, error TEXT, checked_at REAL NOT NULL)')
+        self._db.execute('DELETE FROM links WHERE checked_at < ?', (self._oldest(),))
+    
+    def _oldest(self):
+        return time.time() - self.ttl_hours * 3600
+    
+    def _get_session(self):
+        if self._session is None:
+            requests = _require('requests', 'requests')
+            session = requests.Session()
+            # Some sites reject the default python-requests agent outright
+            session.headers['User-Agent'] = LINK_CHECK_USER_AGENT
+            # One pool per host, blocking once per_host connections are busy
+            adapter = requests.adapters.HTTPAdapter(pool_connections=self.concurrency, pool_maxsize=self.per_host,
+                                                    pool_block=True)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._session = session
+        return self._session
+    
+    def _probe(self, url):
+        """Return (None or the reason url is broken or couldn't be checked, whether that's transient)."""
+        session = self._session
+        target = _link_target(url)
+        try:
+            response = session.head(target, allow_redirects=True, timeout=self.timeout)
+            if response.status_code in (403, 405, 501):
+                # HEAD refused: ask for the body without downloading it
+                with session.get(target, allow_redirects=True, timeout=self.timeout, stream=True) as response:
+                    pass
+        except ValueError as e:
+            # Malformed URLs (requests' InvalidURL and friends are ValueErrors too)
+            return type(e).__name__, False
+        except OSError as e:
+            # RequestException is an OSError; only a host that doesn't exist is definite
+            if _is_unknown_host(e):
+                return 'unknown host', False
+            return type(e).__name__, True
+        
+        status = response.status_code
+        if status >= 400:
+            return f"HTTP {status}", status in (401, 403, 408, 429) or status >= 500
+        return None, False
+    
+    def check(self, urls, unknown=None):
+        """
+        Check each unique http(s) URL among urls, using cached results where fresh.
+        
+        Args:
+            urls: URLs to check
+            unknown: Optional dict; URLs that couldn't be checked conclusively are
+                added to it with the reason (they map to None in the result)
+        
+        Returns:
+            Dict mapping each checked URL to None (reachable or unknown) or the reason it's broken
+        """
+        urls = list(dict.fromkeys(url for url in urls if url.startswith(('http://', 'https://'))))
+        results = {}
+        if not self.refresh:
+            with self._lock:
+                for url in urls:
+                    row = self._db.execute('SELECT error FROM links WHERE url = ? AND checked_at >= ?',
+                                           (url, self._oldest())).fetchone()
+                    if row:
+                        results[url] = row[0]
+        
+        metrics = get_metrics()
+        if results:
+            metrics.count('link_cache_hits', len(results))
+        pending = _interleave_by_host([url for url in urls if url not in results])
+        if not pending:
+            return results
+        
+        # Created up front, so all threads share one set of per-host pools
+        self._get_session()
+        with metrics.span('link_check'), ThreadPoolExecutor(max_workers=min(self.concurrency, len(pending))) as pool:
+            probed = list(pool.map(self._probe, pending))
+        
+        now = time.time()
+        with self._lock:
+            self._db.executemany('INSERT OR REPLACE INTO links VALUES (?, ?, ?)', [
+                (url, error, now) for url, (error, transient) in zip(pending, probed) if not transient
+            ])
+        for url, (error, transient) in zip(pending, probed):
+            results[url] = None if transient else error
+            if transient and unknown is not None:
+                unknown[url] = error
+        metrics.count('links_checked', len(pending))
+        return results
+    
+    def close(self):
+        with self._lock:
+            self._db.close()
+        if self._session is not None:
+            self._session.close()
+
+
+def _is_unknown_host(error):
+    """Whether a requests/urllib3 error was caused by a host name that doesn't resolve (not a DNS outage)."""
+    seen = set()
+    pending = [error]
+    while pending:
+        error = pending.pop()
+        if not isinstance(error, BaseException) or id(error) in seen:
+            continue
+        seen.add(id(error))
+        if isinstance(error, socket.gaierror):
+            return error.errno in (socket.EAI_NONAME, getattr(socket, 'EAI_NODATA', socket.EAI_NONAME))
+        # requests wraps urllib3's MaxRetryError, whose reason wraps the socket error
+        pending += [*error.args, getattr(error, 'reason', None), error.__cause__, error.__context__]
+    return False
+
+
+def _link_target(url):
+    """The URL a link leads to, unwrapping Google Docs' www.google.com/url?q=... redirects."""
+    parts = urlsplit(url)
+    if parts.netloc in ('www.google.com', 'google.com') and parts.path == '/url':
+        target = parse_qs(parts.query).get('q')
+        if target and target[0].startswith(('http://', 'https://')):
+            return target[0]
+    return url
+
+
+def _interleave_by_host(urls):
+    """Reorder urls round-robin across their hosts."""
+    by_host = {}
+    for url in urls:
+        by_host.setdefault(urlsplit(_link_target(url)).netloc, []).append(url)
+    return [url for group in itertools.zip_longest(*by_host.values()) for url in group if url is not None]
+
+
+_link_checker = None
+
+
+def configure_link_checker(**options):
+    """
+    (Re)open the link checker used by check_article_links().
+    
+    Args:
+        **options: Passed to LinkChecker (path, ttl_hours, concurrency, per_host, timeout, refresh)
+    
+    Returns:
+        The active LinkChecker
+    """
+    global _link_checker
+    if _link_checker is not None:
+        _link_checker.close()
+    _link_checker = LinkChecker(**options)
+    return _link_checker
+
+
+def get_link_checker():
+    """Return the active link checker, opening the default one on first use."""
+    global _link_checker
+    if _link_checker is None:
+        _link_checker = LinkChecker()
+    return _link_checker
+
+
+# Sources links are always written by FramerHtmlWriter.link(), with the href escaped
+_SOURCE_LINK_RE = re.compile(r'<a href="([^"]*)">')
+
+
+def article_source_links(article):
+    """The hrefs of the links in an article's Sources section, in order."""
+    return [html.unescape(href) for href in _SOURCE_LINK_RE.findall(article['sources_html'])]
+
+
+def check_article_links(articles, mode='annotate', checker=None, unknown=None):
+    """
+    Check the Sources links of many articles together, each unique URL once.
+    
+    In 'annotate' mode the anchors of broken links get a data-link-status
+    attribute with the reason (the article dicts are updated in place); in
+    'fail' mode the articles are left alone for the caller to reject. Links
+    that couldn't be checked conclusively (see LinkChecker) are neither.
+    
+    Args:
+        articles: Dicts returned by extract_article()
+        mode: One of LINK_CHECK_MODES
+        checker: LinkChecker to use (default: get_link_checker())
+        unknown: Optional list; per article, a dict mapping its unchecked links
+            to the reason is appended to it
+    
+    Returns:
+        List with, per article, a dict mapping its broken links to the reason
+    """
+    if mode not in LINK_CHECK_MODES:
+        raise ValueError(f"unknown link check mode '{mode}' (use {', '.join(LINK_CHECK_MODES)})")
+    
+    checker = checker or get_link_checker()
+    links = [article_source_links(article) for article in articles]
+    unchecked = {}
+    results = checker.check(itertools.chain.from_iterable(links), unknown=unchecked)
+    
+    broken_links = []
+    for article, hrefs in zip(articles, links):
+        broken = {href: results[href] for href in hrefs if results.get(href)}
+        if unknown is not None:
+            unknown.append({href: unchecked[href] for href in hrefs if href in unchecked})
+        if broken and mode == 'annotate':
+            def annotate(match):
+                reason = broken.get(html.unescape(match.group(1)))
+                if reason is None:
+                    return match.group(0)
+                return f'<a href="{match.group(1)}" data-link-status="{html.escape(reason)}">'
+            article['sources_html'] = _SOURCE_LINK_RE.sub(annotate, article['sources_html'])
+        broken_links.append(broken)
+    
+    get_metrics().count('links_broken', sum(len(broken) for broken in broken_links))
+    if unchecked:
+        get_metrics().count('links_unknown', len(unchecked))
+    return broken_links
+
+
+def _log_link_results(html_file, broken, unknown):
+    for url, reason in broken.items():
+        logger.warning(f"🔗 Broken link in {html_file}: {url} ({reason})")
+    for url, reason in unknown.items():
+        logger.warning(f"🔗 Couldn't check link in {html_file}: {url} ({reason}), not counted as broken")
+
+
+def _check_one_article_links(html_file, article, mode, unknown=None):
+    """
+    check_article_links() for a single article, logging broken and unchecked
+    links and raising BrokenLinksError in 'fail' mode.
+    """
+    unchecked = []
+    broken = check_article_links([article], mode=mode, unknown=unchecked)[0]
+    _log_link_results(html_file, broken, unchecked[0])
+    if unknown is not None:
+        unknown.update(unchecked[0])
+    if broken and mode == 'fail':
+        raise BrokenLinksError(broken)
+    return broken
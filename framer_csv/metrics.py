@@ -0,0 +1,221 @@
+"""
+Per-stage timings and run counters, exported as JSON Lines or a Prometheus textfile.
+"""
+
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from .common import logger
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class RunMetrics:
+    """
+    Timing spans per conversion stage plus run counters (AI requests, tokens, cache hits, ...).
+    
+    Spans and counts are aggregated in place (calls, total and maximum seconds
+    per stage), which is cheap enough to leave on. Hooks added with add_hook()
+    also receive every event as it happens, as {'type': 'span', 'name',
+    'seconds'} or {'type': 'count', 'name', 'value'}. export() appends one
+    JSON line per export with only what was recorded since the previous export
+    (so one line per run from the CLI, per job in the daemon and per rebuild
+    in watch mode), and/or rewrites a Prometheus textfile with the running
+    totals, if paths were given.
+    """
+    
+    def __init__(self, jsonl_path=None, prometheus_path=None):
+        self.jsonl_path = jsonl_path
+        self.prometheus_path = prometheus_path
+        self.started_at = time.time()
+        self.stages = {}
+        self.counters = {}
+        # Same aggregates since the last export(), for the JSON Lines deltas
+        self.exported_at = self.started_at
+        self.new_stages = {}
+        self.new_counters = {}
+        self.hooks = []
+        self._lock = threading.Lock()
+    
+    def add_hook(self, hook):
+        """Call hook(event) for every span and count from now on."""
+        self.hooks.append(hook)
+    
+    def remove_hook(self, hook):
+        self.hooks.remove(hook)
+    
+    @contextlib.contextmanager
+    def span(self, name):
+        """Time the enclosed block as one span of stage name."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_span(name, time.perf_counter() - started)
+    
+    def record_span(self, name, seconds):
+        with self._lock:
+            for stages in (self.stages, self.new_stages):
+                stage = stages.get(name)
+                if stage is None:
+                    stage = stages[name] = [0, 0.0, 0.0]
+                stage[0] += 1
+                stage[1] += seconds
+                stage[2] = max(stage[2], seconds)
+        if self.hooks:
+            self._emit({'type': 'span', 'name': name, 'seconds': seconds})
+    
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+            self.new_counters[name] = self.new_counters.get(name, 0) + value
+        if self.hooks:
+            self._emit({'type': 'count', 'name': name, 'value': value})
+    
+    def replay(self, event):
+        """Record an event captured elsewhere (e.g. by a hook in a worker process)."""
+        if event['type'] == 'span':
+            self.record_span(event['name'], event['seconds'])
+        else:
+            self.count(event['name'], event['value'])
+    
+    def _emit(self, event):
+        for hook in list(self.hooks):
+            try:
+                hook(event)
+            except Exception as e:
+                logger.warning(f"Warning: metrics hook failed ({e})")
+    
+    def snapshot(self):
+        """JSON-serialisable totals so far."""
+        with self._lock:
+            return self._summary(self.started_at, self.stages, self.counters)
+    
+    def take_delta(self):
+        """JSON-serialisable aggregates since the previous take_delta() (or the start), then start a new interval."""
+        with self._lock:
+            delta = self._summary(self.exported_at, self.new_stages, self.new_counters)
+            self.exported_at = time.time()
+            self.new_stages = {}
+            self.new_counters = {}
+        return delta
+    
+    @staticmethod
+    def _summary(started_at, stages, counters):
+        return {
+            'started_at': datetime.fromtimestamp(started_at).isoformat(timespec='seconds'),
+            'elapsed_seconds': round(time.time() - started_at, 3),
+            'stages': {
+                name: {'count': count, 'seconds': round(total, 6), 'max_seconds': round(longest, 6)}
+                for name, (count, total, longest) in stages.items()
+            },
+            'counters': dict(counters),
+        }
+    
+    def prometheus_text(self, prefix='framer_csv'):
+        """Totals so far in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = [
+            f"# HELP {prefix}_stage_seconds Time spent per conversion stage.",
+            f"# TYPE {prefix}_stage_seconds summary",
+        ]
+        for name, stage in snapshot['stages'].items():
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {stage["seconds"]}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {stage["count"]}')
+        lines.append(f"# HELP {prefix}_stage_seconds_max Longest single span per conversion stage.")
+        lines.append(f"# TYPE {prefix}_stage_seconds_max gauge")
+        for name, stage in snapshot['stages'].items():
+            lines.append(f'{prefix}_stage_seconds_max{{stage="{name}"}} {stage["max_seconds"]}')
+        for name, value in sorted(snapshot['counters'].items()):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+        lines.append(f"# TYPE {prefix}_run_started_seconds gauge")
+        lines.append(f"{prefix}_run_started_seconds {self.started_at:.3f}")
+        return '\n'.join(lines) + '\n'
+    
+    def export(self):
+        """
+        Append what was recorded since the previous export to jsonl_path and
+        atomically rewrite prometheus_path with the totals (either may be None).
+        """
+        if self.jsonl_path:
+            # Deltas, so summing the lines of a long-running daemon gives its totals
+            delta = self.take_delta()
+            with open(self.jsonl_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(delta, ensure_ascii=False) + '\n')
+        if self.prometheus_path:
+            # Atomic, so the node exporter never reads a half-written textfile
+            path = Path(self.prometheus_path)
+            handle, temp_path = tempfile.mkstemp(dir=path.parent or '.', suffix='.tmp')
+            try:
+                with os.fdopen(handle, 'w', encoding='utf-8') as f:
+                    f.write(self.prometheus_text())
+                os.replace(temp_path, path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+
+
+_metrics = RunMetrics()
+
+
+def configure_metrics(**options):
+    """
+    Start a fresh RunMetrics (hooks of the previous one are dropped).
+    
+    Args:
+        **options: Passed to RunMetrics (jsonl_path, prometheus_path)
+    
+    Returns:
+        The new RunMetrics
+    """
+    global _metrics
+    _metrics = RunMetrics(**options)
+    return _metrics
+
+
+def get_metrics():
+    """Return the active RunMetrics; every conversion records into it."""
+    return _metrics
+
+
+@contextlib.contextmanager
+def collect_metric_events():
+    """
+    Record into a fresh RunMetrics for the enclosed block, yielding the list
+    its events are appended to; the active RunMetrics is restored afterwards.
+    """
+    global _metrics
+    events = []
+    previous, _metrics = _metrics, RunMetrics()
+    _metrics.add_hook(events.append)
+    try:
+        yield events
+    finally:
+        _metrics = previous
+
+
+def peak_memory_mb(children=False):
+    """
+    Peak resident memory of this process in MB (None if unknown).
+    
+    With children=True, the peak of the largest finished child process (such
+    as a batch worker) instead. Processes peak at different times, so the
+    two are never added up.
+    """
+    if resource is None:
+        return None
+    
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
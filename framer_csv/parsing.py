@@ -0,0 +1,1190 @@
+"""
+Google Docs HTML export parsing: the parser backends (BeautifulSoup trees and the
+streaming and low-memory parsers) and rendering to Framer-compatible HTML.
+"""
+
+import base64
+import binascii
+import codecs
+import hashlib
+import html
+import importlib.util
+import itertools
+import os
+import re
+import tempfile
+import time
+from functools import partial
+from html.parser import HTMLParser
+from pathlib import Path
+
+from .common import _new_file_mode, logger, _require
+from .metrics import get_metrics
+
+
+# Bound by _load_bs4() on first use; the 'stream' backend never needs them
+BeautifulSoup = CData = NavigableString = None
+
+
+def _load_bs4():
+    """Import BeautifulSoup on first use (the 'stream' parser backend doesn't need it)."""
+    global BeautifulSoup, CData, NavigableString
+    if BeautifulSoup is None:
+        bs4 = _require('bs4', 'beautifulsoup4')
+        BeautifulSoup, CData, NavigableString = bs4.BeautifulSoup, bs4.CData, bs4.NavigableString
+
+
+_CSS_COMMENT_RE = re.compile(r'/\*.*?\*/', re.DOTALL)
+_CSS_RULE_RE = re.compile(r'([^{}]+)\{([^{}]*)\}')
+_CSS_CLASS_SELECTOR_RE = re.compile(r'^\.(-?[_a-zA-Z][\w-]*)$')
+_FORMATTING_PROPERTIES = ('font-weight', 'font-style', 'text-decoration', 'text-decoration-line')
+
+
+class ClassStyleIndex:
+    """
+    Lookup table from Google Docs generated class names to text formatting.
+    
+    Google Docs assigns class names (c9, c26, ...) per document, so the
+    document's own <style> block is parsed once into class -> formatting
+    properties. Each distinct class attribute is resolved once (later rules
+    win, as in the CSS cascade) and memoised, so rendering a span is a dict
+    lookup. Without any class rules the historical c9 = bold, c26 = italic
+    mapping is used.
+    """
+    
+    LEGACY_CLASS_STYLES = {'c9': frozenset(['bold']), 'c26': frozenset(['italic'])}
+    
+    def __init__(self, css_text=''):
+        self._rules = {}
+        self._memo = {}
+        self._order = 0
+        self._pending = ''
+        self.feed(css_text)
+    
+    def feed(self, css_text):
+        """Add stylesheet text; rules may be split across calls (only the open rule is buffered)."""
+        pending = self._pending + css_text
+        comment_start = pending.rfind('/*')
+        limit = comment_start if comment_start >= 0 and pending.find('*/', comment_start) < 0 else len(pending)
+        end = pending.rfind('}', 0, limit) + 1
+        self._pending = pending[end:]
+        if not end:
+            return
+        
+        self._memo.clear()
+        for selectors, declarations in _CSS_RULE_RE.findall(_CSS_COMMENT_RE.sub('', pending[:end])):
+            properties = {}
+            for declaration in declarations.split(';'):
+                name, _, value = declaration.partition(':')
+                name = name.strip().lower()
+                if name in _FORMATTING_PROPERTIES:
+                    self._order += 1
+                    properties[name] = (self._order, value.replace('!important', '').strip().lower())
+            for selector in selectors.split(','):
+                match = _CSS_CLASS_SELECTOR_RE.match(selector.strip())
+                if match:
+                    self._rules.setdefault(match.group(1), {}).update(properties)
+    
+    def formatting(self, classes):
+        """Return the formatting flags ('bold', 'italic', 'underline') for a span's classes."""
+        key = tuple(classes)
+        flags = self._memo.get(key)
+        if flags is None:
+            flags = self._memo[key] = self._resolve(classes)
+        return flags
+    
+    def _resolve(self, classes):
+        if not self._rules:
+            return frozenset().union(*(self.LEGACY_CLASS_STYLES.get(c, ()) for c in classes))
+        
+        properties = {}
+        for c in classes:
+            for name, declared in self._rules.get(c, {}).items():
+                if name not in properties or declared[0] > properties[name][0]:
+                    properties[name] = declared
+        
+        flags = set()
+        weight = properties.get('font-weight', (0, ''))[1]
+        if weight in ('bold', 'bolder') or (weight.isdigit() and int(weight) >= 600):
+            flags.add('bold')
+        if properties.get('font-style', (0, ''))[1] in ('italic', 'oblique'):
+            flags.add('italic')
+        decoration = max(properties.get('text-decoration', (0, '')), properties.get('text-decoration-line', (0, '')))
+        if 'underline' in decoration[1]:
+            flags.add('underline')
+        return frozenset(flags)
+
+
+_SPACE_RUN_RE = re.compile(r' {2,}')
+
+
+def _collapse_spaces(text):
+    """Collapse runs of spaces to one, as Framer's rich text would."""
+    return _SPACE_RUN_RE.sub(' ', text) if '  ' in text else text
+
+
+class FramerHtmlWriter:
+    """
+    Single-buffer emitter for Framer rich-text HTML.
+    
+    Fragments are appended to one list and joined once at the end. Paragraph
+    bookkeeping happens while writing: the separator space between inline
+    pieces is only written once another piece follows it, paragraphs that
+    receive no content are never emitted, and runs of spaces inside text are
+    collapsed as the text is written.
+    """
+    
+    __slots__ = ('parts', '_space', '_empty_paragraph')
+    
+    def __init__(self):
+        self.parts = []
+        self._space = False
+        self._empty_paragraph = False
+    
+    def block(self, markup):
+        """Write block-level markup (heading, table) outside any paragraph."""
+        self.parts.append(markup)
+    
+    def open_paragraph(self):
+        self.parts.append('<p>')
+        self._space = False
+        self._empty_paragraph = True
+    
+    def close_paragraph(self):
+        if self._empty_paragraph:
+            self.parts.pop()  # the '<p>' is still the last fragment
+        else:
+            self.parts.append('</p>')
+        self._space = False
+        self._empty_paragraph = False
+    
+    def break_paragraph(self):
+        """End the current paragraph and start a new one."""
+        self.close_paragraph()
+        self.open_paragraph()
+    
+    def space(self):
+        """Request a separator before the next inline piece."""
+        self._space = True
+    
+    def _inline(self, fragment, space_after=True):
+        if self._space:
+            self.parts.append(' ')
+        self.parts.append(fragment)
+        self._space = space_after
+        self._empty_paragraph = False
+    
+    def text(self, text):
+        if text:
+            self._inline(_collapse_spaces(text))
+    
+    def strong(self, text):
+        self._inline(f'<strong>{_collapse_spaces(text)}</strong>')
+    
+    def emphasis(self, text, space_after=True):
+        self._inline(f'<em>{_collapse_spaces(text)}</em>', space_after)
+    
+    def link(self, href, text):
+        self._inline(f'<a href="{html.escape(href)}">{_collapse_spaces(text)}</a>')
+    
+    def getvalue(self):
+        return ''.join(self.parts)
+
+
+def _write_span(writer, text_content, formatting, is_content):
+    """Write one Google Docs span according to its resolved formatting."""
+    if 'bold' in formatting:
+        writer.strong(text_content)
+    elif 'italic' in formatting:
+        if is_content:
+            # Close current p and start new one for italic
+            writer.break_paragraph()
+            writer.emphasis(text_content, space_after=False)
+        else:
+            writer.emphasis(text_content)
+    elif text_content:
+        writer.text(text_content)
+    else:
+        # An empty span still separates its neighbours
+        writer.space()
+
+
+def _render_cell(tag, segments):
+    """Render a table cell from its text runs and nested table markup."""
+    parts = [f'<{tag}>']
+    for is_table, segment in segments:
+        parts.append(segment if is_table else segment.strip())
+    parts.append(f'</{tag}>')
+    return ''.join(parts)
+
+
+def _table_to_html(table):
+    """Render a table (and any nested tables inside its cells) without the leading blank line."""
+    _load_bs4()
+    parts = ['<table>']
+    for row in table.find_all('tr'):
+        if row.find_parent('table') is not table:
+            continue  # belongs to a nested table
+        parts.append('<tr>')
+        for cell in row.find_all(['td', 'th']):
+            if cell.find_parent(['tr', 'table']) is not row:
+                continue
+            segments = []
+            _collect_cell_segments(cell, segments, [])
+            parts.append(_render_cell(cell.name, segments))
+        parts.append('</tr>')
+    parts.append('</table>')
+    return ''.join(parts)
+
+
+def _collect_cell_segments(node, segments, text):
+    """Gather a cell's text runs and rendered nested tables in document order."""
+    for child in node.children:
+        if child.name is None:
+            if type(child) in (NavigableString, CData):
+                text.append(child)
+        elif child.name == 'table':
+            if text:
+                segments.append((False, ''.join(text)))
+                text.clear()
+            segments.append((True, _table_to_html(child)))
+        else:
+            _collect_cell_segments(child, segments, text)
+    if node.name in ('td', 'th') and text:
+        segments.append((False, ''.join(text)))
+        text.clear()
+
+
+def write_element_html(elem, writer, is_content=True, class_styles=None):
+    """
+    Render a BeautifulSoup element as Framer-compatible HTML into writer.
+    
+    class_styles is the document's ClassStyleIndex; spans resolve to bold or
+    italic through it (default: the legacy c9/c26 mapping).
+    """
+    
+    if class_styles is None:
+        class_styles = _LEGACY_CLASS_STYLE_INDEX
+    
+    if elem.name == 'p':
+        writer.open_paragraph()
+        
+        for child in elem.children:
+            if isinstance(child, str):
+                writer.text(child.strip())
+            elif child.name == 'span':
+                formatting = class_styles.formatting(child.get('class', []))
+                _write_span(writer, child.get_text().strip(), formatting, is_content)
+            elif child.name == 'a':
+                writer.link(child.get('href', ''), child.get_text())
+            elif child.name == 'br':
+                # BR creates new paragraph
+                if is_content:
+                    writer.break_paragraph()
+        
+        writer.close_paragraph()
+    
+    elif elem.name in ['h2', 'h3']:
+        text = elem.get_text().strip()
+        writer.block(f'<h2>{text}</h2>')
+    
+    elif elem.name == 'table':
+        # Only ONE blank line before table
+        writer.block('<p><br></p>' + _table_to_html(elem))
+
+
+def element_to_html(elem, is_content=True, class_styles=None):
+    """Convert BeautifulSoup element to clean Framer-compatible HTML."""
+    writer = FramerHtmlWriter()
+    write_element_html(elem, writer, is_content, class_styles)
+    return writer.getvalue()
+
+
+_LEGACY_CLASS_STYLE_INDEX = ClassStyleIndex()
+
+
+# Tag sets mirroring BeautifulSoup's html.parser tree builder, so the
+# streaming backend sees the same element structure and text.
+VOID_ELEMENTS = frozenset([
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link',
+    'menuitem', 'meta', 'param', 'source', 'track', 'wbr', 'basefont', 'bgsound',
+    'command', 'frame', 'image', 'isindex', 'nextid', 'spacer'
+])
+_STRING_CONTAINER_TAGS = frozenset(['rt', 'rp', 'style', 'script', 'template'])
+_PRESERVE_WHITESPACE_TAGS = frozenset(['pre', 'textarea'])
+_ASCII_SPACES = frozenset('\x20\x0a\x09\x0c\x0d')
+
+# Start tags that end an unclosed <p>, as in lxml's (libxml2's) tree repair
+_CLOSES_OPEN_P = frozenset([
+    'address', 'blockquote', 'center', 'dd', 'dir', 'div', 'dl', 'dt', 'fieldset', 'form',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'li', 'listing', 'menu', 'ol', 'p', 'pre',
+    'table', 'ul', 'xmp'
+])
+# Elements that are never article content when the document has no <body>
+_DOCUMENT_FRAME_TAGS = frozenset(['html', 'head', 'body'])
+
+
+class _ParagraphRenderer:
+    """Streaming counterpart of write_element_html() for <p> elements."""
+    
+    def __init__(self, writer, is_content, class_styles):
+        self.writer = writer
+        self.is_content = is_content
+        self.class_styles = class_styles
+        self.child = None
+        self.child_attrs = None
+        self.child_text = []
+        writer.open_paragraph()
+    
+    def start(self, name, attrs, depth):
+        if depth != 1:
+            return
+        if name == 'br':
+            # BR creates new paragraph
+            if self.is_content:
+                self.writer.break_paragraph()
+        self.child = name
+        self.child_attrs = attrs
+        self.child_text = []
+    
+    def text(self, text, depth, is_text):
+        if depth == 0:
+            self.writer.text(text.strip())
+        elif is_text and self.child in ('span', 'a'):
+            self.child_text.append(text)
+    
+    def end(self, name, depth):
+        if depth != 1:
+            return
+        text = ''.join(self.child_text)
+        if name == 'span':
+            formatting = self.class_styles.formatting(self.child_attrs.get('class', '').split())
+            _write_span(self.writer, text.strip(), formatting, self.is_content)
+        elif name == 'a':
+            self.writer.link(self.child_attrs.get('href', ''), text)
+        self.child = None
+    
+    def close(self):
+        self.writer.close_paragraph()
+
+
+class _HeadingRenderer:
+    """Streaming counterpart of write_element_html() for <h2>/<h3> elements."""
+    
+    def __init__(self, writer):
+        self.writer = writer
+        self.parts = []
+    
+    def start(self, name, attrs, depth):
+        pass
+    
+    def text(self, text, depth, is_text):
+        if is_text:
+            self.parts.append(text)
+    
+    def end(self, name, depth):
+        pass
+    
+    def close(self):
+        self.writer.block(f"<h2>{''.join(self.parts).strip()}</h2>")
+
+
+class _StreamingTable:
+    """Rows and cells of one (possibly nested) table being tokenized."""
+    
+    def __init__(self, depth):
+        self.depth = depth
+        self.parts = ['<table>']
+        self.open_rows = []
+        self.open_cells = []
+    
+    def flush_text(self):
+        for _, _, segments, text in self.open_cells:
+            if text:
+                segments.append((False, ''.join(text)))
+                text.clear()
+
+
+class _TableRenderer:
+    """Streaming counterpart of write_element_html() for <table> elements."""
+    
+    def __init__(self, writer):
+        self.writer = writer
+        self.tables = [_StreamingTable(0)]
+    
+    def start(self, name, attrs, depth):
+        table = self.tables[-1]
+        if name == 'table':
+            table.flush_text()
+            self.tables.append(_StreamingTable(depth))
+        elif name == 'tr':
+            # Reserve the row's slot so rows keep document order
+            table.open_rows.append((depth, [], len(table.parts)))
+            table.parts.append('')
+        elif name in ('td', 'th') and table.open_rows and table.open_rows[-1][0] > table.depth:
+            cell = (depth, name, [], [])
+            table.open_rows[-1][1].append(cell)
+            table.open_cells.append(cell)
+    
+    def text(self, text, depth, is_text):
+        if is_text:
+            for _, _, _, cell_text in self.tables[-1].open_cells:
+                cell_text.append(text)
+    
+    def end(self, name, depth):
+        table = self.tables[-1]
+        if table.depth == depth and len(self.tables) > 1:
+            # Nested table closed: it becomes a segment of the enclosing cells
+            self.tables.pop()
+            html = self._close_table(table)
+            parent = self.tables[-1]
+            parent.flush_text()
+            for _, _, segments, _ in parent.open_cells:
+                segments.append((True, html))
+        elif table.open_cells and table.open_cells[-1][0] == depth:
+            table.flush_text()
+            table.open_cells.pop()
+        elif table.open_rows and table.open_rows[-1][0] == depth:
+            self._close_row(table)
+    
+    def _close_row(self, table):
+        _, cells, slot = table.open_rows.pop()
+        table.parts[slot] = '<tr>' + ''.join(_render_cell(tag, segments) for _, tag, segments, _ in cells) + '</tr>'
+    
+    def _close_table(self, table):
+        table.flush_text()
+        while table.open_rows:
+            self._close_row(table)
+        table.parts.append('</table>')
+        return ''.join(table.parts)
+    
+    def close(self):
+        while len(self.tables) > 1:
+            self.end('table', self.tables[-1].depth)
+        # Only ONE blank line before table
+        self.writer.block('<p><br></p>' + self._close_table(self.tables[0]))
+
+
+def _element_renderer(name, writer, is_content, class_styles):
+    """Pick the streaming renderer for a top-level body element (None renders nothing)."""
+    if name == 'p':
+        return _ParagraphRenderer(writer, is_content, class_styles)
+    if name in ['h2', 'h3']:
+        return _HeadingRenderer(writer)
+    if name == 'table':
+        return _TableRenderer(writer)
+    return None
+
+
+class _StreamingArticleParser(HTMLParser):
+    """
+    Tree-less article extractor built on the stdlib HTML tokenizer.
+    
+    Tracks only the stack of open tag names and renders each top-level body
+    element to Framer HTML as soon as it closes, following the same nesting,
+    whitespace and string-type rules as BeautifulSoup's html.parser backend.
+    An unclosed <p> ended by a block element (see _close_implied_paragraphs())
+    stays on the tag stack, so end tags match as in html.parser, but is left
+    out of open_elements, the element structure that is rendered.
+    """
+    
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack = []
+        self.ended = []
+        self.open_elements = []
+        self.already_closed = []
+        self.pending = []
+        self.text_parts = []
+        self.body_depth = None
+        self.in_body = False
+        self.found_hr = False
+        self.containers = 0
+        self.preserve_whitespace = 0
+        self.open_headings = {}
+        self.headings = {}
+        self.class_styles = ClassStyleIndex()
+        self.element = None
+        self.content = FramerHtmlWriter()
+        self.sources = FramerHtmlWriter()
+    
+    # Tokenizer callbacks
+    
+    def handle_starttag(self, tag, attrs):
+        self._flush()
+        self._close_implied_paragraph(tag)
+        self._open(tag, attrs)
+        if tag in VOID_ELEMENTS:
+            self._close_top()
+            # A later explicit end tag for it is redundant and ignored
+            self.already_closed.append(tag)
+    
+    def handle_startendtag(self, tag, attrs):
+        self._flush()
+        self._close_implied_paragraph(tag)
+        self._open(tag, attrs)
+        self._close_top()
+    
+    def handle_endtag(self, tag):
+        if tag in self.already_closed:
+            self.already_closed.remove(tag)
+            return
+        self._flush()
+        if tag in VOID_ELEMENTS or tag not in self.stack:
+            return
+        while self.stack:
+            if self._close_top() == tag:
+                break
+    
+    def handle_data(self, data):
+        self.pending.append(data)
+    
+    def handle_comment(self, data):
+        self._special_string(data)
+    
+    def handle_decl(self, decl):
+        self._special_string(decl[len('DOCTYPE '):])
+    
+    def handle_pi(self, data):
+        self._special_string(data)
+    
+    def unknown_decl(self, data):
+        if data.upper().startswith('CDATA['):
+            self._special_string(data[len('CDATA['):], is_text=True)
+        else:
+            self._special_string(data)
+    
+    def close(self):
+        super().close()
+        self._flush()
+        while self.stack:
+            self._close_top()
+    
+    # Tree-less bookkeeping
+    
+    def _close_implied_paragraph(self, tag):
+        # Same repair as _close_implied_paragraphs() on the html.parser tree
+        if tag in _CLOSES_OPEN_P and self.stack and self.stack[-1] == 'p' and not self.ended[-1]:
+            self._end_element()
+            self.ended[-1] = True
+    
+    def _at_document_top(self, depth):
+        # Child of the document or of a top-level <html>
+        return depth == 1 or (depth == 2 and self.open_elements[0] == 'html')
+    
+    def _open(self, tag, attrs):
+        attrs = {key: '' if value is None else value for key, value in attrs}
+        self.stack.append(tag)
+        self.ended.append(False)
+        self.open_elements.append(tag)
+        depth = len(self.open_elements)
+        
+        if tag in _STRING_CONTAINER_TAGS:
+            self.containers += 1
+        if tag in _PRESERVE_WHITESPACE_TAGS:
+            self.preserve_whitespace += 1
+        if tag == 'body' and self.body_depth is None and self._at_document_top(depth):
+            self.body_depth = depth
+            self.in_body = True
+        if tag in ('h1', 'h4') and tag not in self.headings and tag not in self.open_headings:
+            self.open_headings[tag] = (depth, [])
+        
+        if self.element is not None:
+            element_depth, renderer = self.element
+            if renderer:
+                renderer.start(tag, attrs, depth - element_depth)
+        elif ((self.in_body and depth == self.body_depth + 1)
+              or (tag not in _DOCUMENT_FRAME_TAGS and self._at_document_top(depth))):
+            # Split top-level body (or document) elements at the HR into content and sources
+            renderer = None
+            if tag == 'hr':
+                self.found_hr = True
+            elif self.found_hr:
+                if tag != 'h2':
+                    renderer = _element_renderer(tag, self.sources, False, self.class_styles)
+            elif tag not in ['h1', 'h4']:  # Skip title and first paragraph
+                renderer = _element_renderer(tag, self.content, True, self.class_styles)
+            self.element = (depth, renderer)
+    
+    def _close_top(self):
+        tag = self.stack.pop()
+        if not self.ended.pop():
+            self._end_element()
+        return tag
+    
+    def _end_element(self):
+        depth = len(self.open_elements)
+        tag = self.open_elements.pop()
+        
+        if tag in _STRING_CONTAINER_TAGS:
+            self.containers -= 1
+        if tag in _PRESERVE_WHITESPACE_TAGS:
+            self.preserve_whitespace -= 1
+        if tag == 'body' and depth == self.body_depth:
+            self.in_body = False
+        if tag in self.open_headings and self.open_headings[tag][0] == depth:
+            self.headings[tag] = ''.join(self.open_headings.pop(tag)[1]).strip()
+        
+        if self.element is not None:
+            element_depth, renderer = self.element
+            if depth == element_depth:
+                if renderer:
+                    renderer.close()
+                self.element = None
+            elif renderer:
+                renderer.end(tag, depth - element_depth)
+    
+    def _flush(self):
+        if self.pending:
+            text = ''.join(self.pending)
+            self.pending = []
+            self._string(text, is_text=not self.containers)
+    
+    def _special_string(self, text, is_text=False):
+        self._flush()
+        self._string(text, is_text)
+    
+    def _string(self, text, is_text):
+        # Whitespace-only strings collapse to one space or newline, as in bs4
+        if not self.preserve_whitespace and all(c in _ASCII_SPACES for c in text):
+            text = '\n' if '\n' in text else ' '
+        
+        if self.open_elements and self.open_elements[-1] == 'style':
+            self.class_styles.feed(text)
+        
+        if is_text:
+            self.text_parts.append(text)
+            for _, parts in self.open_headings.values():
+                parts.append(text)
+        
+        if self.element is not None:
+            element_depth, renderer = self.element
+            if renderer:
+                renderer.text(text, len(self.open_elements) - element_depth, is_text)
+
+
+_LOW_MEMORY_MARKER_RE = re.compile(
+    r'''(?P<prefix>=\s*(?P<quote>["']?)|url\(\s*(?P<url_quote>["']?))data:|<(?P<raw>style|script)\b''', re.I
+)
+_STYLE_MARKER_RE = re.compile(r'''(?P<end></style)|(?P<prefix>url\(\s*(?P<url_quote>["']?))data:''', re.I)
+_SCRIPT_END_RE = re.compile(r'</script', re.I)
+_UNQUOTED_VALUE_END_RE = re.compile(r'[\s>]')
+_DATA_URI_EXTENSIONS = {'image/png': '.png', 'image/jpeg': '.jpg', 'image/gif': '.gif',
+                        'image/webp': '.webp', 'image/svg+xml': '.svg'}
+
+
+class _LowMemoryHtmlFilter:
+    """
+    Chunk-level pre-filter for huge Google Docs exports.
+    
+    Removes data: URIs and the bodies of <script> and <style> elements from
+    the raw HTML before the tokenizer would buffer them. Style bodies are
+    handed to css_sink instead, and base64 data: URIs are decoded
+    incrementally into assets_dir (content-addressed file names) when given,
+    their attribute value then pointing at the written file. Only a few
+    characters of look-behind are carried between chunks.
+    """
+    
+    LOOKBEHIND = 16
+    
+    def __init__(self, css_sink=None, assets_dir=None):
+        self.css_sink = css_sink
+        self.assets_dir = Path(assets_dir) if assets_dir else None
+        self.carry = ''
+        self.raw_elem = None
+        self.raw_tag_open = False
+        self.uri_end = None
+        self.uri_header = None
+        self.asset = None
+        self.dropped_chars = 0
+        self.assets = []
+    
+    def feed(self, chunk, final=False):
+        """Filter the next chunk of HTML; pass final=True with the last chunk."""
+        data = self.carry + chunk
+        self.carry = ''
+        self._out = []
+        i = 0
+        n = len(data)
+        
+        while i < n:
+            if self.uri_end is not None:
+                i = self._read_uri(data, i)
+            elif self.raw_elem and self.raw_tag_open:
+                # Still inside the <style ...> / <script ...> start tag
+                j = data.find('>', i)
+                if j < 0:
+                    self._emit(data[i:])
+                    break
+                self._emit(data[i:j + 1])
+                self.raw_tag_open = False
+                i = j + 1
+            elif self.raw_elem:
+                pattern = _STYLE_MARKER_RE if self.raw_elem == 'style' else _SCRIPT_END_RE
+                match = pattern.search(data, i)
+                if not match or (match.end() >= n - 1 and not final):
+                    i = self._hold_back(data, i, match, final)
+                elif self.raw_elem == 'script' or match.group('end'):
+                    self._emit(data[i:match.start()])
+                    self.raw_elem = None
+                    self._out.append(data[match.start():match.end()])
+                    i = match.end()
+                else:
+                    i = self._start_uri(data, i, match)
+            else:
+                match = _LOW_MEMORY_MARKER_RE.search(data, i)
+                if not match or (match.end() >= n - 1 and not final):
+                    i = self._hold_back(data, i, match, final)
+                elif match.group('raw'):
+                    self._emit(data[i:match.end()])
+                    self.raw_elem = match.group('raw').lower()
+                    self.raw_tag_open = True
+                    i = match.end()
+                else:
+                    i = self._start_uri(data, i, match)
+        
+        if final and self.uri_end is not None:
+            self._emit(self._finish_uri())
+        return ''.join(self._out)
+    
+    def _hold_back(self, data, i, match, final):
+        """Emit everything except a tail that might hold a marker split across chunks."""
+        n = len(data)
+        keep = 0 if final else min(self.LOOKBEHIND, n - i)
+        if match:
+            keep = max(keep, n - match.start())
+        self._emit(data[i:n - keep])
+        self.carry = data[n - keep:]
+        return n
+    
+    def _emit(self, text):
+        if not text:
+            return
+        if self.raw_elem == 'style' and not self.raw_tag_open:
+            if self.css_sink:
+                self.css_sink(text)
+        elif self.raw_elem == 'script' and not self.raw_tag_open:
+            pass
+        else:
+            self._out.append(text)
+    
+    def _start_uri(self, data, i, match):
+        prefix_end = match.end('prefix')
+        self._emit(data[i:prefix_end])
+        attr_quote = match.groupdict().get('quote')
+        quote = attr_quote or match.group('url_quote')
+        if quote:
+            self.uri_end = quote
+        elif attr_quote is None:
+            self.uri_end = ')'
+        else:
+            self.uri_end = _UNQUOTED_VALUE_END_RE
+        self.uri_header = ''
+        return match.end()
+    
+    def _read_uri(self, data, i):
+        if isinstance(self.uri_end, str):
+            j = data.find(self.uri_end, i)
+        else:
+            match = self.uri_end.search(data, i)
+            j = match.start() if match else -1
+        payload = data[i:] if j < 0 else data[i:j]
+        
+        if self.uri_header is not None:
+            # Still reading the "image/png;base64," header
+            comma = payload.find(',')
+            if comma < 0:
+                self.uri_header += payload
+                payload = ''
+            else:
+                self.uri_header += payload[:comma]
+                payload = payload[comma + 1:]
+                self._open_asset(self.uri_header)
+                self.uri_header = None
+        
+        self.dropped_chars += len(payload)
+        if self.asset:
+            self._write_asset(payload)
+        
+        if j < 0:
+            return len(data)
+        self._emit(self._finish_uri())
+        return j
+    
+    def _open_asset(self, header):
+        media_type, _, encoding = header.partition(';')
+        if self.assets_dir and encoding.lower() == 'base64':
+            self.assets_dir.mkdir(parents=True, exist_ok=True)
+            handle, path = tempfile.mkstemp(dir=self.assets_dir, suffix='.part')
+            # mkstemp() files are private; assets are published like every other output
+            os.chmod(path, _new_file_mode())
+            self.asset = {
+                'file': os.fdopen(handle, 'wb'),
+                'path': path,
+                'hash': hashlib.sha256(),
+                'pending': '',
+                'extension': _DATA_URI_EXTENSIONS.get(media_type.lower(), '.bin'),
+            }
+    
+    def _write_asset(self, payload, final=False):
+        asset = self.asset
+        encoded = asset['pending'] + ''.join(payload.split())
+        usable = len(encoded) if final else len(encoded) - len(encoded) % 4
+        asset['pending'] = encoded[usable:]
+        if usable:
+            decoded = base64.b64decode(encoded[:usable] + '=' * (-usable % 4))
+            asset['hash'].update(decoded)
+            asset['file'].write(decoded)
+    
+    def _finish_uri(self):
+        """Close the current data: URI and return its replacement value."""
+        asset = self.asset
+        self.uri_end = None
+        self.uri_header = None
+        self.asset = None
+        if not asset:
+            return ''
+        try:
+            self.asset = asset
+            self._write_asset('', final=True)
+        except (ValueError, binascii.Error):
+            pass
+        finally:
+            self.asset = None
+            asset['file'].close()
+        target = self.assets_dir / (asset['hash'].hexdigest()[:16] + asset['extension'])
+        os.replace(asset['path'], target)
+        self.assets.append(str(target))
+        return str(target)
+
+
+_WORD_RE = re.compile(r'\w+')
+_KEYWORD_TOKEN_RE = re.compile(r'[a-zà-ÿ]{3,}')
+_NON_SPACE_RE = re.compile(r'\S+')
+
+
+def _keyword_tokens(words):
+    """Lowercased keyword candidates (3+ letters) from a sequence of \\w+ tokens."""
+    tokens = []
+    for word in words:
+        word = word.lower()
+        if _KEYWORD_TOKEN_RE.fullmatch(word):
+            tokens.append(word)
+    return tokens
+
+
+PARSER_BACKENDS = ('html.parser', 'lxml', 'stream')
+
+
+def available_parser_backends():
+    """Return the parser backends usable in this environment."""
+    has_bs4 = importlib.util.find_spec('bs4') is not None
+    return tuple(
+        b for b in PARSER_BACKENDS
+        if b == 'stream' or (has_bs4 and (b != 'lxml' or importlib.util.find_spec('lxml')))
+    )
+
+
+def extract_article(html_content, parser='html.parser'):
+    """
+    Parse a Google Docs HTML export into the fields needed for a Framer row.
+    
+    The parsed tree is walked once: the same traversal finds the title (first
+    H1) and first paragraph (first H4), splits the body children at the HR into
+    content and sources, and collects the document text. That text is then
+    tokenised once for the word count, the 200-word preview and the keyword
+    token stream used by generate_keywords_fallback().
+    
+    Google Docs exports come out the same with every backend. For malformed
+    HTML, the repairs lxml makes to the tree are applied to the others too:
+    elements outside <body> (or without one) are top-level elements, and a
+    block element ends an unclosed <p> (see _close_implied_paragraphs()).
+    lxml's other repairs, such as ending a <b> or <i> left open in a
+    paragraph when the next <p> starts, are not reproduced;
+    compare_parser_backends() finds them in a corpus.
+    
+    Args:
+        html_content: HTML source
+        parser: 'html.parser' (default), 'lxml' (if installed) or 'stream'
+            (tree-less tokenizer, see extract_article_streaming())
+    """
+    
+    metrics = get_metrics()
+    if parser == 'stream':
+        # Parsing and rendering are one pass
+        with metrics.span('parse'):
+            return extract_article_streaming(html_content)
+    
+    _load_bs4()
+    with metrics.span('parse'):
+        soup = BeautifulSoup(html_content, parser)
+    started = time.perf_counter()
+    parts = _split_article_tree(soup)
+    extraction = time.perf_counter() - started
+    with metrics.span('render'):
+        content_html, sources_html = _render_article_sections(parts)
+    
+    # Extraction covers the tree walk and the text tokenising around the rendering
+    started = time.perf_counter()
+    title_tag, first_p_tag = parts['title_tag'], parts['first_p_tag']
+    article = _article_fields(
+        title_tag.get_text().strip() if title_tag else '',
+        first_p_tag.get_text().strip() if first_p_tag else '',
+        content_html,
+        sources_html,
+        parts['text']
+    )
+    metrics.record_span('extraction', extraction + time.perf_counter() - started)
+    return article
+
+
+def _split_article_tree(soup):
+    """
+    Walk a parsed export once, finding everything extract_article() needs.
+    
+    Top-level elements are the children of the first <body> at the top of
+    the document, plus any other element there (all of them when there is no
+    such <body>, as lxml would put them in an implied one).
+    A block element inside an unclosed <p> is first moved out behind it, see
+    _close_implied_paragraphs().
+    
+    Returns:
+        Dict with 'title_tag' (first H1), 'first_p_tag' (first H4), the top-level
+        body elements before and after the HR as 'content_elements' and
+        'sources_elements', and the document 'text' and stylesheet 'css'
+    """
+    body = _document_body(soup)
+    text_types = soup.interesting_string_types or {NavigableString, CData}
+    
+    title_tag = None
+    first_p_tag = None
+    content_elements = []
+    sources_elements = []
+    found_hr = False
+    text_parts = []
+    css_parts = []
+    misnested = []
+    
+    for node in soup.descendants:
+        if node.name is None:
+            if type(node) in text_types:
+                text_parts.append(node)
+            elif node.parent.name == 'style':
+                css_parts.append(node)
+            continue
+        
+        parent = node.parent
+        if parent.name == 'p' and node.name in _CLOSES_OPEN_P:
+            misnested.append(node)
+        
+        # Extract title (H1) and first paragraph (H4)
+        if node.name == 'h1' and title_tag is None:
+            title_tag = node
+        elif node.name == 'h4' and first_p_tag is None:
+            first_p_tag = node
+        
+        # Split top-level body (or document) elements at the HR into content and sources
+        if parent is body or (node.name not in _DOCUMENT_FRAME_TAGS and (
+                parent is soup or (parent.name == 'html' and parent.parent is soup))):
+            if node.name == 'hr':
+                found_hr = True
+            elif found_hr:
+                sources_elements.append(node)
+            elif node.name not in ['h1', 'h4']:  # Skip title and first paragraph
+                content_elements.append(node)
+    
+    if misnested:
+        _close_implied_paragraphs(misnested)
+        return _split_article_tree(soup)
+    
+    return {
+        'title_tag': title_tag,
+        'first_p_tag': first_p_tag,
+        'content_elements': content_elements,
+        'sources_elements': sources_elements,
+        'text': ''.join(text_parts),
+        'css': ''.join(css_parts),
+    }
+
+
+def _document_body(soup):
+    """The first <body> that is a child of the document or of a top-level <html>, or None."""
+    for node in soup.children:
+        if node.name == 'body':
+            return node
+        if node.name == 'html':
+            for child in node.children:
+                if child.name == 'body':
+                    return child
+    return None
+
+
+def _close_implied_paragraphs(misnested):
+    """
+    Repair unclosed <p> elements in an html.parser tree the way lxml does.
+    
+    html.parser nests everything after an unclosed <p> inside it; each block
+    element in _CLOSES_OPEN_P found directly inside a <p> is moved out behind
+    it, together with the siblings that follow it. Document order, and so the
+    text, is unchanged.
+    """
+    for node in misnested:
+        paragraph = node.parent
+        if paragraph.name != 'p':
+            continue  # already moved out with an earlier sibling
+        for sibling in reversed([node, *node.next_siblings]):
+            paragraph.insert_after(sibling.extract())
+
+
+def _render_article_sections(parts):
+    """Render the content and sources elements of _split_article_tree() to Framer HTML."""
+    # Resolve the document's generated classes to formatting once
+    class_styles = ClassStyleIndex(parts['css'])
+    
+    # Render each section into a single buffer
+    content = FramerHtmlWriter()
+    for element in parts['content_elements']:
+        write_element_html(element, content, is_content=True, class_styles=class_styles)
+    sources = FramerHtmlWriter()
+    for element in parts['sources_elements']:
+        if element.name != 'h2':
+            write_element_html(element, sources, is_content=False, class_styles=class_styles)
+    
+    return content.getvalue(), sources.getvalue()
+
+
+def extract_article_streaming(html_content, chunk_size=64 * 1024):
+    """
+    Tree-less variant of extract_article() that renders while tokenizing.
+    
+    No document tree is built: each top-level body element is converted to
+    Framer HTML as soon as its end tag is read. Produces the same fields as
+    the html.parser backend for well-formed Google Docs exports.
+    """
+    parser = _StreamingArticleParser()
+    for start in range(0, len(html_content), chunk_size):
+        parser.feed(html_content[start:start + chunk_size])
+    parser.close()
+    
+    return _streaming_article_fields(parser)
+
+
+def _streaming_article_fields(parser):
+    """Build the extract_article() result from a closed _StreamingArticleParser."""
+    return _article_fields(
+        parser.headings.get('h1', ''),
+        parser.headings.get('h4', ''),
+        parser.content.getvalue(),
+        parser.sources.getvalue(),
+        ''.join(parser.text_parts)
+    )
+
+
+def _iter_html_chunks(source, chunk_size):
+    """Decoded text chunks of a file path, or of a text or binary (UTF-8) file-like object."""
+    if not hasattr(source, 'read'):
+        with open(source, 'r', encoding='utf-8') as f:
+            yield from iter(partial(f.read, chunk_size), '')
+        return
+    
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            break
+        yield decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+def extract_article_low_memory(html_file, assets_dir=None, chunk_size=256 * 1024):
+    """
+    Memory-bounded variant of extract_article_streaming() reading from a file.
+    
+    The file is read in chunks through _LowMemoryHtmlFilter, so embedded
+    base64 images, scripts and stylesheets never reach the tokenizer's
+    buffers; peak memory then depends on the article text, not on the size
+    of the embedded assets.
+    
+    Args:
+        html_file: Path to HTML file (Google Docs export), or a text or binary file-like object
+        assets_dir: Directory to write embedded base64 images to (default: drop them)
+        chunk_size: Characters read per chunk
+    """
+    parser = _StreamingArticleParser()
+    html_filter = _LowMemoryHtmlFilter(css_sink=parser.class_styles.feed, assets_dir=assets_dir)
+    
+    for chunk in _iter_html_chunks(html_file, chunk_size):
+        parser.feed(html_filter.feed(chunk))
+    parser.feed(html_filter.feed('', final=True))
+    parser.close()
+    
+    return _streaming_article_fields(parser)
+
+
+def _article_fields(title, first_paragraph, content_html, sources_html, content_text):
+    """Assemble the extract_article() result from rendered sections and document text."""
+    
+    sources_html = '<h2>Referenties</h2>' + sources_html
+    
+    # Content text for AI generation and fallbacks, tokenised once
+    words = _WORD_RE.findall(content_text)
+    content_preview = ' '.join(m.group() for m in itertools.islice(_NON_SPACE_RE.finditer(content_text), 200))
+    
+    # Lowercasing can (rarely) change string length and thus word boundaries;
+    # only then tokenise the lowercased text separately to match the fallback.
+    lowered_title, lowered_text = title.lower(), content_text.lower()
+    if len(lowered_title) == len(title) and len(lowered_text) == len(content_text):
+        keyword_tokens = _keyword_tokens(_WORD_RE.findall(title)) + _keyword_tokens(words)
+    else:
+        keyword_tokens = None
+    
+    return {
+        'title': title,
+        'first_paragraph': first_paragraph,
+        'content_html': content_html,
+        'sources_html': sources_html,
+        'word_count': len(words),
+        'content_text': content_text,
+        'content_preview': content_preview,
+        'keyword_tokens': keyword_tokens,
+    }
+
+
+def compare_parser_backends(html_files, backends=None, errors=None):
+    """
+    Check that parser backends agree with the html.parser reference path.
+    
+    Files that can't be read as UTF-8 are skipped and reported, instead of
+    ending the comparison.
+    
+    Args:
+        html_files: HTML files to use as the equivalence corpus
+        backends: Backends to check (default: every available non-reference backend)
+        errors: Optional list; (html_file, error) of unreadable files are appended to it
+    
+    Returns:
+        List of (html_file, backend, column) tuples that differ
+    """
+    columns = {'First Paragraph': 'first_paragraph', 'Content': 'content_html', 'Sources': 'sources_html'}
+    backends = backends or [b for b in available_parser_backends() if b != 'html.parser']
+    
+    mismatches = []
+    for html_file in html_files:
+        try:
+            with open(html_file, 'r', encoding='utf-8') as f:
+                html_content = f.read()
+        except (OSError, UnicodeDecodeError) as e:
+            if errors is None:
+                logger.warning(f"⚠️  Skipping {html_file}: {e}")
+            else:
+                errors.append((html_file, f"{type(e).__name__}: {e}"))
+            continue
+        reference = extract_article(html_content)
+        for backend in backends:
+            article = extract_article(html_content, parser=backend)
+            for column, key in columns.items():
+                if article[key] != reference[key]:
+                    mismatches.append((html_file, backend, column))
+    return mismatches
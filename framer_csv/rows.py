@@ -0,0 +1,339 @@
+"""
+Framer CMS rows: assembling a row from an extracted article, FramerRow and the
+CSV / JSON Lines writers.
+"""
+
+import asyncio
+import csv
+import io
+import json
+import os
+import re
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+from .ai import run_async
+from .common import _new_file_mode, logger
+from .fallbacks import (
+    determine_category_fallback, generate_image_alt_fallback, generate_keywords_fallback,
+    generate_meta_description_fallback, generate_meta_title_fallback, generate_preview_fallback, get_keyword_index,
+)
+from .metrics import get_metrics
+from .seo import generate_seo_fields_with_ai_async
+from .vision import analyze_image_with_vision_async
+
+
+# Per-article metadata overrides accepted by build_framer_row() and daemon jobs
+METADATA_FIELDS = ('slug', 'meta_title', 'meta_description', 'keywords', 'preview', 'category', 'image_alt', 'date')
+
+FRAMER_COLUMNS = [
+    'Title', 'Slug', 'Meta Title', 'Meta Description', 'Keywords',
+    'Preview', 'Category', 'Date', 'Reading Time', 'Image', 'Image:alt',
+    'First Paragraph', 'Content', 'Sources'
+]
+
+
+def slug_from_title(title):
+    """URL slug generated from a title: lowercase ASCII letters and digits joined by hyphens."""
+    return re.sub(r'[^a-z0-9]+', '-', title.lower()).strip('-')
+
+
+def _needs_seo_ai(use_ai, metadata):
+    """Whether any SEO field is still missing and AI generation is enabled."""
+    return use_ai and not all([metadata.get('meta_title'), metadata.get('meta_description'), 
+                               metadata.get('keywords'), metadata.get('preview'), 
+                               metadata.get('category')])
+
+
+# Metadata fields the AI can fill in, with their Framer column names
+AI_GENERATED_FIELDS = {
+    'meta_title': 'Meta Title',
+    'meta_description': 'Meta Description',
+    'keywords': 'Keywords',
+    'preview': 'Preview',
+    'category': 'Category',
+    'image_alt': 'Image:alt',
+}
+
+
+def _fallback_fields(article, metadata):
+    """Rule-based values for every AI-generated field that metadata doesn't already provide."""
+    title = article['title']
+    first_paragraph = article['first_paragraph']
+    content_text = article['content_text']
+    
+    generators = {
+        'meta_title': lambda: generate_meta_title_fallback(title, max_length=60),
+        'meta_description': lambda: generate_meta_description_fallback(first_paragraph, max_length=155),
+        'keywords': lambda: article.get('fallback_keywords') or generate_keywords_fallback(
+            title, content_text, count=5, tokens=article.get('keyword_tokens'), index=get_keyword_index()
+        ),
+        'preview': lambda: generate_preview_fallback(first_paragraph, max_sentences=2),
+        'category': lambda: determine_category_fallback(title, content_text),
+        'image_alt': lambda: generate_image_alt_fallback(title, max_length=125),
+    }
+    with get_metrics().span('fallback'):
+        return {field: generate() for field, generate in generators.items() if not metadata.get(field)}
+
+
+def _assemble_framer_row(article, image_url, metadata, seo_fields=None, vision_alt=None,
+                         fallback_values=None, fallbacks=None):
+    """
+    Merge metadata, AI results and rule-based fallbacks into one Framer row.
+    
+    fallback_values may hold precomputed _fallback_fields(); otherwise only
+    the missing fields are generated. The column names of fields that ended
+    up rule-based are appended to the fallbacks list, if given.
+    """
+    
+    title = article['title']
+    
+    # Calculate reading time (200-250 words per minute, using 225 as average)
+    reading_time = max(1, round(article['word_count'] / 225))
+    
+    # Generate slug from title if not provided
+    slug = metadata.get('slug') or slug_from_title(title)
+    
+    # Metadata wins over AI results, which win over rule-based fallbacks
+    values = {field: metadata.get(field) for field in AI_GENERATED_FIELDS}
+    for field in ('meta_title', 'meta_description', 'keywords', 'preview', 'category'):
+        values[field] = values[field] or (seo_fields or {}).get(field)
+    values['image_alt'] = values['image_alt'] or vision_alt
+    
+    if fallback_values is None:
+        fallback_values = _fallback_fields(article, values)
+    metrics = get_metrics()
+    metrics.count('rows')
+    for field, column in AI_GENERATED_FIELDS.items():
+        if not values[field]:
+            values[field] = fallback_values[field]
+            metrics.count('fallback_fields')
+            if fallbacks is not None:
+                fallbacks.append(column)
+    
+    # Other metadata with defaults
+    date = metadata.get('date', datetime.now().strftime("%d-%m-%Y"))
+    
+    return dict(zip(FRAMER_COLUMNS, [
+        title, slug, values['meta_title'], values['meta_description'], values['keywords'],
+        values['preview'], values['category'], date, f"{reading_time} min", image_url,
+        values['image_alt'], article['first_paragraph'], article['content_html'], article['sources_html']
+    ]))
+
+
+def build_framer_row(article, image_url, use_ai=True, fallbacks=None, **metadata):
+    """Blocking build_framer_row_async(), for callers without a running event loop."""
+    return run_async(build_framer_row_async(article, image_url, use_ai=use_ai, fallbacks=fallbacks, **metadata))
+
+
+async def build_framer_row_async(article, image_url, use_ai=True, semaphore=None, deadline=None,
+                                 fallbacks=None, seo_request=None, **metadata):
+    """
+    Build one Framer CMS row from an extracted article; the SEO and vision requests run concurrently.
+    
+    With a deadline, the rule-based fields are computed right after the AI
+    requests are started, and AI results only replace them if they arrive
+    within deadline seconds; late requests are cancelled.
+    
+    Args:
+        article: Dict returned by extract_article()
+        image_url: URL of the article's featured image
+        use_ai: Whether to use AI for SEO generation (default: True); without it the
+            vision request gets a single attempt
+        semaphore: Optional asyncio.Semaphore bounding in-flight AI requests
+        deadline: Seconds to wait for AI results before falling back (default: no limit)
+        fallbacks: Optional list; column names of rule-based fields are appended to it
+        seo_request: Optional awaitable (e.g. from generate_seo_fields_batch()) used
+            instead of a per-article SEO request
+        **metadata: Optional metadata fields (slug, meta_title, meta_description, etc.)
+    
+    Returns:
+        Dict mapping each of FRAMER_COLUMNS to its value
+    """
+    
+    content_preview = article['content_preview']
+    
+    started = time.monotonic()
+    
+    tasks = {}
+    if _needs_seo_ai(use_ai, metadata) and seo_request is not None:
+        # Shielded: a missed deadline must not cancel the whole shared batch
+        tasks['seo'] = asyncio.shield(seo_request)
+    elif _needs_seo_ai(use_ai, metadata):
+        logger.info(f"🤖 Generating SEO fields with AI: {article['title']}")
+        tasks['seo'] = generate_seo_fields_with_ai_async(
+            article['title'], article['first_paragraph'], content_preview, semaphore=semaphore
+        )
+    
+    if not metadata.get('image_alt') and image_url:
+        logger.info(f"🖼️  Analyzing image with vision AI: {image_url}")
+        # Without AI the image still gets one vision attempt, but no retries to wait through
+        tasks['vision'] = analyze_image_with_vision_async(image_url, semaphore=semaphore,
+                                                          max_retries=None if use_ai else 0)
+    
+    if deadline is None:
+        results = dict(zip(tasks, await asyncio.gather(*tasks.values())))
+        return _assemble_framer_row(article, image_url, metadata, results.get('seo'), results.get('vision'),
+                                    fallbacks=fallbacks)
+    
+    tasks = {name: asyncio.ensure_future(coro) for name, coro in tasks.items()}
+    fallback_values = _fallback_fields(article, metadata)
+    
+    results = {}
+    if tasks:
+        remaining = max(0.0, deadline - (time.monotonic() - started))
+        done, pending = await asyncio.wait(tasks.values(), timeout=remaining)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        results = {name: task.result() for name, task in tasks.items() if task in done}
+        if pending:
+            late = ', '.join(name for name, task in tasks.items() if task in pending)
+            logger.warning(f"⏱️  AI deadline of {deadline:g}s passed ({late}), using fallback: {article['title']}")
+    
+    return _assemble_framer_row(article, image_url, metadata, results.get('seo'), results.get('vision'),
+                                fallback_values=fallback_values, fallbacks=fallbacks)
+
+
+@dataclass(frozen=True)
+class FramerRow:
+    """One Framer CMS row; the fields are FRAMER_COLUMNS in order, as identifiers."""
+    
+    __slots__ = ('title', 'slug', 'meta_title', 'meta_description', 'keywords', 'preview', 'category', 'date',
+                 'reading_time', 'image', 'image_alt', 'first_paragraph', 'content', 'sources')
+    
+    title: str
+    slug: str
+    meta_title: str
+    meta_description: str
+    keywords: str
+    preview: str
+    category: str
+    date: str
+    reading_time: str
+    image: str
+    image_alt: str
+    first_paragraph: str
+    content: str
+    sources: str
+    
+    @classmethod
+    def from_dict(cls, row):
+        """Build from a dict keyed by FRAMER_COLUMNS (as returned by build_framer_row())."""
+        return cls(*(row[column] for column in FRAMER_COLUMNS))
+    
+    def as_dict(self):
+        """Dict keyed by FRAMER_COLUMNS."""
+        return dict(zip(FRAMER_COLUMNS, self.values()))
+    
+    def values(self):
+        """Field values in FRAMER_COLUMNS order."""
+        return [getattr(self, field) for field in self.__slots__]
+    
+    def __reduce__(self):
+        # Frozen slot instances can't be restored attribute by attribute
+        return type(self), tuple(self.values())
+
+
+class FramerRowWriter:
+    """
+    Stream Framer rows to a CSV or JSON Lines file, one row at a time.
+    
+    The target is a path or an open file-like object (text, or binary for
+    UTF-8 output). CSV output is what Framer imports: a header plus fully
+    quoted rows. JSON Lines output has one object keyed by FRAMER_COLUMNS
+    per line. Streams passed in are flushed but left open on close().
+    """
+    
+    FORMATS = ('csv', 'jsonl')
+    
+    def __init__(self, target, output_format=None):
+        """
+        Args:
+            target: Output path or file-like object
+            output_format: 'csv' or 'jsonl' (default: 'jsonl' for .jsonl/.ndjson paths, else 'csv')
+        """
+        if output_format is None:
+            suffix = '' if hasattr(target, 'write') else Path(target).suffix.lower()
+            output_format = 'jsonl' if suffix in ('.jsonl', '.ndjson') else 'csv'
+        if output_format not in self.FORMATS:
+            raise ValueError(f"output_format must be one of {', '.join(self.FORMATS)}")
+        self.output_format = output_format
+        self.rows = 0
+        
+        self._owned = not hasattr(target, 'write')
+        self._wrapper = None
+        if self._owned:
+            self._stream = open(target, 'w', newline='', encoding='utf-8')
+        elif isinstance(target, (io.RawIOBase, io.BufferedIOBase)):
+            self._stream = self._wrapper = io.TextIOWrapper(target, encoding='utf-8', newline='', write_through=True)
+        else:
+            self._stream = target
+        
+        if output_format == 'csv':
+            self._csv = csv.writer(self._stream, quoting=csv.QUOTE_ALL)
+            self._csv.writerow(FRAMER_COLUMNS)
+    
+    def write(self, row):
+        """Write one FramerRow (or dict keyed by FRAMER_COLUMNS)."""
+        if isinstance(row, FramerRow):
+            values = row.values()
+        else:
+            values = [row[column] for column in FRAMER_COLUMNS]
+        if self.output_format == 'csv':
+            self._csv.writerow(values)
+        else:
+            self._stream.write(json.dumps(dict(zip(FRAMER_COLUMNS, values)), ensure_ascii=False) + '\n')
+        self.rows += 1
+    
+    def write_rows(self, rows):
+        """Write every row of an iterable; returns the number written."""
+        count = 0
+        for row in rows:
+            self.write(row)
+            count += 1
+        return count
+    
+    def close(self):
+        if self._owned:
+            self._stream.close()
+        elif self._wrapper is not None:
+            self._wrapper.flush()
+            self._wrapper.detach()  # leave the caller's binary stream open
+        else:
+            self._stream.flush()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def write_framer_csv(rows, output_file):
+    """
+    Write Framer rows (dicts keyed by FRAMER_COLUMNS, or FramerRows) to a CSV file.
+    
+    The file is written next to output_file and moved over it once complete,
+    so a reader (or a crash mid-write) never sees a truncated CSV.
+    """
+    output_file = Path(output_file)
+    with get_metrics().span('csv_write'):
+        handle, temp_path = tempfile.mkstemp(dir=output_file.parent, suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as out, FramerRowWriter(out, 'csv') as writer:
+                writer.write_rows(rows)
+            # mkstemp() files are private; keep the existing file's permissions,
+            # or give a new file the ones open() would have
+            try:
+                mode = os.stat(output_file).st_mode & 0o7777
+            except FileNotFoundError:
+                mode = _new_file_mode()
+            os.chmod(temp_path, mode)
+            os.replace(temp_path, output_file)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
@@ -0,0 +1,374 @@
+"""
+SEO fields from the chat model: prompts, batched structured requests and validation.
+"""
+
+import asyncio
+import json
+
+from .ai import _estimate_tokens, get_ai_cache, get_ai_scheduler, get_async_openai_client, _hash_key, run_async
+from .common import logger
+from .metrics import get_metrics
+
+
+SEO_MODEL = "gpt-4.1-mini"
+
+# Bump whenever _seo_messages() changes meaningfully, so cached SEO
+# fields from the old prompt are no longer reused.
+SEO_PROMPT_VERSION = 1
+
+# Articles per batched SEO request (1 = one request per article) and how
+# often articles whose batched answer fails validation are asked for again
+DEFAULT_SEO_BATCH_SIZE = 1
+SEO_BATCH_MAX_ATTEMPTS = 3
+
+
+def seo_cache_key(title, first_paragraph, content_preview):
+    """Cache key for generate_seo_fields_with_ai() results."""
+    return _hash_key(SEO_MODEL, SEO_PROMPT_VERSION, title, first_paragraph, content_preview)
+
+
+SEO_CATEGORIES = ('Founders & Startups', 'Nederlandse AI in de wereld', 'Investeren in Nederlandse AI')
+
+_SEO_SYSTEM_MESSAGE = {"role": "system", "content": "Je bent een expert SEO-specialist en content manager voor DutchStartup.ai. Je schrijft professionele, natuurlijke en wervende SEO-content die voldoet aan moderne SEO best practices. Je vermijdt clichés en AI-achtige formuleringen."}
+
+_SEO_AUDIENCE = """DOELGROEP:
+Een algemeen persoon met affiniteit voor technologie en specifiek AI. Mensen die wel wat van de wereld weten (zoals namen van grote bedrijven) maar niet iedere founder of technologie kennen.
+
+"""
+
+# Hard limits for validated SEO fields; the prompt asks for a little less
+SEO_FIELD_MAX_LENGTHS = {'meta_title': 70, 'meta_description': 170, 'preview': 220}
+SEO_KEYWORD_COUNT = (3, 6)
+
+_SEO_FIELD_GUIDELINES = """1. META TITLE (50-60 tekens):
+   - Inclusief hoofdkeyword
+   - Wervend en aantrekkelijk
+   - Sluit aan op de gegeven titel
+   - Passend voor algemeen publiek met redelijke kennis van tech
+
+2. META DESCRIPTION (150-155 tekens):
+   Volg deze professionele SEO-richtlijnen:
+   - Gebruik actieve taal en maak het actionable
+   - Gebruik je focus keyphrase natuurlijk
+   - Toon specificaties wanneer relevant
+   - Zorg dat het matcht met de content
+   - Maak het uniek en onderscheidend
+   - GEEN clichématige call-to-actions zoals "Lees verder!" of "Ontdek meer!"
+   - Wees professioneel en natuurlijk, niet AI-achtig
+   - Geef concrete waarde of inzicht aan
+
+3. KEYWORDS (4-5 relevante zoektermen):
+   - Gescheiden door komma's
+   - Relevant voor Nederlandse AI/tech/startup context
+   - Focus op wat de doelgroep zou zoeken
+
+4. PREVIEW (1-2 zinnen, max 200 tekens):
+   - Dit is een intro/teaser voor het artikel
+   - Moet teasen om verder te lezen
+   - NIET te direct of nep
+   - Professioneel en natuurlijk
+   - Geef context en waarde
+   - Geen clichés of overdreven marketing taal
+   - SCHRIJF GEEN "dit artikel" of "deze blog" - blijf natuurlijk
+   - Schrijf alsof je direct de content introduceert
+
+5. IMAGE ALT (max 125 tekens):
+   - SEO-vriendelijk
+   - Beschrijvend voor de context van het artikel
+   - Relevant voor Nederlandse AI/startup ecosysteem
+
+6. CATEGORY:
+   Kies EXACT een van deze drie categorieën:
+   - "Founders & Startups" - Wanneer het gaat over founders of profielen van Nederlandse AI bedrijven
+   - "Nederlandse AI in de wereld" - Wanneer het gaat over internationaal nieuws of succesverhalen op grote schaal
+   - "Investeren in Nederlandse AI" - Wanneer het gaat over regels, investeringsklimaat of nieuws dat hierbij aansluit
+
+"""
+
+
+def _seo_messages(title, first_paragraph, content_preview):
+    """Build the chat messages for the SEO fields request."""
+    
+    prompt = f"""Je bent een SEO-specialist en content manager voor DutchStartup.ai, het platform dat het Nederlandse AI-ecosysteem verbindt en zichtbaar maakt.
+
+{_SEO_AUDIENCE}ARTIKEL INFORMATIE:
+Titel: {title}
+Eerste paragraaf: {first_paragraph}
+Content preview: {content_preview[:500]}
+
+GENEREER DE VOLGENDE SEO-VELDEN:
+
+{_SEO_FIELD_GUIDELINES}FORMAAT VAN JE ANTWOORD (exact deze structuur):
+META_TITLE: [jouw meta title]
+META_DESCRIPTION: [jouw meta description]
+KEYWORDS: [keyword1, keyword2, keyword3, keyword4, keyword5]
+PREVIEW: [jouw preview tekst]
+CATEGORY: [exact een van de drie categorieën]
+
+NOTE: Image alt text wordt apart gegenereerd via vision AI, dus niet nodig in deze output.
+"""
+
+    return [
+        _SEO_SYSTEM_MESSAGE,
+        {"role": "user", "content": prompt}
+    ]
+
+
+def _parse_seo_fields(text):
+    """Parse the prefixed SEO response lines into a dict."""
+    result = text.strip()
+    
+    seo_fields = {}
+    for line in result.split('\n'):
+        if line.startswith('META_TITLE:'):
+            seo_fields['meta_title'] = line.replace('META_TITLE:', '').strip()
+        elif line.startswith('META_DESCRIPTION:'):
+            seo_fields['meta_description'] = line.replace('META_DESCRIPTION:', '').strip()
+        elif line.startswith('KEYWORDS:'):
+            seo_fields['keywords'] = line.replace('KEYWORDS:', '').strip()
+        elif line.startswith('PREVIEW:'):
+            seo_fields['preview'] = line.replace('PREVIEW:', '').strip()
+        elif line.startswith('CATEGORY:'):
+            seo_fields['category'] = line.replace('CATEGORY:', '').strip()
+    
+    return seo_fields
+
+
+def _seo_batch_messages(articles):
+    """Build the chat messages for one batched SEO request over (id, title, first_paragraph, content_preview) tuples."""
+    
+    items = [
+        {'id': article_id, 'titel': title, 'eerste_paragraaf': first_paragraph, 'content_preview': content_preview[:500]}
+        for article_id, title, first_paragraph, content_preview in articles
+    ]
+    prompt = f"""Je bent een SEO-specialist en content manager voor DutchStartup.ai, het platform dat het Nederlandse AI-ecosysteem verbindt en zichtbaar maakt.
+
+{_SEO_AUDIENCE}ARTIKELEN (JSON):
+{json.dumps(items, ensure_ascii=False)}
+
+GENEREER VOOR ELK ARTIKEL AFZONDERLIJK DE VOLGENDE SEO-VELDEN:
+
+{_SEO_FIELD_GUIDELINES}FORMAAT VAN JE ANTWOORD:
+Een JSON-object met de sleutel "articles": een lijst met precies één object per artikel, met het "id" van het
+artikel en de velden "meta_title", "meta_description", "keywords" (komma-gescheiden), "preview" en "category".
+
+NOTE: Image alt text wordt apart gegenereerd via vision AI, dus niet nodig in deze output.
+"""
+    
+    return [_SEO_SYSTEM_MESSAGE, {"role": "user", "content": prompt}]
+
+
+_SEO_BATCH_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "seo_fields_batch",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "additionalProperties": False,
+            "required": ["articles"],
+            "properties": {
+                "articles": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "additionalProperties": False,
+                        "required": ["id", "meta_title", "meta_description", "keywords", "preview", "category"],
+                        "properties": {
+                            "id": {"type": "integer"},
+                            "meta_title": {"type": "string"},
+                            "meta_description": {"type": "string"},
+                            "keywords": {"type": "string"},
+                            "preview": {"type": "string"},
+                            "category": {"type": "string", "enum": list(SEO_CATEGORIES)},
+                        },
+                    },
+                },
+            },
+        },
+    },
+}
+
+
+def validate_seo_fields(seo_fields):
+    """
+    Check AI SEO fields against the length limits and allowed categories.
+    
+    Returns:
+        Dict of field -> problem for every invalid or missing field (empty if valid)
+    """
+    problems = {}
+    for field in ('meta_title', 'meta_description', 'keywords', 'preview', 'category'):
+        value = seo_fields.get(field)
+        if not isinstance(value, str) or not value.strip():
+            problems[field] = 'missing'
+        elif len(value) > SEO_FIELD_MAX_LENGTHS.get(field, len(value)):
+            problems[field] = f'{len(value)} characters (max {SEO_FIELD_MAX_LENGTHS[field]})'
+    
+    if 'keywords' not in problems:
+        count = len([k for k in seo_fields['keywords'].split(',') if k.strip()])
+        if not SEO_KEYWORD_COUNT[0] <= count <= SEO_KEYWORD_COUNT[1]:
+            problems['keywords'] = f'{count} keywords'
+    if 'category' not in problems and seo_fields['category'] not in SEO_CATEGORIES:
+        problems['category'] = 'unknown category'
+    
+    return problems
+
+
+def _parse_seo_batch(text):
+    """Parse a batched SEO answer into {id: fields}, ignoring malformed entries."""
+    try:
+        data = json.loads(text)
+    except (TypeError, ValueError):
+        return {}
+    
+    results = {}
+    for item in data.get('articles', []) if isinstance(data, dict) else []:
+        if isinstance(item, dict) and isinstance(item.get('id'), int):
+            results[item['id']] = {
+                field: item[field].strip() for field in ('meta_title', 'meta_description', 'keywords', 'preview', 'category')
+                if isinstance(item.get(field), str)
+            }
+    return results
+
+
+async def _request_seo_batch(group, semaphore=None):
+    """Send one batched SEO request; returns {id: fields} ({} if the request failed)."""
+    messages = _seo_batch_messages(group)
+    max_tokens = 350 * len(group)
+    try:
+        with get_metrics().span('seo'):
+            response = await get_ai_scheduler().call_async(
+                lambda: get_async_openai_client().chat.completions.create(
+                    model=SEO_MODEL,
+                    messages=messages,
+                    temperature=0.7,
+                    max_tokens=max_tokens,
+                    response_format=_SEO_BATCH_RESPONSE_FORMAT,
+                ),
+                tokens=_estimate_tokens(messages, max_tokens),
+                semaphore=semaphore,
+            )
+    except Exception as e:
+        logger.warning(f"Warning: Batched AI generation failed for {len(group)} articles ({e}), using fallback methods")
+        return {}
+    return _parse_seo_batch(response.choices[0].message.content)
+
+
+async def _complete_seo_group(group, futures, semaphore=None):
+    """
+    Request SEO fields for one group and settle each article's future as soon as it validates.
+    
+    Articles whose answer is missing or invalid are asked for again, up to
+    SEO_BATCH_MAX_ATTEMPTS requests; after that their valid fields are kept
+    and the rest is left to the fallbacks.
+    """
+    cache = get_ai_cache()
+    pending = list(group)
+    best = {}
+    
+    for attempt in range(1, SEO_BATCH_MAX_ATTEMPTS + 1):
+        answers = await _request_seo_batch(pending, semaphore=semaphore)
+        retry = []
+        for item in pending:
+            article_id = item[0]
+            fields = answers.get(article_id, {})
+            problems = validate_seo_fields(fields)
+            if not problems:
+                if cache:
+                    cache.put('seo', seo_cache_key(*item[1:]), fields)
+                futures[article_id].set_result(fields)
+                continue
+            
+            valid = {field: value for field, value in fields.items() if field not in problems}
+            if len(valid) >= len(best.get(article_id, {})):
+                best[article_id] = valid
+            retry.append(item)
+        
+        if not retry:
+            return
+        if attempt < SEO_BATCH_MAX_ATTEMPTS:
+            logger.info(f"🔁 Re-requesting SEO fields for {len(retry)} of {len(pending)} articles that failed validation")
+        pending = retry
+    
+    for item in pending:
+        futures[item[0]].set_result(best.get(item[0]) or None)
+
+
+def generate_seo_fields_batch(articles, batch_size, semaphore=None):
+    """
+    Start batched SEO generation for many articles; must be called inside an event loop.
+    
+    Cached articles are answered from the AI cache, the rest are packed
+    batch_size at a time into requests asking for a strict JSON array, see
+    _complete_seo_group().
+    
+    Args:
+        articles: List of (title, first_paragraph, content_preview) tuples
+        batch_size: Articles per request
+        semaphore: Optional asyncio.Semaphore bounding in-flight AI requests
+    
+    Returns:
+        List of futures, one per article, resolving to a fields dict or None
+    """
+    loop = asyncio.get_running_loop()
+    futures = [loop.create_future() for _ in articles]
+    cache = get_ai_cache()
+    
+    uncached = []
+    for article_id, (title, first_paragraph, content_preview) in enumerate(articles):
+        cached = cache.get('seo', seo_cache_key(title, first_paragraph, content_preview)) if cache else None
+        if cached:
+            futures[article_id].set_result(cached)
+        else:
+            uncached.append((article_id, title, first_paragraph, content_preview))
+    
+    for start in range(0, len(uncached), batch_size):
+        group = uncached[start:start + batch_size]
+        logger.info(f"🤖 Generating SEO fields with AI for {len(group)} articles in one request")
+        task = loop.create_task(_complete_seo_group(group, futures, semaphore=semaphore))
+        # Never leave a future unresolved if the group itself crashes or is cancelled
+        task.add_done_callback(lambda task, group=group: [
+            futures[item[0]].set_result(None) for item in group if not futures[item[0]].done()
+        ])
+    
+    return futures
+
+
+def generate_seo_fields_with_ai(title, first_paragraph, content_preview):
+    """Blocking generate_seo_fields_with_ai_async(), for callers without a running event loop."""
+    return run_async(generate_seo_fields_with_ai_async(title, first_paragraph, content_preview))
+
+
+async def generate_seo_fields_with_ai_async(title, first_paragraph, content_preview, semaphore=None):
+    """Generate SEO fields using AI with professional guidelines."""
+    
+    cache = get_ai_cache()
+    if cache:
+        cache_key = seo_cache_key(title, first_paragraph, content_preview)
+        cached = cache.get('seo', cache_key)
+        if cached:
+            return cached
+    
+    try:
+        messages = _seo_messages(title, first_paragraph, content_preview)
+        with get_metrics().span('seo'):
+            response = await get_ai_scheduler().call_async(
+                lambda: get_async_openai_client().chat.completions.create(
+                    model=SEO_MODEL,
+                    messages=messages,
+                    temperature=0.7,
+                    max_tokens=700
+                ),
+                tokens=_estimate_tokens(messages, 700),
+                semaphore=semaphore,
+            )
+        
+        seo_fields = _parse_seo_fields(response.choices[0].message.content)
+        if cache and seo_fields:
+            cache.put('seo', cache_key, seo_fields)
+        return seo_fields
+        
+    except Exception as e:
+        logger.warning(f"Warning: AI generation failed ({e}), using fallback methods")
+        return None
@@ -0,0 +1,307 @@
+"""
+Slug-keyed upsert of rows into a master Framer CSV.
+"""
+
+import csv
+import io
+import itertools
+import os
+import re
+import tempfile
+from pathlib import Path
+
+from .common import _new_file_mode, logger
+from .metrics import get_metrics
+from .rows import FRAMER_COLUMNS, FramerRow, slug_from_title
+
+
+# What upsert_framer_csv() does with a slug another article already has
+SLUG_COLLISION_MODES = ('error', 'replace', 'suffix')
+
+
+class SlugCollisionError(RuntimeError):
+    """Raised by upsert_framer_csv() when different titles generate the same slug."""
+    
+    def __init__(self, collisions):
+        super().__init__('slug collision(s): ' + '; '.join(
+            f"'{slug}' is taken by '{other}', not '{title}'" for slug, other, title, _ in collisions
+        ))
+        self.collisions = collisions
+
+
+_master_csv_indexes = {}
+
+# The Title and Slug cells at the start of a fully quoted row
+_QUOTED_ROW_START_RE = re.compile(rb'"((?:[^"]|"")*)","((?:[^"]|"")*)"(?:[,\r\n]|$)')
+
+
+def _csv_row_bytes(values):
+    """One row serialised exactly as FramerRowWriter writes it."""
+    buffer = io.StringIO()
+    csv.writer(buffer, quoting=csv.QUOTE_ALL).writerow(values)
+    return buffer.getvalue().encode('utf-8')
+
+
+def _index_master_csv(path):
+    """
+    Index a master Framer CSV in one pass.
+    
+    Rows end at the first line break outside quotes (RFC 4180 quoting, as
+    Framer, spreadsheet apps and FramerRowWriter write it), found by quote
+    parity; only the leading Title and Slug cells are parsed, so the cost
+    doesn't grow with the size of the Content cells.
+    
+    Returns:
+        Dict with the header's end offset, 'rows' as (slug, title, start, end)
+        byte spans in file order, and 'slugs' mapping each slug to its row
+    """
+    rows = []
+    with open(path, 'rb') as f:
+        # The header may start with a BOM from spreadsheet editors
+        header_line = f.readline()
+        header = next(csv.reader([header_line.decode('utf-8-sig')]), None)
+        if header is not None and header != FRAMER_COLUMNS:
+            raise ValueError(f"{path} is not a Framer CSV (columns: {', '.join(header)})")
+        
+        offset = start = header_end = len(header_line)
+        lines = []
+        quotes = 0
+        for line in itertools.chain(f, [b'']):
+            if line:
+                offset += len(line)
+                lines.append(line)
+                quotes += line.count(b'"')
+                if quotes % 2:
+                    # A quoted cell continues on the next line
+                    continue
+            elif not lines:
+                break
+            
+            raw = b''.join(lines)
+            lines.clear()
+            quotes = 0
+            if raw.rstrip(b'\r\n'):
+                match = _QUOTED_ROW_START_RE.match(raw)
+                if match:
+                    title, slug = (cell.decode('utf-8').replace('""', '"') for cell in match.groups())
+                else:
+                    cells = next(csv.reader(io.StringIO(raw.decode('utf-8'), newline='')), [])
+                    title, slug = (cells + ['', ''])[:2]
+                rows.append((slug, title, start, offset))
+            start = offset
+    
+    return {
+        'header_end': header_end,
+        'size': offset,
+        'rows': rows,
+        'slugs': {slug: position for position, (slug, _, _, _) in enumerate(rows)},
+    }
+
+
+def _master_csv_index(path):
+    """The index of a master CSV, reused while the file's size and mtime are unchanged (None if missing)."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    
+    key = os.path.abspath(path)
+    signature = (stat.st_size, stat.st_mtime_ns)
+    cached = _master_csv_indexes.get(key)
+    if cached and cached[0] == signature:
+        return cached[1]
+    
+    index = _index_master_csv(path)
+    _master_csv_indexes[key] = (signature, index)
+    return index
+
+
+def _copy_byte_range(source, target, start, end, chunk_size=1024 * 1024):
+    source.seek(start)
+    remaining = end - start
+    while remaining > 0:
+        chunk = source.read(min(remaining, chunk_size))
+        if not chunk:
+            break
+        target.write(chunk)
+        remaining -= len(chunk)
+
+
+def upsert_framer_csv(rows, master_file, on_collision='error', pinned_slugs=()):
+    """
+    Replace or append rows in a master Framer CSV, keyed by Slug.
+    
+    The master is indexed once (and the index reused while the file is
+    unchanged). Rows are then replaced in place or appended in input order,
+    and the file is rewritten atomically: the untouched rows' bytes are
+    copied as they are, only the rows that change are serialised, and when
+    nothing changes the master isn't written at all. A missing master is
+    created.
+    
+    A slug collision is two different titles that slug_from_title() maps to
+    the same slug ("AI & ML", "AI/ML"): a row with a generated slug whose
+    owner, in the master or earlier in rows, has another title that also
+    generates it. With 'error' SlugCollisionError is raised before anything
+    is written, 'replace' overwrites the other article, and 'suffix' stores
+    the row as slug-2 (-3, ...), reusing the suffix it got before. A slug in
+    pinned_slugs was set explicitly and always replaces its row, as does a
+    generated slug whose row has an edited title.
+    
+    Args:
+        rows: Framer rows (dicts keyed by FRAMER_COLUMNS, or FramerRows)
+        master_file: Path of the master CSV
+        on_collision: One of SLUG_COLLISION_MODES (default: 'error')
+        pinned_slugs: Slugs set explicitly (metadata 'slug') instead of generated
+    
+    Returns:
+        Dict with the numbers of 'replaced', 'appended' and 'unchanged' rows and
+        the 'collisions' as (slug, other title, title, slug used or None) tuples
+    """
+    if on_collision not in SLUG_COLLISION_MODES:
+        raise ValueError(f"unknown slug collision mode '{on_collision}' (use {', '.join(SLUG_COLLISION_MODES)})")
+    
+    master_file = Path(master_file)
+    index = _master_csv_index(master_file)
+    existing = index['rows'] if index else []
+    positions = index['slugs'] if index else {}
+    
+    replacements = {}
+    appended = {}
+    collisions = []
+    
+    def owner(slug):
+        """Title of the article that has slug so far, or None."""
+        if slug in appended:
+            return appended[slug][0]
+        position = positions.get(slug)
+        if position is None:
+            return None
+        return replacements[position][0] if position in replacements else existing[position][1]
+    
+    def collides(slug, title):
+        """Title of another article whose title also generates slug, or None."""
+        other = owner(slug)
+        if other is None or other == title or slug_from_title(other) != slug:
+            return None
+        return other
+    
+    def claim(slug, values):
+        if slug in positions:
+            replacements[positions[slug]] = values
+        else:
+            appended[slug] = values
+    
+    for row in rows:
+        values = row.values() if isinstance(row, FramerRow) else [row[column] for column in FRAMER_COLUMNS]
+        values = ['' if value is None else str(value) for value in values]
+        title, slug = values[0], values[1]
+        
+        other = None if slug in pinned_slugs or slug != slug_from_title(title) else collides(slug, title)
+        if other is None:
+            claim(slug, values)
+            continue
+        
+        if on_collision == 'replace':
+            collisions.append((slug, other, title, slug))
+            claim(slug, values)
+        elif on_collision == 'suffix':
+            number = 2
+            while owner(f"{slug}-{number}") not in (None, title):
+                number += 1
+            values[1] = f"{slug}-{number}"
+            collisions.append((slug, other, title, values[1]))
+            claim(values[1], values)
+        else:
+            collisions.append((slug, other, title, None))
+    
+    if collisions and on_collision == 'error':
+        raise SlugCollisionError(collisions)
+    
+    # Serialise only what changes; an upserted row identical to the stored one is left alone
+    changes = {}
+    if replacements:
+        with open(master_file, 'rb') as master:
+            for position, values in replacements.items():
+                _, _, start, end = existing[position]
+                data = _csv_row_bytes(values)
+                master.seek(start)
+                if master.read(end - start) != data:
+                    changes[position] = data
+    tail = [(slug, values[0], _csv_row_bytes(values)) for slug, values in appended.items()]
+    
+    stats = {
+        'replaced': len(changes),
+        'appended': len(tail),
+        'unchanged': len(replacements) - len(changes),
+        'collisions': collisions,
+    }
+    if index and not changes and not tail:
+        return stats
+    
+    with get_metrics().span('csv_upsert'):
+        handle, temp_path = tempfile.mkstemp(dir=master_file.parent or '.', suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'w+b') as out:
+                line_break = 0
+                if index and index['header_end']:
+                    header_end = index['header_end']
+                    with open(master_file, 'rb') as master:
+                        cursor = 0
+                        for position in sorted(changes):
+                            _, _, start, end = existing[position]
+                            _copy_byte_range(master, out, cursor, start)
+                            out.write(changes[position])
+                            cursor = end
+                        _copy_byte_range(master, out, cursor, index['size'])
+                    if tail:
+                        # A hand-edited master may lack the final line break
+                        out.seek(-1, os.SEEK_END)
+                        if out.read(1) != b'\n':
+                            out.write(b'\r\n')
+                            line_break = 2
+                else:
+                    out.write(_csv_row_bytes(FRAMER_COLUMNS))
+                    header_end = out.tell()
+                
+                # Carry the index over to the new file instead of re-reading it next time
+                new_rows = []
+                shift = 0
+                for position, (slug, title, start, end) in enumerate(existing):
+                    new_start = start + shift
+                    if position in changes:
+                        title = replacements[position][0]
+                        shift += len(changes[position]) - (end - start)
+                    new_rows.append((slug, title, new_start, end + shift))
+                if line_break and new_rows:
+                    slug, title, start, end = new_rows[-1]
+                    new_rows[-1] = (slug, title, start, end + line_break)
+                elif line_break:
+                    header_end += line_break
+                for slug, title, data in tail:
+                    start = out.tell()
+                    out.write(data)
+                    new_rows.append((slug, title, start, start + len(data)))
+            # mkstemp() files are private; keep the master's permissions, or
+            # give a new master the ones open() would have
+            os.chmod(temp_path, os.stat(master_file).st_mode & 0o7777 if index else _new_file_mode())
+            os.replace(temp_path, master_file)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+    
+    stat = os.stat(master_file)
+    _master_csv_indexes[os.path.abspath(master_file)] = ((stat.st_size, stat.st_mtime_ns), {
+        'header_end': header_end,
+        'size': stat.st_size,
+        'rows': new_rows,
+        'slugs': {slug: position for position, (slug, _, _, _) in enumerate(new_rows)},
+    })
+    return stats
+
+
+def _log_upsert(master_file, stats):
+    for slug, other, title, used in stats['collisions']:
+        resolution = f"stored as '{used}'" if used != slug else 'replaced'
+        logger.warning(f"⚠️  Slug collision: '{title}' and '{other}' both map to '{slug}', {resolution}")
+    logger.info(f"📚 Upserted into {master_file}: {stats['replaced']} replaced, {stats['appended']} appended, "
+                f"{stats['unchanged']} unchanged")
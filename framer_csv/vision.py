@@ -0,0 +1,293 @@
+"""
+Vision alt text: fetching, downscaling and deduplicating the featured image, and
+asking the vision model to describe it.
+"""
+
+import asyncio
+import base64
+import hashlib
+import io
+import mimetypes
+import os
+import threading
+import time
+
+from .ai import _estimate_tokens, get_ai_cache, get_ai_scheduler, get_async_openai_client, _hash_key, run_async
+from .common import HTTP_TIMEOUT, get_http_session, logger, _require
+from .metrics import get_metrics
+
+
+VISION_MODEL = "gemini-2.5-flash"
+
+# Bump whenever _vision_messages() changes meaningfully, so cached alt
+# texts from the old prompt are no longer reused.
+VISION_PROMPT_VERSION = 1
+
+# Vision images are fetched once, downscaled and sent inline (see prepare_vision_image())
+VISION_MAX_IMAGE_SIDE = 768
+VISION_JPEG_QUALITY = 85
+VISION_MAX_DOWNLOAD_BYTES = 25 * 1024 * 1024
+VISION_MAX_INLINE_BYTES = 4 * 1024 * 1024
+# Prepared images are reused while their ETag/Last-Modified is unchanged, for at most this long
+VISION_SOURCE_TTL = 600
+VISION_SOURCE_CACHE_SIZE = 64
+
+_vision_results = {}
+_vision_inflight = {}
+_vision_sources = {}
+_vision_sources_lock = threading.Lock()
+
+
+def vision_cache_key(image_url):
+    """
+    Cache key for analyze_image_with_vision() results.
+    
+    Combines the image URL with its ETag (or Last-Modified and length) from a
+    HEAD request, so a replaced image at the same URL is described again.
+    """
+    version = _image_version(image_url) if image_url.startswith(('http://', 'https://')) else None
+    return _hash_key(VISION_MODEL, VISION_PROMPT_VERSION, image_url, version or '')
+
+
+def _image_version(image_ref):
+    """
+    Validator identifying the current content of an image, or None when it can't be determined.
+    
+    http(s) URLs use the ETag (or Last-Modified and length) of a HEAD
+    request, local files their modification time and size.
+    """
+    if image_ref.startswith(('http://', 'https://')):
+        try:
+            response = get_http_session().head(image_ref, allow_redirects=True, timeout=5)
+        except (ImportError, OSError):
+            # requests missing or request failed (RequestException is an OSError)
+            return None
+        if not response.ok:
+            return None
+        headers = response.headers
+        return headers.get('ETag') or f"{headers.get('Last-Modified', '')}:{headers.get('Content-Length', '')}"
+    
+    path = image_ref[len('file://'):] if image_ref.startswith('file://') else image_ref
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return f'{stat.st_mtime_ns}:{stat.st_size}'
+
+
+def _read_image(image_ref):
+    """Fetch image bytes and media type from an http(s) URL, file:// URL or local path."""
+    if image_ref.startswith(('http://', 'https://')):
+        with get_http_session().get(image_ref, timeout=HTTP_TIMEOUT, stream=True) as response:
+            response.raise_for_status()
+            data = bytearray()
+            for chunk in response.iter_content(64 * 1024):
+                data += chunk
+                if len(data) > VISION_MAX_DOWNLOAD_BYTES:
+                    raise ValueError(f'image larger than {VISION_MAX_DOWNLOAD_BYTES // (1024 * 1024)} MB')
+            media_type = response.headers.get('Content-Type', '').split(';')[0].strip()
+            return bytes(data), media_type or mimetypes.guess_type(image_ref)[0]
+    
+    path = image_ref[len('file://'):] if image_ref.startswith('file://') else image_ref
+    if os.path.getsize(path) > VISION_MAX_DOWNLOAD_BYTES:
+        raise ValueError(f'image larger than {VISION_MAX_DOWNLOAD_BYTES // (1024 * 1024)} MB')
+    with open(path, 'rb') as f:
+        return f.read(), mimetypes.guess_type(path)[0]
+
+
+def _perceptual_hash(image):
+    """
+    Perceptual fingerprint of a Pillow image: equal for the same picture at any size or compression.
+    
+    A 64-bit difference hash captures the structure; a coarse 2x2 colour
+    signature keeps flat or smooth images of different colours apart.
+    """
+    pixels = image.convert('L').resize((9, 8)).tobytes()
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    colours = bytes(value >> 5 for value in image.resize((2, 2)).tobytes()).hex()
+    return f'{bits:016x}-{colours}'
+
+
+def _downscale_image(data):
+    """Downscale to VISION_MAX_IMAGE_SIDE as JPEG with Pillow; returns (jpeg bytes, perceptual hash)."""
+    Image = _require('PIL.Image', 'Pillow')
+    with Image.open(io.BytesIO(data)) as image:
+        image.draft('RGB', (VISION_MAX_IMAGE_SIDE, VISION_MAX_IMAGE_SIDE))  # cheap JPEG pre-scaling
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, 'white')
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        else:
+            image = image.convert('RGB')
+        
+        fingerprint = _perceptual_hash(image)
+        image.thumbnail((VISION_MAX_IMAGE_SIDE, VISION_MAX_IMAGE_SIDE))
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG', quality=VISION_JPEG_QUALITY, optimize=True)
+        return buffer.getvalue(), fingerprint
+
+
+def prepare_vision_image(image_ref):
+    """
+    Fetch an image once and turn it into an inline data URL for the vision model.
+    
+    With Pillow installed the image is downscaled to VISION_MAX_IMAGE_SIDE and
+    identified by its perceptual hash, so the same picture at another URL,
+    size or compression is described only once. Without Pillow the original
+    bytes are inlined (up to VISION_MAX_INLINE_BYTES) and identified by their
+    sha256.
+    
+    Returns:
+        Tuple of (data URL, image fingerprint), or None when the image can't be
+        fetched or inlined (the caller then passes the URL on unchanged)
+    """
+    with get_metrics().span('image_prepare'):
+        try:
+            data, media_type = _read_image(image_ref)
+        except Exception as e:
+            logger.warning(f"Warning: Could not fetch image {image_ref} ({e}), passing the URL to the vision model")
+            return None
+        
+        try:
+            data, fingerprint = _downscale_image(data)
+            media_type = 'image/jpeg'
+            fingerprint = f'phash:{fingerprint}'
+        except Exception:
+            # Pillow missing or unsupported format (e.g. SVG): inline the original if it's small enough
+            if not (media_type or '').startswith('image/') or len(data) > VISION_MAX_INLINE_BYTES:
+                return None
+            fingerprint = 'sha256:' + hashlib.sha256(data).hexdigest()
+        
+        return f"data:{media_type};base64,{base64.b64encode(data).decode('ascii')}", fingerprint
+
+
+def _vision_source(image_url):
+    """
+    Resolve image_url to (image reference sent to the model, vision cache key).
+    
+    A prepared image is reused for VISION_SOURCE_TTL seconds as long as its
+    validator (see _image_version()) is unchanged. Images that couldn't be
+    fetched or validated are never cached, so they are tried again next time.
+    """
+    version = _image_version(image_url)
+    key = (image_url, version)
+    now = time.monotonic()
+    with _vision_sources_lock:
+        cached = _vision_sources.pop(key, None)
+        if cached is not None and now - cached[0] < VISION_SOURCE_TTL:
+            _vision_sources[key] = cached  # most recently used last
+            return cached[1]
+    
+    image = prepare_vision_image(image_url)
+    if image is None:
+        return image_url, vision_cache_key(image_url)
+    
+    data_url, fingerprint = image
+    source = data_url, _hash_key(VISION_MODEL, VISION_PROMPT_VERSION, 'image', fingerprint)
+    if version is not None:
+        with _vision_sources_lock:
+            _vision_sources[key] = (now, source)
+            while len(_vision_sources) > VISION_SOURCE_CACHE_SIZE:
+                del _vision_sources[next(iter(_vision_sources))]
+    return source
+
+
+def _vision_messages(image_url):
+    """Build the chat messages for the vision alt text request."""
+    return [
+        {
+            "role": "user",
+            "content": [
+                {
+                    "type": "text",
+                    "text": "Beschrijf deze afbeelding in het Nederlands voor een screenreader. Geef een volledige, informatieve beschrijving van wat er visueel te zien is (kleuren, vormen, objecten, personen). Maximaal 125 tekens. Wees specifiek en compleet."
+                },
+                {
+                    "type": "image_url",
+                    "image_url": {
+                        "url": image_url
+                    }
+                }
+            ]
+        }
+    ]
+
+
+def _clean_alt_text(text):
+    """Strip and truncate vision output to a valid alt text."""
+    alt_text = text.strip()
+    
+    # Ensure it's not too long
+    if len(alt_text) > 125:
+        alt_text = alt_text[:122] + '...'
+    
+    return alt_text
+
+
+def analyze_image_with_vision(image_url):
+    """Blocking analyze_image_with_vision_async(), for callers without a running event loop."""
+    return run_async(analyze_image_with_vision_async(image_url))
+
+
+async def analyze_image_with_vision_async(image_url, semaphore=None, max_retries=None):
+    """
+    Analyze image using vision AI and generate accessibility-focused alt text.
+    
+    The image is fetched and downscaled once (see prepare_vision_image()), and
+    each distinct image is described only once per process and cache lifetime.
+    Concurrent calls for the same image share one in-flight request.
+    max_retries overrides the AIScheduler's retry count.
+    """
+    
+    source, cache_key = await asyncio.to_thread(_vision_source, image_url)
+    if cache_key in _vision_results:
+        return _vision_results[cache_key]
+    
+    future = _vision_inflight.get(cache_key)
+    if future is None:
+        future = asyncio.ensure_future(_describe_image_async(source, cache_key, semaphore, max_retries))
+        _vision_inflight[cache_key] = future
+        future.add_done_callback(lambda _: _vision_inflight.pop(cache_key, None))
+    
+    # Shielded: one article missing its deadline must not cancel the shared request
+    return await asyncio.shield(future)
+
+
+async def _describe_image_async(source, cache_key, semaphore=None, max_retries=None):
+    """Send one vision request for an already prepared image, consulting the AI cache first."""
+    
+    cache = get_ai_cache()
+    if cache:
+        cached = cache.get('vision', cache_key)
+        if cached:
+            return cached
+    
+    try:
+        messages = _vision_messages(source)
+        with get_metrics().span('vision'):
+            response = await get_ai_scheduler().call_async(
+                lambda: get_async_openai_client().chat.completions.create(
+                    model=VISION_MODEL,
+                    messages=messages,
+                    max_tokens=300,
+                    temperature=0.3
+                ),
+                tokens=_estimate_tokens(messages, 300),
+                semaphore=semaphore,
+                max_retries=max_retries,
+            )
+        
+        alt_text = _clean_alt_text(response.choices[0].message.content)
+        if alt_text:
+            _vision_results[cache_key] = alt_text
+            if cache:
+                cache.put('vision', cache_key, alt_text)
+        return alt_text
+        
+    except Exception as e:
+        logger.warning(f"Warning: Vision AI analysis failed ({e}), using fallback")
+        return None
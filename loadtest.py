@@ -0,0 +1,494 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test for the HTML to Framer CMS CSV converter (reference_script.py).
+
+Runs a local stand-in for the OpenAI-compatible chat-completions API used by
+the SEO and vision requests, with configurable latency distributions, error,
+rate-limit and malformed-response injection, and canned or echoed answers in
+the META_TITLE:/CATEGORY: format (or the JSON schema of batched SEO requests).
+The driver pushes N synthetic articles (see benchmark.py) through
+convert_html_to_framer_csv() one by one, or through batch mode, and reports
+articles/s, latency percentiles and fallback rates as JSON.
+
+Usage:
+    python3 loadtest.py run [--articles N] [--mode single|batch] [server options]
+    python3 loadtest.py serve [--port PORT] [server options]
+
+Example:
+    python3 loadtest.py run --articles 200 --mode batch --ai-concurrency 16 \
+        --latency lognormal:0.8,0.5 --error-rate 0.02 --rate-limit-rate 0.05
+"""
+
+import argparse
+import binascii
+import json
+import logging
+import math
+import os
+import random
+import re
+import struct
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import benchmark
+from framer_csv import ai, batch, common, convert, fallbacks, parsing, rows, seo
+
+
+DEFAULT_LATENCY = 'lognormal:0.8,0.5'
+DEFAULT_ARTICLES = 50
+DEFAULT_ARTICLE_SIZE = '20KB'
+
+
+def parse_latency(spec):
+    """
+    Latency sampler for a distribution spec, in seconds.
+
+    Specs: 'fixed:S', 'uniform:LOW,HIGH', 'normal:MEAN,SD', 'lognormal:MEDIAN,SIGMA'
+    and 'exponential:MEAN'. Samples are never negative.
+
+    Returns:
+        Function taking a random.Random and returning a delay
+    """
+    name, _, params = spec.partition(':')
+    try:
+        values = [float(value) for value in params.split(',')] if params else []
+    except ValueError:
+        raise ValueError(f"invalid latency parameters: {spec}")
+
+    samplers = {
+        'fixed': (1, lambda rng, s: s),
+        'uniform': (2, lambda rng, low, high: rng.uniform(low, high)),
+        'normal': (2, lambda rng, mean, sd: rng.gauss(mean, sd)),
+        'lognormal': (2, lambda rng, median, sigma: rng.lognormvariate(math.log(median), sigma)),
+        'exponential': (1, lambda rng, mean: rng.expovariate(1 / mean)),
+    }
+    if name not in samplers:
+        raise ValueError(f"unknown latency distribution '{name}' (use {', '.join(samplers)})")
+    arity, sampler = samplers[name]
+    if len(values) != arity:
+        raise ValueError(f"'{name}' takes {arity} parameter(s): {spec}")
+    return lambda rng: max(0.0, sampler(rng, *values))
+
+
+def _png(width, height, rgb):
+    """Minimal solid-colour RGB PNG, so every article can get its own image without Pillow."""
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', binascii.crc32(kind + data))
+    raw = b''.join(b'\x00' + bytes(rgb) * width for _ in range(height))
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', zlib.compress(raw)) + chunk(b'IEND', b'')
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    """
+    Threaded stand-in for POST /v1/chat/completions, plus GET /images/<n>.png.
+
+    Every request sleeps for a latency sample first. It is then rejected with
+    a 429 (Retry-After set) when it exceeds rpm_limit or hits rate_limit_rate,
+    fails with a 500 at error_rate, or is answered; at malformed_rate the
+    answer can't be parsed by the converter. response_mode 'canned' answers
+    fixed valid fields, 'echo' derives them from the article in the prompt.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address=('127.0.0.1', 0), latency=DEFAULT_LATENCY, error_rate=0.0, rate_limit_rate=0.0,
+                 rpm_limit=None, retry_after=1.0, malformed_rate=0.0, response_mode='canned', seed=0):
+        super().__init__(address, _FakeOpenAIHandler)
+        self.latency = parse_latency(latency)
+        self.latency_spec = latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.rpm_limit = rpm_limit
+        self.retry_after = retry_after
+        self.malformed_rate = malformed_rate
+        self.response_mode = response_mode
+        self.seed = seed
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._accepted = deque()
+        self.requests = Counter()
+        self.statuses = Counter()
+        self.latencies = []
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serve on a background thread; returns self."""
+        threading.Thread(target=self.serve_forever, name='fake-openai', daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def draw(self):
+        """(latency, random value) under the lock, so a seeded run is reproducible per request order."""
+        with self._lock:
+            return self.latency(self._rng), self._rng.random()
+
+    def admit(self):
+        """Seconds to wait before retrying when over rpm_limit, else None (and the request is counted)."""
+        if not self.rpm_limit:
+            return None
+        with self._lock:
+            now = time.monotonic()
+            while self._accepted and now - self._accepted[0] >= 60:
+                self._accepted.popleft()
+            if len(self._accepted) >= self.rpm_limit:
+                return 60 - (now - self._accepted[0])
+            self._accepted.append(now)
+            return None
+
+    def record(self, kind, status, elapsed):
+        with self._lock:
+            self.requests[kind] += 1
+            self.statuses[status] += 1
+            self.latencies.append(elapsed)
+
+    def config(self):
+        return {
+            'latency': self.latency_spec,
+            'error_rate': self.error_rate,
+            'rate_limit_rate': self.rate_limit_rate,
+            'rpm_limit': self.rpm_limit,
+            'retry_after': self.retry_after,
+            'malformed_rate': self.malformed_rate,
+            'response_mode': self.response_mode,
+            'seed': self.seed,
+        }
+
+
+def _request_kind(body):
+    """'vision', 'seo_batch' or 'seo' for a chat-completions request body."""
+    for message in body.get('messages', []):
+        if isinstance(message.get('content'), list):
+            return 'vision'
+    return 'seo_batch' if body.get('response_format') else 'seo'
+
+
+def _prompt_text(body):
+    contents = [message.get('content') for message in body.get('messages', [])]
+    return '\n'.join(content for content in contents if isinstance(content, str))
+
+
+def _seo_values(title, first_paragraph, echo):
+    if not echo:
+        return {
+            'meta_title': 'Nederlandse AI startup haalt nieuwe financiering op',
+            'meta_description': 'Een Nederlandse AI startup haalt kapitaal op om internationaal te groeien. '
+                                'Lees wat dit betekent voor het ecosysteem.',
+            'keywords': 'AI startup, financiering, Nederland, venture capital, groei',
+            'preview': 'Een Nederlandse AI startup haalt nieuwe financiering op. Wat betekent dit voor founders?',
+            'category': seo.SEO_CATEGORIES[0],
+        }
+    words = [word for word in re.findall(r'\w+', title.lower()) if word not in fallbacks.DUTCH_STOP_WORDS]
+    return {
+        'meta_title': title[:60],
+        'meta_description': first_paragraph[:155],
+        'keywords': ', '.join(dict.fromkeys(words[:5])) or 'ai',
+        'preview': first_paragraph[:200],
+        'category': seo.SEO_CATEGORIES[binascii.crc32(title.encode('utf-8')) % len(seo.SEO_CATEGORIES)],
+    }
+
+
+def _answer(body, kind, echo, malformed):
+    """Assistant message content for a request."""
+    prompt = _prompt_text(body)
+
+    if kind == 'vision':
+        if malformed:
+            return ''
+        if not echo:
+            return 'Een kleurrijke illustratie van een Nederlandse AI startup'
+        image = next(part['image_url']['url'] for message in body['messages'] if isinstance(message['content'], list)
+                     for part in message['content'] if part.get('type') == 'image_url')
+        return f"Illustratie bij {image[:60]}" if not image.startswith('data:') else f"Illustratie {len(image)} bytes"
+
+    if kind == 'seo_batch':
+        match = re.search(r'ARTIKELEN \(JSON\):\n(.*)\n', prompt)
+        items = json.loads(match.group(1)) if match else []
+        if malformed:
+            return json.dumps({'articles': []})
+        return json.dumps({'articles': [
+            {'id': item['id'], **_seo_values(item['titel'], item['eerste_paragraaf'], echo)} for item in items
+        ]}, ensure_ascii=False)
+
+    if malformed:
+        return 'Sorry, daar kan ik je niet mee helpen.'
+    title = re.search(r'^Titel: (.*)$', prompt, re.MULTILINE)
+    first_paragraph = re.search(r'^Eerste paragraaf: (.*)$', prompt, re.MULTILINE)
+    values = _seo_values(title.group(1) if title else '', first_paragraph.group(1) if first_paragraph else '', echo)
+    return (f"META_TITLE: {values['meta_title']}\nMETA_DESCRIPTION: {values['meta_description']}\n"
+            f"KEYWORDS: {values['keywords']}\nPREVIEW: {values['preview']}\nCATEGORY: {values['category']}")
+
+
+class _FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, payload, content_type='application/json', headers=None):
+        data = payload if isinstance(payload, bytes) else json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        match = re.fullmatch(r'/images/(\d+)\.png', self.path)
+        if not match:
+            self._send(404, {'error': {'message': 'not found', 'type': 'invalid_request_error'}})
+            return
+        # Spread the colours so the vision dedupe sees every article's image as different
+        digest = binascii.crc32(match.group(1).encode()).to_bytes(4, 'big')
+        self._send(200, _png(32, 32, digest[:3]), content_type='image/png')
+
+    def do_POST(self):
+        started = time.monotonic()
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send(404, {'error': {'message': f'unknown endpoint {self.path}', 'type': 'invalid_request_error'}})
+            return
+
+        kind = _request_kind(body)
+        latency, roll = server.draw()
+        time.sleep(latency)
+
+        wait = server.admit()
+        if wait is None and roll < server.rate_limit_rate:
+            wait = server.retry_after
+        if wait is not None:
+            server.record(kind, 429, time.monotonic() - started)
+            self._send(429, {'error': {'message': 'Rate limit reached (injected)', 'type': 'requests',
+                                       'code': 'rate_limit_exceeded'}},
+                       headers={'Retry-After': f"{max(wait, 0):.3f}"})
+            return
+
+        roll -= server.rate_limit_rate
+        if 0 <= roll < server.error_rate:
+            server.record(kind, 500, time.monotonic() - started)
+            self._send(500, {'error': {'message': 'Internal server error (injected)', 'type': 'server_error'}})
+            return
+
+        roll -= server.error_rate
+        content = _answer(body, kind, server.response_mode == 'echo', 0 <= roll < server.malformed_rate)
+        prompt_tokens = len(_prompt_text(body)) // 4
+        completion_tokens = len(content) // 4
+        server.record(kind, 200, time.monotonic() - started)
+        self._send(200, {
+            'id': f"chatcmpl-fake-{time.monotonic_ns()}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'fake'),
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                      'total_tokens': prompt_tokens + completion_tokens},
+        })
+
+
+def percentiles(values, points=(50, 95, 99)):
+    """Nearest-rank percentiles (and the maximum) of values in milliseconds, or None when empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    result = {f"p{point}": round(ordered[max(0, math.ceil(point / 100 * len(ordered)) - 1)] * 1000, 1)
+              for point in points}
+    result['max'] = round(ordered[-1] * 1000, 1)
+    return result
+
+
+def run_load_test(server, articles=DEFAULT_ARTICLES, article_size=DEFAULT_ARTICLE_SIZE, mode='single',
+                  ai_concurrency=ai.DEFAULT_AI_CONCURRENCY, seo_batch_size=seo.DEFAULT_SEO_BATCH_SIZE,
+                  deadline=None, workers=None, seed=0):
+    """
+    Convert synthetic articles with AI against a running FakeOpenAIServer.
+
+    mode 'single' converts one article at a time with convert_html_to_framer_csv(),
+    so each article's latency is measured; 'batch' runs all of them through
+    convert_batch_to_framer_csv(), where articles share the run's wall time and
+    only the per-request latencies are meaningful.
+
+    Returns:
+        JSON-serialisable report
+    """
+    # The AI clients read these when they are first created
+    os.environ['OPENAI_BASE_URL'] = f"{server.url}/v1"
+    os.environ['OPENAI_API_KEY'] = 'fake-key'
+    ai.configure_ai_cache(enabled=False)
+    scheduler = ai.get_ai_scheduler()
+
+    size = benchmark.parse_size(article_size)
+    article_latencies = []
+    fallback_fields = []
+    failures = 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        jobs = []
+        for number in range(articles):
+            html_file = os.path.join(tmp, f"article_{number:05d}.html")
+            Path(html_file).write_text(benchmark.generate_google_docs_html(size, seed=seed * 100003 + number),
+                                       encoding='utf-8')
+            jobs.append({'html_file': html_file, 'image_url': f"{server.url}/images/{number}.png", 'metadata': {}})
+
+        # Load the lazily imported modules up front, so the first article isn't charged for them
+        common._require('openai', 'openai')
+        parsing._load_bs4()
+        common.get_http_session()
+
+        started = time.perf_counter()
+        if mode == 'single':
+            for number, job in enumerate(jobs):
+                article_fallbacks = []
+                article_started = time.perf_counter()
+                try:
+                    convert.convert_html_to_framer_csv(job['html_file'], job['image_url'],
+                                                       os.path.join(tmp, f"article_{number:05d}.csv"),
+                                                       deadline=deadline, fallbacks=article_fallbacks)
+                except Exception as e:
+                    common.logger.warning(f"⚠️  {job['html_file']}: {type(e).__name__}: {e}")
+                    failures += 1
+                    continue
+                article_latencies.append(time.perf_counter() - article_started)
+                fallback_fields.append(article_fallbacks)
+        else:
+            output_file = os.path.join(tmp, 'framer_articles.csv')
+            _, failed = batch.convert_batch_to_framer_csv(
+                jobs, output_file, workers=workers, ai_concurrency=ai_concurrency, incremental=False,
+                deadline=deadline, seo_batch_size=seo_batch_size,
+            )
+            failures = len(failed)
+            manifest = batch.load_conversion_manifest(batch.conversion_manifest_path(output_file))
+            fallback_fields = [entry.get('fallback_fields', []) for entry in manifest.values()]
+        elapsed = time.perf_counter() - started
+
+    converted = len(fallback_fields)
+    field_counts = Counter(column for fields in fallback_fields for column in fields)
+    return {
+        'mode': mode,
+        'articles': articles,
+        'article_size': article_size,
+        'converted': converted,
+        'failed': failures,
+        'seconds': round(elapsed, 3),
+        'articles_per_second': round(converted / elapsed, 3) if elapsed else None,
+        'article_latency_ms': percentiles(article_latencies),
+        'request_latency_ms': percentiles(server.latencies),
+        'fallback_rate': round(sum(1 for fields in fallback_fields if fields) / converted, 4) if converted else None,
+        'field_fallback_rates': {
+            column: round(field_counts[column] / converted, 4) if converted else None
+            for column in rows.AI_GENERATED_FIELDS.values()
+        },
+        'requests': dict(server.requests),
+        'responses': {str(status): count for status, count in sorted(server.statuses.items())},
+        'ai_retries': scheduler.retries,
+        'settings': {'ai_concurrency': ai_concurrency, 'seo_batch_size': seo_batch_size, 'deadline': deadline},
+        'server': server.config(),
+    }
+
+
+def main():
+    server_options = argparse.ArgumentParser(add_help=False)
+    server_options.add_argument('--latency', default=DEFAULT_LATENCY,
+                                help=f'Response latency distribution, e.g. fixed:0.5, uniform:0.2,1.5, '
+                                     f'normal:0.8,0.2, exponential:0.8 (default: {DEFAULT_LATENCY})')
+    server_options.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests failing with a 500')
+    server_options.add_argument('--rate-limit-rate', type=float, default=0.0,
+                                help='Fraction of requests rejected with a 429')
+    server_options.add_argument('--rpm-limit', type=int, help='Reject requests beyond this many per minute with a 429')
+    server_options.add_argument('--retry-after', type=float, default=1.0,
+                                help='Retry-After seconds sent with injected 429s (default: 1)')
+    server_options.add_argument('--malformed-rate', type=float, default=0.0,
+                                help='Fraction of answers the converter cannot parse')
+    server_options.add_argument('--responses', choices=['canned', 'echo'], default='canned',
+                                help="Fixed answers, or fields derived from each article's prompt (default: canned)")
+    server_options.add_argument('--seed', type=int, default=0, help='Seed for latency and injection draws (default: 0)')
+
+    parser = argparse.ArgumentParser(description='Load test the converter against a local fake OpenAI-compatible server')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve = commands.add_parser('serve', parents=[server_options], help='Only run the fake server')
+    serve.add_argument('--host', default='127.0.0.1', help='Interface to listen on (default: 127.0.0.1)')
+    serve.add_argument('--port', type=int, default=8765, help='Port to listen on (default: 8765)')
+
+    run = commands.add_parser('run', parents=[server_options], help='Run articles through the converter against it')
+    run.add_argument('--articles', type=int, default=DEFAULT_ARTICLES, help=f'Number of articles (default: {DEFAULT_ARTICLES})')
+    run.add_argument('--article-size', default=DEFAULT_ARTICLE_SIZE,
+                     help=f'Size of each synthetic article (default: {DEFAULT_ARTICLE_SIZE})')
+    run.add_argument('--mode', choices=['single', 'batch'], default='single',
+                     help='convert_html_to_framer_csv() per article, or one batch conversion (default: single)')
+    run.add_argument('--ai-concurrency', type=int, default=ai.DEFAULT_AI_CONCURRENCY,
+                     help=f'With --mode batch, maximum concurrent AI requests (default: {ai.DEFAULT_AI_CONCURRENCY})')
+    run.add_argument('--seo-batch-size', type=int, default=seo.DEFAULT_SEO_BATCH_SIZE,
+                     help='With --mode batch, articles per SEO request (default: 1)')
+    run.add_argument('--workers', type=int, help='With --mode batch, worker processes for parsing')
+    run.add_argument('--deadline', type=float, help='Seconds to wait for AI results before falling back')
+    run.add_argument('--ai-max-retries', type=int, default=ai.DEFAULT_AI_MAX_RETRIES,
+                     help=f'Retries per AI request (default: {ai.DEFAULT_AI_MAX_RETRIES})')
+    run.add_argument('--ai-rpm', type=float, help='Client-side requests per minute limit')
+    run.add_argument('--output', '-o', help='Write the JSON report to this file instead of stdout')
+    run.add_argument('--verbose', '-v', action='store_true', help="Show the converter's progress messages")
+
+    args = parser.parse_args()
+    try:
+        parse_latency(args.latency)
+    except ValueError as e:
+        parser.error(f'invalid --latency: {e}')
+
+    server_settings = dict(
+        latency=args.latency, error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+        rpm_limit=args.rpm_limit, retry_after=args.retry_after, malformed_rate=args.malformed_rate,
+        response_mode=args.responses, seed=args.seed,
+    )
+
+    if args.command == 'serve':
+        server = FakeOpenAIServer((args.host, args.port), **server_settings)
+        print(f"🟢 Fake OpenAI API on {server.url}/v1 (set OPENAI_BASE_URL to use it), press Ctrl+C to stop",
+              file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("\n👋 Stopped", file=sys.stderr)
+        return
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format='%(message)s',
+                        stream=sys.stderr)
+    ai.configure_ai_scheduler(rpm=args.ai_rpm, max_retries=args.ai_max_retries)
+
+    server = FakeOpenAIServer(**server_settings).start()
+    try:
+        print(f"🚚 Converting {args.articles} articles ({args.mode}) against {server.url}", file=sys.stderr)
+        report = run_load_test(
+            server, articles=args.articles, article_size=args.article_size, mode=args.mode,
+            ai_concurrency=args.ai_concurrency, seo_batch_size=args.seo_batch_size, deadline=args.deadline,
+            workers=args.workers, seed=args.seed,
+        )
+    finally:
+        server.stop()
+
+    print(f"📊 {report['articles_per_second']} articles/s, fallback rate {report['fallback_rate']}", file=sys.stderr)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -14,496 +14,62 @@ Example:
         --keywords "keyword1, keyword2"
 """
 
-import csv
-import re
 import argparse
-import os
-from datetime import datetime
+import logging
+import socketserver
+import sqlite3
+import sys
 from pathlib import Path
 
-try:
-    from bs4 import BeautifulSoup
-except ImportError:
-    print("Error: BeautifulSoup4 is required. Install with: pip3 install beautifulsoup4")
-    exit(1)
-
-try:
-    from openai import OpenAI
-except ImportError:
-    print("Error: OpenAI is required. Install with: pip3 install openai")
-    exit(1)
-
-try:
-    import requests
-except ImportError:
-    print("Error: requests is required. Install with: pip3 install requests")
-    exit(1)
-
-
-def analyze_image_with_vision(image_url):
-    """Analyze image using vision AI and generate accessibility-focused alt text."""
-    
-    client = OpenAI()
-    
-    try:
-        response = client.chat.completions.create(
-            model="gemini-2.5-flash",
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": "Beschrijf deze afbeelding in het Nederlands voor een screenreader. Geef een volledige, informatieve beschrijving van wat er visueel te zien is (kleuren, vormen, objecten, personen). Maximaal 125 tekens. Wees specifiek en compleet."
-                        },
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": image_url
-                            }
-                        }
-                    ]
-                }
-            ],
-            max_tokens=300,
-            temperature=0.3
-        )
-        
-        alt_text = response.choices[0].message.content.strip()
-        
-        # Ensure it's not too long
-        if len(alt_text) > 125:
-            alt_text = alt_text[:122] + '...'
-        
-        return alt_text
-        
-    except Exception as e:
-        print(f"Warning: Vision AI analysis failed ({e}), using fallback")
-        return None
-
-
-def element_to_html(elem, is_content=True):
-    """Convert BeautifulSoup element to clean Framer-compatible HTML."""
-    
-    if elem.name == 'p':
-        html = '<p>'
-        
-        for child in elem.children:
-            if isinstance(child, str):
-                text = child.strip()
-                if text:
-                    html += text + ' '
-            elif child.name == 'span':
-                classes = child.get('class', [])
-                text_content = child.get_text().strip()
-                if 'c9' in classes:  # bold (Google Docs class)
-                    html += f'<strong>{text_content}</strong> '
-                elif 'c26' in classes:  # italic (Google Docs class)
-                    if is_content:
-                        # Close current p and start new one for italic
-                        html = html.rstrip() + '</p><p><em>' + text_content + '</em>'
-                    else:
-                        html += f'<em>{text_content}</em> '
-                else:
-                    html += text_content + ' '
-            elif child.name == 'a':
-                href = child.get('href', '')
-                html += f'<a href="{href}">{child.get_text()}</a> '
-            elif child.name == 'br':
-                # BR creates new paragraph
-                if is_content:
-                    html = html.rstrip() + '</p><p>'
-        
-        html = html.rstrip() + '</p>'
-        return html.replace('  ', ' ')
-    
-    elif elem.name in ['h2', 'h3']:
-        text = elem.get_text().strip()
-        return f'<h2>{text}</h2>'
-    
-    elif elem.name == 'table':
-        # Only ONE blank line before table
-        html = '<p><br></p><table>'
-        for row in elem.find_all('tr'):
-            html += '<tr>'
-            for cell in row.find_all(['td', 'th']):
-                tag = cell.name
-                text = cell.get_text().strip()
-                html += f'<{tag}>{text}</{tag}>'
-            html += '</tr>'
-        html += '</table>'
-        return html
-    
-    return ''
-
-
-def generate_seo_fields_with_ai(title, first_paragraph, content_preview):
-    """Generate SEO fields using AI with professional guidelines."""
-    
-    client = OpenAI()
-    
-    prompt = f"""Je bent een SEO-specialist en content manager voor DutchStartup.ai, het platform dat het Nederlandse AI-ecosysteem verbindt en zichtbaar maakt.
-
-DOELGROEP:
-Een algemeen persoon met affiniteit voor technologie en specifiek AI. Mensen die wel wat van de wereld weten (zoals namen van grote bedrijven) maar niet iedere founder of technologie kennen.
-
-ARTIKEL INFORMATIE:
-Titel: {title}
-Eerste paragraaf: {first_paragraph}
-Content preview: {content_preview[:500]}
-
-GENEREER DE VOLGENDE SEO-VELDEN:
-
-1. META TITLE (50-60 tekens):
-   - Inclusief hoofdkeyword
-   - Wervend en aantrekkelijk
-   - Sluit aan op de gegeven titel
-   - Passend voor algemeen publiek met redelijke kennis van tech
-
-2. META DESCRIPTION (150-155 tekens):
-   Volg deze professionele SEO-richtlijnen:
-   - Gebruik actieve taal en maak het actionable
-   - Gebruik je focus keyphrase natuurlijk
-   - Toon specificaties wanneer relevant
-   - Zorg dat het matcht met de content
-   - Maak het uniek en onderscheidend
-   - GEEN clichématige call-to-actions zoals "Lees verder!" of "Ontdek meer!"
-   - Wees professioneel en natuurlijk, niet AI-achtig
-   - Geef concrete waarde of inzicht aan
-
-3. KEYWORDS (4-5 relevante zoektermen):
-   - Gescheiden door komma's
-   - Relevant voor Nederlandse AI/tech/startup context
-   - Focus op wat de doelgroep zou zoeken
-
-4. PREVIEW (1-2 zinnen, max 200 tekens):
-   - Dit is een intro/teaser voor het artikel
-   - Moet teasen om verder te lezen
-   - NIET te direct of nep
-   - Professioneel en natuurlijk
-   - Geef context en waarde
-   - Geen clichés of overdreven marketing taal
-   - SCHRIJF GEEN "dit artikel" of "deze blog" - blijf natuurlijk
-   - Schrijf alsof je direct de content introduceert
-
-5. IMAGE ALT (max 125 tekens):
-   - SEO-vriendelijk
-   - Beschrijvend voor de context van het artikel
-   - Relevant voor Nederlandse AI/startup ecosysteem
-
-6. CATEGORY:
-   Kies EXACT een van deze drie categorieën:
-   - "Founders & Startups" - Wanneer het gaat over founders of profielen van Nederlandse AI bedrijven
-   - "Nederlandse AI in de wereld" - Wanneer het gaat over internationaal nieuws of succesverhalen op grote schaal
-   - "Investeren in Nederlandse AI" - Wanneer het gaat over regels, investeringsklimaat of nieuws dat hierbij aansluit
-
-FORMAAT VAN JE ANTWOORD (exact deze structuur):
-META_TITLE: [jouw meta title]
-META_DESCRIPTION: [jouw meta description]
-KEYWORDS: [keyword1, keyword2, keyword3, keyword4, keyword5]
-PREVIEW: [jouw preview tekst]
-CATEGORY: [exact een van de drie categorieën]
-
-NOTE: Image alt text wordt apart gegenereerd via vision AI, dus niet nodig in deze output.
-"""
-
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4.1-mini",
-            messages=[
-                {"role": "system", "content": "Je bent een expert SEO-specialist en content manager voor DutchStartup.ai. Je schrijft professionele, natuurlijke en wervende SEO-content die voldoet aan moderne SEO best practices. Je vermijdt clichés en AI-achtige formuleringen."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=700
-        )
-        
-        result = response.choices[0].message.content.strip()
-        
-        # Parse the result
-        seo_fields = {}
-        for line in result.split('\n'):
-            if line.startswith('META_TITLE:'):
-                seo_fields['meta_title'] = line.replace('META_TITLE:', '').strip()
-            elif line.startswith('META_DESCRIPTION:'):
-                seo_fields['meta_description'] = line.replace('META_DESCRIPTION:', '').strip()
-            elif line.startswith('KEYWORDS:'):
-                seo_fields['keywords'] = line.replace('KEYWORDS:', '').strip()
-            elif line.startswith('PREVIEW:'):
-                seo_fields['preview'] = line.replace('PREVIEW:', '').strip()
-            elif line.startswith('CATEGORY:'):
-                seo_fields['category'] = line.replace('CATEGORY:', '').strip()
-        
-        return seo_fields
-        
-    except Exception as e:
-        print(f"Warning: AI generation failed ({e}), using fallback methods")
-        return None
-
-
-def determine_category_fallback(title, content):
-    """Fallback: Determine category based on content analysis."""
-    combined = f"{title} {content}".lower()
-    
-    # Category keywords
-    founders_keywords = ['founder', 'oprichter', 'startup', 'bedrijf', 'ceo', 'ondernemer', 'profiel']
-    international_keywords = ['internationaal', 'wereld', 'global', 'europa', 'amerika', 'succes', 'groei', 'schaal']
-    investment_keywords = ['investering', 'kapitaal', 'funding', 'venture', 'regels', 'wet', 'beleid', 'klimaat', 'financiering']
-    
-    # Count matches
-    founders_score = sum(1 for kw in founders_keywords if kw in combined)
-    international_score = sum(1 for kw in international_keywords if kw in combined)
-    investment_score = sum(1 for kw in investment_keywords if kw in combined)
-    
-    # Determine category
-    scores = {
-        'Founders & Startups': founders_score,
-        'Nederlandse AI in de wereld': international_score,
-        'Investeren in Nederlandse AI': investment_score
-    }
-    
-    # Return category with highest score, default to Founders & Startups
-    max_category = max(scores.items(), key=lambda x: x[1])
-    return max_category[0] if max_category[1] > 0 else 'Founders & Startups'
-
-
-def generate_meta_title_fallback(title, max_length=60):
-    """Fallback: Generate SEO-optimized meta title (50-60 characters)."""
-    if len(title) <= max_length:
-        return title
-    
-    # Try to truncate at word boundary
-    truncated = title[:max_length].rsplit(' ', 1)[0]
-    return truncated
-
-
-def generate_meta_description_fallback(first_paragraph, max_length=155):
-    """Fallback: Generate SEO-optimized meta description (150-155 characters)."""
-    # Clean the text
-    clean_text = re.sub(r'\s+', ' ', first_paragraph).strip()
-    
-    if len(clean_text) <= max_length:
-        return clean_text
-    
-    # Truncate at sentence boundary if possible
-    sentences = re.split(r'[.!?]\s+', clean_text)
-    description = ""
-    for sentence in sentences:
-        if len(description) + len(sentence) + 1 <= max_length:
-            description += sentence + ". "
-        else:
-            break
-    
-    # If we have a good description, return it
-    if len(description.strip()) >= 100:
-        return description.strip()
-    
-    # Otherwise truncate at word boundary
-    truncated = clean_text[:max_length].rsplit(' ', 1)[0]
-    if not truncated.endswith('.'):
-        truncated += '.'
-    return truncated
-
-
-def generate_keywords_fallback(title, content, count=5):
-    """Fallback: Generate relevant keywords from title and content."""
-    # Combine title and content
-    text = f"{title} {content}".lower()
-    
-    # Remove common Dutch stop words
-    stop_words = {'de', 'het', 'een', 'en', 'van', 'in', 'op', 'is', 'voor', 'met', 
-                  'aan', 'als', 'dat', 'die', 'dit', 'te', 'zijn', 'er', 'ook', 'om',
-                  'naar', 'bij', 'door', 'maar', 'niet', 'heeft', 'kan', 'wordt', 'deze',
-                  'zijn', 'worden', 'werd', 'was', 'uit', 'over', 'onder', 'na', 'nog',
-                  'zich', 'meer', 'geen', 'wel', 'waar', 'dan', 'zo'}
-    
-    # Extract words (3+ characters)
-    words = re.findall(r'\b[a-zà-ÿ]{3,}\b', text)
-    
-    # Count word frequency
-    word_freq = {}
-    for word in words:
-        if word not in stop_words:
-            word_freq[word] = word_freq.get(word, 0) + 1
-    
-    # Get top keywords
-    top_keywords = sorted(word_freq.items(), key=lambda x: x[1], reverse=True)[:count]
-    
-    return ', '.join([word for word, _ in top_keywords])
-
-
-def generate_preview_fallback(first_paragraph, max_sentences=2):
-    """Fallback: Generate intriguing preview text (1-2 sentences)."""
-    # Split into sentences
-    sentences = re.split(r'[.!?]\s+', first_paragraph)
-    
-    # Take first 1-2 sentences
-    preview_sentences = sentences[:max_sentences]
-    preview = '. '.join(preview_sentences)
-    
-    # Ensure it ends with punctuation
-    if not preview.endswith(('.', '!', '?')):
-        preview += '.'
-    
-    return preview
-
-
-def generate_image_alt_fallback(title, max_length=125):
-    """Fallback: Generate SEO-friendly image alt text."""
-    # More contextual alt text for DutchStartup.ai
-    alt = f"Illustratie bij artikel over {title.lower()}"
-    
-    if len(alt) <= max_length:
-        return alt
-    
-    # Truncate at word boundary
-    truncated = alt[:max_length].rsplit(' ', 1)[0]
-    return truncated
-
-
-def convert_html_to_framer_csv(html_file, image_url, output_file=None, use_ai=True, **metadata):
-    """
-    Convert HTML blog article to Framer CMS CSV format.
-    
-    Args:
-        html_file: Path to HTML file (Google Docs export)
-        image_url: URL of the article's featured image
-        output_file: Output CSV file path (optional, auto-generated if not provided)
-        use_ai: Whether to use AI for SEO generation (default: True)
-        **metadata: Optional metadata fields (slug, meta_title, meta_description, etc.)
-    
-    Returns:
-        Path to generated CSV file
-    """
-    
-    # Read HTML file
-    with open(html_file, 'r', encoding='utf-8') as f:
-        html_content = f.read()
-    
-    soup = BeautifulSoup(html_content, 'html.parser')
-    
-    # Extract title (H1)
-    title_tag = soup.find('h1')
-    title = title_tag.get_text().strip() if title_tag else ''
-    
-    # Extract first paragraph (H4)
-    first_p_tag = soup.find('h4')
-    first_paragraph = first_p_tag.get_text().strip() if first_p_tag else ''
-    
-    # Find HR to split content and sources
-    content_elements = []
-    sources_elements = []
-    found_hr = False
-    
-    for element in soup.body.children:
-        if element.name == 'hr':
-            found_hr = True
-            continue
-        
-        if not found_hr:
-            if element.name in ['h1', 'h4']:  # Skip title and first paragraph
-                continue
-            if element.name:
-                content_elements.append(element)
-        else:
-            if element.name:
-                sources_elements.append(element)
-    
-    # Convert to clean HTML
-    content_html = ''.join([element_to_html(e, is_content=True) for e in content_elements if e.name])
-    sources_html = '<h2>Referenties</h2>' + ''.join([element_to_html(e, is_content=False) for e in sources_elements if e.name and e.name != 'h2'])
-    
-    # Remove empty paragraphs
-    content_html = content_html.replace('<p></p>', '').replace('<p> </p>', '')
-    sources_html = sources_html.replace('<p></p>', '').replace('<p> </p>', '')
-    
-    # Calculate reading time (200-250 words per minute, using 225 as average)
-    word_count = len(re.findall(r'\w+', soup.get_text()))
-    reading_time = max(1, round(word_count / 225))
-    
-    # Generate slug from title if not provided
-    slug = metadata.get('slug')
-    if not slug:
-        slug = re.sub(r'[^a-z0-9]+', '-', title.lower()).strip('-')
-    
-    # Get content preview for AI generation
-    content_text = soup.get_text()
-    content_preview = ' '.join(content_text.split()[:200])  # First 200 words
-    
-    # Try AI generation first if enabled and no metadata provided
-    ai_generated = False
-    if use_ai and not all([metadata.get('meta_title'), metadata.get('meta_description'), 
-                           metadata.get('keywords'), metadata.get('preview'), 
-                           metadata.get('category')]):
-        print("🤖 Generating SEO fields with AI...")
-        seo_fields = generate_seo_fields_with_ai(title, first_paragraph, content_preview)
-        
-        if seo_fields:
-            ai_generated = True
-            # Use AI-generated fields if not provided in metadata
-            if not metadata.get('meta_title'):
-                metadata['meta_title'] = seo_fields.get('meta_title')
-            if not metadata.get('meta_description'):
-                metadata['meta_description'] = seo_fields.get('meta_description')
-            if not metadata.get('keywords'):
-                metadata['keywords'] = seo_fields.get('keywords')
-            if not metadata.get('preview'):
-                metadata['preview'] = seo_fields.get('preview')
-            if not metadata.get('category'):
-                metadata['category'] = seo_fields.get('category')
-    
-    # Fallback to rule-based generation for any missing fields
-    meta_title = metadata.get('meta_title') or generate_meta_title_fallback(title, max_length=60)
-    meta_description = metadata.get('meta_description') or generate_meta_description_fallback(first_paragraph, max_length=155)
-    keywords = metadata.get('keywords') or generate_keywords_fallback(title, content_text, count=5)
-    preview = metadata.get('preview') or generate_preview_fallback(first_paragraph, max_sentences=2)
-    
-    # Generate image alt text using vision AI if not provided
-    image_alt = metadata.get('image_alt')
-    if not image_alt and image_url:
-        print("🖼️  Analyzing image with vision AI...")
-        image_alt = analyze_image_with_vision(image_url)
-        if image_alt:
-            print(f"✨ Vision AI generated alt text: {image_alt}")
-        else:
-            print("⚠️  Vision AI failed, using fallback")
-            image_alt = generate_image_alt_fallback(title, max_length=125)
-    elif not image_alt:
-        image_alt = generate_image_alt_fallback(title, max_length=125)
-    
-    category = metadata.get('category') or determine_category_fallback(title, content_text)
-    
-    # Other metadata with defaults
-    date = metadata.get('date', datetime.now().strftime("%d-%m-%Y"))
-    
-    # Generate output filename if not provided
-    if not output_file:
-        output_file = f"{slug}.csv"
-    
-    # Create CSV
-    with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.writer(csvfile, quoting=csv.QUOTE_ALL)
-        
-        writer.writerow([
-            'Title', 'Slug', 'Meta Title', 'Meta Description', 'Keywords', 
-            'Preview', 'Category', 'Date', 'Reading Time', 'Image', 'Image:alt',
-            'First Paragraph', 'Content', 'Sources'
-        ])
-        
-        writer.writerow([
-            title, slug, meta_title, meta_description, keywords, preview, category,
-            date, f"{reading_time} min", image_url, image_alt, first_paragraph,
-            content_html, sources_html
-        ])
-    
-    if ai_generated:
-        print("✨ SEO fields generated with AI")
-    
-    print(f"\n📊 Generated fields:")
-    print(f"   Category: {category}")
-    print(f"   Image Alt: {image_alt}")
-    
-    return output_file
+# The converter itself lives in the framer_csv package; its public names are
+# re-exported here for callers that import this script
+from framer_csv.common import DEFAULT_CACHE_DIR, HTTP_POOL_SIZE, HTTP_TIMEOUT, get_http_session, logger
+from framer_csv.metrics import RunMetrics, collect_metric_events, configure_metrics, get_metrics, peak_memory_mb
+from framer_csv.ai import (
+    DEFAULT_AI_BREAKER_COOLDOWN, DEFAULT_AI_BREAKER_THRESHOLD, DEFAULT_AI_CONCURRENCY, DEFAULT_AI_MAX_RETRIES,
+    DEFAULT_AI_RETRY_BASE_DELAY, DEFAULT_AI_RETRY_MAX_DELAY, DEFAULT_CACHE_MAX_AGE_DAYS, DEFAULT_CACHE_MAX_MB, AICache,
+    AICircuitOpenError, AIRunner, AIScheduler, configure_ai_cache, configure_ai_scheduler, get_ai_cache,
+    get_ai_scheduler, get_async_openai_client, run_async,
+)
+from framer_csv.vision import (
+    VISION_JPEG_QUALITY, VISION_MAX_DOWNLOAD_BYTES, VISION_MAX_IMAGE_SIDE, VISION_MAX_INLINE_BYTES, VISION_MODEL,
+    VISION_PROMPT_VERSION, VISION_SOURCE_CACHE_SIZE, VISION_SOURCE_TTL, analyze_image_with_vision,
+    analyze_image_with_vision_async, prepare_vision_image, vision_cache_key,
+)
+from framer_csv.seo import (
+    DEFAULT_SEO_BATCH_SIZE, SEO_BATCH_MAX_ATTEMPTS, SEO_CATEGORIES, SEO_FIELD_MAX_LENGTHS, SEO_KEYWORD_COUNT,
+    SEO_MODEL, SEO_PROMPT_VERSION, generate_seo_fields_batch, generate_seo_fields_with_ai,
+    generate_seo_fields_with_ai_async, seo_cache_key, validate_seo_fields,
+)
+from framer_csv.parsing import (
+    PARSER_BACKENDS, VOID_ELEMENTS, ClassStyleIndex, FramerHtmlWriter, available_parser_backends,
+    compare_parser_backends, element_to_html, extract_article, extract_article_low_memory, extract_article_streaming,
+    write_element_html,
+)
+from framer_csv.fallbacks import (
+    CATEGORY_MATCH_MODES, DEFAULT_CATEGORY_TAXONOMY, DEFAULT_KEYWORD_INDEX_PATH, DUTCH_STOP_WORDS, CategoryClassifier,
+    KeywordIndex, configure_category_classifier, configure_keyword_index, determine_category_fallback,
+    generate_image_alt_fallback, generate_keywords_fallback, generate_meta_description_fallback,
+    generate_meta_title_fallback, generate_preview_fallback, get_category_classifier, get_keyword_index,
+    index_article_keywords,
+)
+from framer_csv.rows import (
+    AI_GENERATED_FIELDS, FRAMER_COLUMNS, METADATA_FIELDS, FramerRow, FramerRowWriter, build_framer_row,
+    build_framer_row_async, slug_from_title, write_framer_csv,
+)
+from framer_csv.upsert import SLUG_COLLISION_MODES, SlugCollisionError, upsert_framer_csv
+from framer_csv.links import (
+    DEFAULT_LINK_CACHE_PATH, DEFAULT_LINK_CACHE_TTL_HOURS, DEFAULT_LINK_CHECK_CONCURRENCY, DEFAULT_LINK_CHECK_PER_HOST,
+    LINK_CHECK_MODES, LINK_CHECK_USER_AGENT, BrokenLinksError, LinkChecker, article_source_links, check_article_links,
+    configure_link_checker, get_link_checker,
+)
+from framer_csv.convert import convert_article, convert_article_async, convert_html_to_framer_csv, read_article
+from framer_csv.batch import (
+    CONVERTER_VERSION, DEFAULT_WATCH_DEBOUNCE, DEFAULT_WATCH_POLL_INTERVAL, MANIFEST_VERSION, build_framer_rows_async,
+    conversion_inputs, conversion_manifest_path, convert_batch_to_framer_csv, load_batch_jobs,
+    load_conversion_manifest, run_conversion_job, serve_daemon, serve_json_lines, watch_directory,
+    write_conversion_manifest,
+)
 
 
 def main():
@@ -525,13 +91,88 @@ Examples:
       --meta-description "Custom meta description for SEO" \\
       --keywords "AI, healthcare, Netherlands" \\
       --category "Founders & Startups"
+  
+  # Batch: every export in a directory (or glob / JSON manifest) into one CSV
+  python3 html_to_framer_csv.py exports/ "https://example.com/default.jpg" \\
+      --batch -o articles.csv --workers 8
+  
+  # Watch a folder and keep one CSV up to date as exports land
+  python3 html_to_framer_csv.py --watch exports/ "https://example.com/default.jpg" -o articles.csv
+  
+  # Daemon: JSON jobs on stdin (or --socket PATH), one JSON result per line
+  echo '{"html_file": "article.html", "image_url": "https://example.com/image.jpg", "output": "a.csv"}' \\
+      | python3 html_to_framer_csv.py --daemon
+  
+  # Huge export with embedded images: bounded memory, images written to disk
+  python3 html_to_framer_csv.py article.html "https://example.com/image.jpg" \\
+      --low-memory --assets-dir assets/
         """
     )
     
-    parser.add_argument('html_file', help='Path to HTML file (Google Docs export)')
-    parser.add_argument('image_url', help='URL of the featured image')
+    parser.add_argument('html_file', nargs='?', help='Path to HTML file (Google Docs export); with --batch a directory, glob or JSON manifest')
+    parser.add_argument('image_url', nargs='?', help='URL of the featured image (default image with --batch)')
     parser.add_argument('-o', '--output', help='Output CSV file path')
     parser.add_argument('--no-ai', action='store_true', help='Disable AI SEO generation')
+    parser.add_argument('--ai-rpm', type=float, help='Budget of AI requests per minute (default: unlimited)')
+    parser.add_argument('--ai-tpm', type=float, help='Budget of AI tokens per minute (default: unlimited)')
+    parser.add_argument('--ai-max-retries', type=int, default=DEFAULT_AI_MAX_RETRIES,
+                        help=f'Retries with exponential backoff for rate-limited or failed AI requests (default: {DEFAULT_AI_MAX_RETRIES})')
+    parser.add_argument('--ai-breaker-threshold', type=int, default=DEFAULT_AI_BREAKER_THRESHOLD,
+                        help=f'Consecutive AI failures before skipping straight to fallbacks (default: {DEFAULT_AI_BREAKER_THRESHOLD})')
+    parser.add_argument('--deadline', type=float, metavar='SECONDS',
+                        help='Use rule-based fallbacks for AI results that have not arrived within SECONDS')
+    parser.add_argument('--parser', choices=PARSER_BACKENDS, default='html.parser',
+                        help="HTML parser backend: html.parser (default), lxml (if installed) or stream (tree-less tokenizer)")
+    parser.add_argument('--compare-parsers', action='store_true',
+                        help='Check that every available parser backend matches html.parser on the given file, directory or glob')
+    parser.add_argument('--low-memory', action='store_true',
+                        help='Stream input files in chunks with bounded memory, dropping embedded data: URIs and scripts')
+    parser.add_argument('--assets-dir', help='With --low-memory, write embedded base64 images to this directory instead of dropping them')
+    parser.add_argument('--no-cache', action='store_true', help='Bypass the on-disk AI result cache')
+    parser.add_argument('--refresh-cache', action='store_true', help='Ignore cached AI results and overwrite them with fresh ones')
+    parser.add_argument('--cache-dir', default=str(DEFAULT_CACHE_DIR), help=f'Directory of the AI, link check and keyword index caches (default: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--batch', action='store_true', help='Convert a directory, glob or JSON manifest into one multi-row CSV')
+    parser.add_argument('--watch', metavar='DIR',
+                        help='Convert DIR into one CSV and keep reconverting changed articles as exports land')
+    parser.add_argument('--poll', action='store_true', help='With --watch, poll for changes instead of using inotify')
+    parser.add_argument('--debounce', type=float, default=DEFAULT_WATCH_DEBOUNCE,
+                        help=f'With --watch, seconds of quiet before converting a burst of changes (default: {DEFAULT_WATCH_DEBOUNCE})')
+    parser.add_argument('--daemon', action='store_true',
+                        help='Stay running and convert JSON jobs from stdin (one per line) or from --socket')
+    parser.add_argument('--socket', metavar='PATH', help='With --daemon, serve jobs on this Unix domain socket')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='With --batch, reconvert every article instead of reusing unchanged rows from the manifest')
+    parser.add_argument('--backfill', action='store_true',
+                        help='With --batch, also reconvert unchanged articles whose row used rule-based fallbacks')
+    parser.add_argument('--workers', type=int, help='Worker processes for --batch parsing (default: CPU count)')
+    parser.add_argument('--seo-batch-size', type=int, default=DEFAULT_SEO_BATCH_SIZE,
+                        help='With --batch or --watch, articles per SEO request using a strict JSON schema (default: 1, no batching)')
+    parser.add_argument('--ai-concurrency', type=int, default=DEFAULT_AI_CONCURRENCY,
+                        help=f'Maximum concurrent AI requests in --batch mode (default: {DEFAULT_AI_CONCURRENCY})')
+    parser.add_argument('--keyword-index', nargs='?', const=True, metavar='PATH',
+                        help=f'Rank fallback keywords by TF-IDF against a persistent archive index '
+                             f'(default: {DEFAULT_KEYWORD_INDEX_PATH.name} in --cache-dir)')
+    parser.add_argument('--keyword-bigrams', action='store_true', help='With --keyword-index, also consider two-word keywords')
+    parser.add_argument('--upsert', metavar='MASTER_CSV',
+                        help='Replace or append the converted rows in this master CSV, keyed by Slug (created if missing)')
+    parser.add_argument('--on-slug-collision', choices=SLUG_COLLISION_MODES, default='error',
+                        help='With --upsert, when another title generates the same slug: stop, '
+                             'replace it, or use slug-2 (default: error)')
+    parser.add_argument('--check-links', choices=LINK_CHECK_MODES,
+                        help='Check Sources links over HTTP: mark broken ones with a data-link-status attribute, or fail the article')
+    parser.add_argument('--link-cache-ttl', type=float, default=DEFAULT_LINK_CACHE_TTL_HOURS, metavar='HOURS',
+                        help=f'With --check-links, hours to trust a cached link result (default: {DEFAULT_LINK_CACHE_TTL_HOURS})')
+    parser.add_argument('--link-check-concurrency', type=int, default=DEFAULT_LINK_CHECK_CONCURRENCY, metavar='N',
+                        help=f'With --check-links, links checked at once (default: {DEFAULT_LINK_CHECK_CONCURRENCY})')
+    parser.add_argument('--link-check-per-host', type=int, default=DEFAULT_LINK_CHECK_PER_HOST, metavar='N',
+                        help=f'With --check-links, connections per host (default: {DEFAULT_LINK_CHECK_PER_HOST})')
+    parser.add_argument('--metrics-jsonl', metavar='PATH',
+                        help='Append per-stage timings, AI token usage, retries and cache hits to this JSON Lines file '
+                             '(one line per run, or per job/rebuild with --daemon/--watch)')
+    parser.add_argument('--metrics-prom', metavar='PATH',
+                        help='Write the same metrics as a Prometheus textfile (for the node exporter)')
+    parser.add_argument('--taxonomy', metavar='FILE',
+                        help='JSON taxonomy of categories and weighted keywords for fallback categories (default: built-in)')
     parser.add_argument('--slug', help='URL slug (auto-generated from title if not provided)')
     parser.add_argument('--meta-title', help='SEO meta title (AI-generated if not provided)')
     parser.add_argument('--meta-description', help='SEO meta description (AI-generated if not provided)')
@@ -542,8 +183,47 @@ Examples:
     
     args = parser.parse_args()
     
+    # The daemon answers on stdout, so its progress goes to stderr
+    logging.basicConfig(level=logging.INFO, format='%(message)s', stream=sys.stderr if args.daemon else sys.stdout)
+    
+    if args.watch:
+        # Only the default image URL is positional in watch mode
+        if args.html_file and args.image_url:
+            parser.error('--watch takes the directory as its argument; pass only an image_url positionally')
+        args.image_url = args.image_url or args.html_file
+        if not Path(args.watch).is_dir():
+            parser.error(f'--watch needs a directory: {args.watch}')
+    elif not args.html_file and not args.daemon:
+        parser.error('html_file is required unless --watch or --daemon is used')
+    
+    if args.socket and not args.daemon:
+        parser.error('--socket requires --daemon')
+    if args.socket and not hasattr(socketserver, 'UnixStreamServer'):
+        parser.error('--socket needs Unix domain sockets; use stdin JSON lines instead')
+    
+    if args.compare_parsers:
+        html_files = [job['html_file'] for job in load_batch_jobs(args.html_file)]
+        unreadable = []
+        mismatches = compare_parser_backends(html_files, errors=unreadable)
+        for html_file, backend, column in mismatches:
+            print(f"❌ {html_file}: {backend} differs in {column}")
+        for html_file, error in unreadable:
+            print(f"❌ {html_file}: not compared ({error})")
+        print(f"\n📊 Compared {len(html_files) - len(unreadable)} files across {', '.join(available_parser_backends())}: "
+              f"{len(mismatches)} mismatches" + (f", {len(unreadable)} unreadable" if unreadable else ''))
+        exit(1 if mismatches or unreadable else 0)
+    
+    if args.parser not in available_parser_backends():
+        parser.error(f"parser backend '{args.parser}' is not available (pip3 install {args.parser})")
+    
+    if args.assets_dir and not args.low_memory:
+        parser.error('--assets-dir requires --low-memory')
+    
+    if not (args.batch or args.watch or args.daemon) and args.image_url is None:
+        parser.error('image_url is required unless --batch, --watch or --daemon is used')
+    
     # Check if HTML file exists
-    if not Path(args.html_file).exists():
+    if not (args.batch or args.watch or args.daemon) and not Path(args.html_file).exists():
         print(f"Error: HTML file not found: {args.html_file}")
         exit(1)
     
@@ -561,17 +241,156 @@ Examples:
     # Remove None values
     metadata = {k: v for k, v in metadata.items() if v is not None}
     
-    # Convert
-    output_file = convert_html_to_framer_csv(
-        args.html_file,
-        args.image_url,
-        args.output,
-        use_ai=not args.no_ai,
-        **metadata
+    if args.keyword_bigrams and not args.keyword_index:
+        parser.error('--keyword-bigrams requires --keyword-index')
+    
+    if args.no_cache:
+        configure_ai_cache(enabled=False)
+    else:
+        try:
+            configure_ai_cache(cache_dir=args.cache_dir, refresh=args.refresh_cache)
+        except (OSError, sqlite3.Error) as e:
+            print(f"Warning: AI cache unavailable ({e}), continuing without cache")
+            configure_ai_cache(enabled=False)
+    
+    if args.keyword_index:
+        keyword_index = Path(args.cache_dir) / DEFAULT_KEYWORD_INDEX_PATH.name if args.keyword_index is True else args.keyword_index
+        configure_keyword_index(path=keyword_index, bigrams=args.keyword_bigrams)
+    if args.taxonomy:
+        try:
+            configure_category_classifier(args.taxonomy)
+        except (OSError, ValueError) as e:
+            parser.error(f'invalid --taxonomy {args.taxonomy}: {e}')
+    
+    configure_metrics(jsonl_path=args.metrics_jsonl, prometheus_path=args.metrics_prom)
+    
+    if args.check_links:
+        try:
+            configure_link_checker(
+                path=Path(args.cache_dir) / DEFAULT_LINK_CACHE_PATH.name,
+                ttl_hours=args.link_cache_ttl,
+                concurrency=args.link_check_concurrency,
+                per_host=args.link_check_per_host,
+            )
+        except (OSError, sqlite3.Error) as e:
+            parser.error(f'link cache unavailable: {e}')
+    
+    configure_ai_scheduler(
+        rpm=args.ai_rpm,
+        tpm=args.ai_tpm,
+        max_retries=args.ai_max_retries,
+        breaker_threshold=args.ai_breaker_threshold,
     )
     
+    if args.daemon:
+        try:
+            serve_daemon(args.socket)
+        except KeyboardInterrupt:
+            print("\n👋 Daemon stopped", file=sys.stderr)
+        exit(0)
+    
+    if args.watch:
+        try:
+            watch_directory(
+                args.watch,
+                args.output or 'framer_articles.csv',
+                args.image_url,
+                debounce=args.debounce,
+                polling=args.poll,
+                workers=args.workers,
+                use_ai=not args.no_ai,
+                ai_concurrency=args.ai_concurrency,
+                deadline=args.deadline,
+                seo_batch_size=args.seo_batch_size,
+                parser=args.parser,
+                low_memory=args.low_memory,
+                assets_dir=args.assets_dir,
+                check_links=args.check_links,
+                upsert=args.upsert,
+                on_slug_collision=args.on_slug_collision,
+                **metadata
+            )
+        except KeyboardInterrupt:
+            print("\n👋 Stopped watching")
+        exit(0)
+    
+    failures = []
+    if args.batch:
+        jobs = load_batch_jobs(args.html_file, args.image_url)
+        if not jobs:
+            print(f"Error: No HTML files found for: {args.html_file}")
+            exit(1)
+        
+        try:
+            output_file, failures = convert_batch_to_framer_csv(
+                jobs,
+                args.output or 'framer_articles.csv',
+                use_ai=not args.no_ai,
+                workers=args.workers,
+                ai_concurrency=args.ai_concurrency,
+                incremental=not args.rebuild,
+                backfill=args.backfill,
+                deadline=args.deadline,
+                seo_batch_size=args.seo_batch_size,
+                parser=args.parser,
+                low_memory=args.low_memory,
+                assets_dir=args.assets_dir,
+                check_links=args.check_links,
+                upsert=args.upsert,
+                on_slug_collision=args.on_slug_collision,
+                **metadata
+            )
+        except SlugCollisionError as e:
+            print(f"❌ {args.upsert}: {e}")
+            get_metrics().export()
+            exit(1)
+        
+        for html_file, error in failures:
+            print(f"❌ {html_file}: {error}")
+    else:
+        # Convert
+        try:
+            output_file = convert_html_to_framer_csv(
+                args.html_file,
+                args.image_url,
+                args.output,
+                use_ai=not args.no_ai,
+                deadline=args.deadline,
+                parser=args.parser,
+                low_memory=args.low_memory,
+                assets_dir=args.assets_dir,
+                check_links=args.check_links,
+                upsert=args.upsert,
+                on_slug_collision=args.on_slug_collision,
+                **metadata
+            )
+        except BrokenLinksError as e:
+            print(f"❌ {args.html_file}: {e}")
+            get_metrics().export()
+            exit(1)
+        except SlugCollisionError as e:
+            print(f"❌ {args.upsert}: {e}")
+            get_metrics().export()
+            exit(1)
+    
+    cache = get_ai_cache()
+    if cache:
+        print(f"\n🗄️  AI cache: {cache.hits} hits, {cache.misses} misses")
+    
+    peak = peak_memory_mb()
+    if peak is not None:
+        # Only batch runs parse in a process pool; children of other runs aren't workers
+        worker_peak = peak_memory_mb(children=True) if args.batch else None
+        print(f"💾 Peak memory: {peak:.1f} MB (main process)"
+              + (f", {worker_peak:.1f} MB (largest child process)" if worker_peak else ''))
+    
     print(f"\n✅ CSV created successfully: {output_file}")
     print(f"\nYou can now import this CSV into Framer CMS!")
+    
+    get_metrics().export()
+    
+    if failures:
+        exit(1)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Neither reference_script.py nor the framer_csv package is installed
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
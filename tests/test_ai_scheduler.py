@@ -0,0 +1,219 @@
+"""AIScheduler retries, rate limits and circuit breaker, driven by a stub API and a fake endpoint."""
+
+import asyncio
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from framer_csv import ai, parsing, rows, seo
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+
+
+class StubAPIError(Exception):
+    """Shaped like openai.APIStatusError: a status_code and a response with headers."""
+
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers=headers or {})
+
+
+class StubAPI:
+    """Answers requests with the queued outcomes (exceptions are raised), then succeeds."""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        outcome = self.outcomes.pop(0) if self.outcomes else 'ok'
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record every non-zero asyncio.sleep() instead of waiting."""
+    delays = []
+    real_sleep = asyncio.sleep
+
+    async def sleep(delay, *args, **kwargs):
+        if delay:
+            delays.append(delay)
+        await real_sleep(0)
+    monkeypatch.setattr(ai.asyncio, 'sleep', sleep)
+    # Full jitter always picks its upper bound
+    monkeypatch.setattr(ai.random, 'uniform', lambda low, high: high)
+    return delays
+
+
+def test_429_waits_for_retry_after(sleeps):
+    scheduler = ai.AIScheduler(max_retries=3, base_delay=1, max_delay=30)
+    api = StubAPI(StubAPIError(429, {'retry-after': '7'}))
+
+    assert asyncio.run(scheduler.call_async(api)) == 'ok'
+    assert api.calls == 2
+    assert sleeps == [7]
+
+
+def test_retry_after_is_capped_at_max_delay(sleeps):
+    scheduler = ai.AIScheduler(max_retries=3, base_delay=1, max_delay=5)
+
+    asyncio.run(scheduler.call_async(StubAPI(StubAPIError(429, {'retry-after': '120'}))))
+
+    assert sleeps == [5]
+
+
+def test_5xx_is_retried_with_exponential_backoff(sleeps):
+    scheduler = ai.AIScheduler(max_retries=3, base_delay=0.5, max_delay=30)
+    api = StubAPI(StubAPIError(500), StubAPIError(502), StubAPIError(503))
+
+    assert asyncio.run(scheduler.call_async(api)) == 'ok'
+    assert api.calls == 4
+    assert sleeps == [0.5, 1.0, 2.0]
+    assert scheduler.retries == 3
+
+
+def test_5xx_gives_up_after_max_retries(sleeps):
+    scheduler = ai.AIScheduler(max_retries=2, base_delay=1, max_delay=30)
+    api = StubAPI(*[StubAPIError(503)] * 5)
+
+    with pytest.raises(StubAPIError):
+        asyncio.run(scheduler.call_async(api))
+    assert api.calls == 3
+
+
+@pytest.mark.parametrize('status', [400, 401, 404, 422])
+def test_non_retryable_4xx_fails_fast(sleeps, status):
+    scheduler = ai.AIScheduler(max_retries=5)
+    api = StubAPI(StubAPIError(status))
+
+    with pytest.raises(StubAPIError):
+        asyncio.run(scheduler.call_async(api))
+    assert api.calls == 1
+    assert sleeps == []
+
+
+def test_token_bucket_throttles_to_rpm(sleeps):
+    scheduler = ai.AIScheduler(rpm=60)
+
+    async def burst():
+        for _ in range(63):
+            await scheduler.call_async(StubAPI())
+    asyncio.run(burst())
+
+    # A full bucket lets a minute's worth through, then one request per second
+    assert sleeps == pytest.approx([1, 2, 3], abs=0.1)
+
+
+def test_breaker_opens_then_half_opens_for_one_probe(sleeps):
+    scheduler = ai.AIScheduler(max_retries=0, breaker_threshold=2, breaker_cooldown=0.05)
+    failing = StubAPI(StubAPIError(500), StubAPIError(500))
+
+    for _ in range(2):
+        with pytest.raises(StubAPIError):
+            asyncio.run(scheduler.call_async(failing))
+    rejected = StubAPI()
+    with pytest.raises(ai.AICircuitOpenError):
+        asyncio.run(scheduler.call_async(rejected))
+    assert rejected.calls == 0
+
+    time.sleep(0.06)
+    during_probe = []
+
+    async def probe():
+        # Half-open: while the probe is in flight, other requests are still rejected
+        try:
+            await scheduler.call_async(StubAPI())
+        except ai.AICircuitOpenError as e:
+            during_probe.append(e)
+        return 'probed'
+    assert asyncio.run(scheduler.call_async(probe)) == 'probed'
+    assert len(during_probe) == 1
+
+    # The probe's success closed the circuit
+    assert asyncio.run(scheduler.call_async(StubAPI())) == 'ok'
+    assert scheduler.opened_at is None
+
+
+def test_failed_probe_reopens_the_breaker(sleeps):
+    scheduler = ai.AIScheduler(max_retries=0, breaker_threshold=1, breaker_cooldown=0.05)
+    with pytest.raises(StubAPIError):
+        asyncio.run(scheduler.call_async(StubAPI(StubAPIError(503))))
+
+    time.sleep(0.06)
+    with pytest.raises(StubAPIError):
+        asyncio.run(scheduler.call_async(StubAPI(StubAPIError(503))))
+
+    with pytest.raises(ai.AICircuitOpenError):
+        asyncio.run(scheduler.call_async(StubAPI()))
+
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    """A loadtest.FakeOpenAIServer the AsyncOpenAI client talks to, without the AI cache."""
+    pytest.importorskip('openai')
+    loadtest = pytest.importorskip('loadtest')
+    server = loadtest.FakeOpenAIServer(latency='fixed:0').start()
+    monkeypatch.setenv('OPENAI_BASE_URL', f"{server.url}/v1")
+    monkeypatch.setenv('OPENAI_API_KEY', 'fake-key')
+    monkeypatch.setattr(ai, '_ai_cache', None)
+    monkeypatch.setattr(ai, '_ai_cache_enabled', False)
+    yield server
+    server.stop()
+
+
+def _use_scheduler(monkeypatch, **options):
+    scheduler = ai.AIScheduler(**options)
+    monkeypatch.setattr(ai, '_ai_scheduler', scheduler)
+    return scheduler
+
+
+def _seo_fields():
+    return ai.run_async(seo.generate_seo_fields_with_ai_async('Titel', 'Eerste alinea.', 'Inhoud'))
+
+
+def test_endpoint_429_is_retried_after_its_retry_after(fake_openai, sleeps, monkeypatch):
+    _use_scheduler(monkeypatch, max_retries=3, base_delay=1, max_delay=30)
+    fake_openai.rate_limit_rate = 1.0
+    fake_openai.retry_after = 7
+    real_sleep = ai.asyncio.sleep
+
+    async def recover(delay, *args, **kwargs):
+        # The rate limit is over once the client has backed off
+        if delay:
+            fake_openai.rate_limit_rate = 0.0
+        await real_sleep(delay, *args, **kwargs)
+    monkeypatch.setattr(ai.asyncio, 'sleep', recover)
+
+    fields = _seo_fields()
+
+    assert fields['category'] == seo.SEO_CATEGORIES[0]
+    assert sleeps == [7]
+    assert fake_openai.statuses == {429: 1, 200: 1}
+
+
+def test_endpoint_500s_open_the_breaker_and_fall_back(fake_openai, sleeps, monkeypatch):
+    scheduler = _use_scheduler(monkeypatch, max_retries=2, base_delay=0.5, max_delay=30,
+                               breaker_threshold=2, breaker_cooldown=60)
+    fake_openai.error_rate = 1.0
+
+    assert _seo_fields() is None
+    assert _seo_fields() is None
+    assert fake_openai.statuses == {500: 6}
+    assert sleeps == [0.5, 1.0, 0.5, 1.0]
+    assert scheduler.opened_at is not None
+
+    # With the circuit open the row is built from the rule-based fallbacks, without a request
+    article = parsing.extract_article((FIXTURES / 'gdocs_entities.html').read_text(encoding='utf-8'), parser='stream')
+    fallbacks = []
+    row = rows.build_framer_row(article, '', fallbacks=fallbacks)
+
+    assert fake_openai.statuses == {500: 6}
+    assert set(fallbacks) >= {'Meta Title', 'Meta Description', 'Keywords', 'Preview', 'Category'}
+    assert row['Meta Title'] == article['title']
@@ -0,0 +1,59 @@
+"""Fallback categories from weighted keyword taxonomies."""
+
+import pytest
+
+from framer_csv import fallbacks
+
+
+def test_builtin_taxonomy_matches_inside_dutch_compounds():
+    category = fallbacks.determine_category_fallback(
+        'Kunstmatige-intelligentiestrategie',
+        'De financieringsronde verbetert het investeringsklimaat.',
+    )
+
+    assert category == 'Investeren in Nederlandse AI'
+
+
+def test_builtin_taxonomy_falls_back_to_default():
+    assert fallbacks.determine_category_fallback('Titel', 'Tekst zonder trefwoorden.') == 'Founders & Startups'
+
+
+@pytest.mark.parametrize('match, text, expected', [
+    ('substring', 'de venturekapitaalmarkt', 1),
+    ('prefix', 'de venturekapitaalmarkt', 0),
+    ('prefix', 'kapitaalmarkt', 1),
+    ('word', 'kapitaalmarkt', 0),
+    ('word', 'kapitaal, markt', 1),
+])
+def test_match_modes(match, text, expected):
+    classifier = fallbacks.CategoryClassifier({'categories': {'Geld': {'kapitaal': {'weight': 1, 'match': match}}}})
+
+    assert classifier.scores(text) == {'Geld': expected}
+
+
+def test_keyword_counts_once_per_article_with_its_weight():
+    classifier = fallbacks.CategoryClassifier({'categories': {
+        'Geld': {'kapitaal': 2, 'wet': {'weight': 1, 'match': 'word'}},
+        'Wereld': {'wereld': 1},
+    }})
+
+    scores = classifier.scores('Kapitaal en wetenschap', 'kapitaal kapitaal; de wet, de wereld')
+
+    assert scores == {'Geld': 3, 'Wereld': 1}
+    assert classifier.classify('kapitaal', 'wereld') == 'Geld'
+
+
+def test_builtin_taxonomy_matches_wet_as_whole_word_only():
+    classifier = fallbacks.get_category_classifier()
+
+    assert classifier.scores('Wetenschap in het netwerk')['Investeren in Nederlandse AI'] == 0
+    assert classifier.scores('De nieuwe wet')['Investeren in Nederlandse AI'] == 1
+    assert classifier.scores('Privacywetgeving')['Investeren in Nederlandse AI'] == 1
+
+
+def test_overlapping_keywords_all_count():
+    classifier = fallbacks.CategoryClassifier({'categories': {
+        'Geld': {'venture': 1, 'venturekapitaal': 2, 'kapitaal': 4},
+    }})
+
+    assert classifier.scores('venturekapitaalfonds') == {'Geld': 7}
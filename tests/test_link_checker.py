@@ -0,0 +1,100 @@
+"""Only definite answers make a source link broken; transient ones stay unknown."""
+
+import socket
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip('requests')
+
+from framer_csv import links
+
+STATUSES = {'/ok': 200, '/missing': 404, '/gone': 410, '/busy': 429, '/flaky': 503, '/slow': 200,
+            '/login': 401, '/bot-wall': 403}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    hits = Counter()
+
+    def do_HEAD(self):
+        self.hits[self.path] += 1
+        if self.path == '/slow':
+            time.sleep(1)
+        self.send_response(STATUSES.get(self.path, 404))
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    do_GET = do_HEAD
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    _Handler.hits.clear()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def checker(tmp_path):
+    checker = links.LinkChecker(path=tmp_path / 'links.sqlite3', timeout=0.3)
+    yield checker
+    checker.close()
+
+
+def _article(urls):
+    return {'sources_html': ''.join(f'<p><a href="{url}">{url}</a></p>' for url in urls)}
+
+
+def test_transient_failures_are_unknown_not_broken(server, checker):
+    urls = [f"{server}{path}" for path in STATUSES]
+    article = _article(urls)
+    unknown = []
+
+    broken = links.check_article_links([article], mode='annotate', checker=checker, unknown=unknown)
+
+    assert broken == [{f"{server}/missing": 'HTTP 404', f"{server}/gone": 'HTTP 410'}]
+    assert unknown == [{
+        f"{server}/busy": 'HTTP 429', f"{server}/flaky": 'HTTP 503', f"{server}/slow": 'ReadTimeout',
+        f"{server}/login": 'HTTP 401', f"{server}/bot-wall": 'HTTP 403',
+    }]
+    assert article['sources_html'].count('data-link-status') == 2
+    assert f'<a href="{server}/busy">' in article['sources_html']
+
+
+def test_only_definite_results_are_cached(server, checker):
+    urls = [f"{server}{path}" for path in ('/ok', '/missing', '/flaky')]
+    checker.check(urls)
+
+    unknown = {}
+    results = checker.check(urls, unknown=unknown)
+
+    assert results == {urls[0]: None, urls[1]: 'HTTP 404', urls[2]: None}
+    assert unknown == {urls[2]: 'HTTP 503'}
+    assert _Handler.hits == {'/ok': 1, '/missing': 1, '/flaky': 2}
+
+
+def test_unknown_host_is_definite_but_dns_outage_is_not():
+    requests = pytest.importorskip('requests')
+
+    def wrapped(errno):
+        try:
+            try:
+                raise socket.gaierror(errno, 'lookup failed')
+            except socket.gaierror as e:
+                raise OSError('Failed to establish a new connection') from e
+        except OSError as e:
+            return requests.ConnectionError(e)
+
+    assert links._is_unknown_host(wrapped(socket.EAI_NONAME))
+    assert not links._is_unknown_host(wrapped(socket.EAI_AGAIN))
+    assert not links._is_unknown_host(requests.ConnectTimeout('timed out'))
@@ -0,0 +1,25 @@
+"""JSON Lines metrics hold per-export deltas; Prometheus keeps running totals."""
+
+import json
+
+from framer_csv import metrics
+
+
+def test_jsonl_export_writes_deltas_since_previous_export(tmp_path):
+    jsonl = tmp_path / 'metrics.jsonl'
+    prometheus = tmp_path / 'metrics.prom'
+    run_metrics = metrics.RunMetrics(jsonl_path=jsonl, prometheus_path=prometheus)
+
+    run_metrics.record_span('parse', 0.5)
+    run_metrics.count('ai_requests', 2)
+    run_metrics.export()
+    run_metrics.record_span('parse', 0.25)
+    run_metrics.export()
+
+    first, second = (json.loads(line) for line in jsonl.read_text(encoding='utf-8').splitlines())
+    assert first['stages'] == {'parse': {'count': 1, 'seconds': 0.5, 'max_seconds': 0.5}}
+    assert first['counters'] == {'ai_requests': 2}
+    assert second['stages'] == {'parse': {'count': 1, 'seconds': 0.25, 'max_seconds': 0.25}}
+    assert second['counters'] == {}
+    assert 'framer_csv_stage_seconds_count{stage="parse"} 2' in prometheus.read_text(encoding='utf-8')
+    assert 'framer_csv_ai_requests_total 2' in prometheus.read_text(encoding='utf-8')
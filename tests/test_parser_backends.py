@@ -0,0 +1,126 @@
+"""Every parser backend extracts the same article, also from malformed exports."""
+
+import base64
+import os
+from pathlib import Path
+
+import pytest
+
+BeautifulSoup = pytest.importorskip('bs4').BeautifulSoup
+
+from benchmark import generate_google_docs_html
+from framer_csv import parsing
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+MALFORMED = sorted(FIXTURES.glob('malformed_*.html'))
+
+# Well-formed exports: c9/c26 spans, <br>, lists, tables, entities, Google redirect links
+EXPORTS = {
+    'entities': (FIXTURES / 'gdocs_entities.html').read_text(encoding='utf-8'),
+    **{f'generated_{size}_{seed}': generate_google_docs_html(size, seed)
+       for size, seed in [(4096, 1), (16384, 2), (65536, 3)]},
+}
+BACKENDS = [
+    'html.parser',
+    pytest.param('lxml', marks=pytest.mark.skipif(
+        'lxml' not in parsing.available_parser_backends(), reason='lxml is not installed')),
+    'stream',
+    'low-memory',
+]
+
+
+def _element_to_html_columns(html_content):
+    """First Paragraph, Content and Sources as element_to_html() renders the html.parser tree."""
+    soup = BeautifulSoup(html_content, 'html.parser')
+    class_styles = parsing.ClassStyleIndex(''.join(style.get_text() for style in soup.find_all('style')))
+    first_p_tag = soup.find('h4')
+    content_elements, sources_elements = [], []
+    found_hr = False
+    for element in soup.body.children:
+        if element.name == 'hr':
+            found_hr = True
+        elif found_hr and element.name:
+            sources_elements.append(element)
+        elif element.name and element.name not in ['h1', 'h4']:
+            content_elements.append(element)
+    return {
+        'first_paragraph': first_p_tag.get_text().strip() if first_p_tag else '',
+        'content_html': ''.join(parsing.element_to_html(element, is_content=True, class_styles=class_styles)
+                               for element in content_elements),
+        'sources_html': '<h2>Referenties</h2>' + ''.join(
+            parsing.element_to_html(element, is_content=False, class_styles=class_styles)
+            for element in sources_elements if element.name != 'h2'
+        ),
+    }
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('name', EXPORTS)
+def test_backends_match_element_to_html(name, backend, tmp_path):
+    html_content = EXPORTS[name]
+    if backend == 'low-memory':
+        html_file = tmp_path / f'{name}.html'
+        html_file.write_text(html_content, encoding='utf-8')
+        article = parsing.extract_article_low_memory(html_file)
+    else:
+        article = parsing.extract_article(html_content, parser=backend)
+
+    expected = _element_to_html_columns(html_content)
+    assert {key: article[key] for key in expected} == expected
+
+
+@pytest.mark.parametrize('html_file', MALFORMED, ids=lambda path: path.stem)
+def test_backends_agree_on_malformed_export(html_file):
+    html_content = html_file.read_text(encoding='utf-8')
+    reference = parsing.extract_article(html_content)
+
+    for backend in parsing.available_parser_backends():
+        assert parsing.extract_article(html_content, parser=backend) == reference, backend
+    assert parsing.extract_article_low_memory(html_file) == reference
+
+
+@pytest.mark.parametrize('html_file', MALFORMED, ids=lambda path: path.stem)
+def test_malformed_export_keeps_all_sections(html_file):
+    article = parsing.extract_article(html_file.read_text(encoding='utf-8'))
+
+    assert article['title']
+    assert article['first_paragraph']
+    assert '<h2>Tussenkop</h2>' in article['content_html']
+    assert '<table>' in article['content_html']
+    assert 'Bron een' in article['sources_html']
+    assert 'Bron twee' in article['sources_html']
+
+
+def test_unclosed_paragraph_ends_at_next_block():
+    article = parsing.extract_article((FIXTURES / 'malformed_unclosed_p.html').read_text(encoding='utf-8'))
+
+    assert article['content_html'].startswith('<p>De eerste alinea loopt door tot de volgende.</p><p>De tweede')
+
+
+def test_compare_parser_backends_reports_undecodable_file(tmp_path):
+    latin1 = tmp_path / 'latin1.html'
+    latin1.write_bytes('<html><body><h1>Café</h1></body></html>'.encode('latin-1'))
+    errors = []
+
+    mismatches = parsing.compare_parser_backends([latin1, *MALFORMED], errors=errors)
+
+    assert mismatches == []
+    assert [html_file for html_file, _ in errors] == [latin1]
+    assert errors[0][1].startswith('UnicodeDecodeError')
+
+
+def test_externalized_assets_get_umask_permissions(tmp_path):
+    html_file = tmp_path / 'artikel.html'
+    png = base64.b64encode(b'\x89PNG\r\n\x1a\n' + bytes(64)).decode('ascii')
+    html_file.write_text(f'<html><body><h1>Titel</h1><p><img src="data:image/png;base64,{png}"></p></body></html>',
+                         encoding='utf-8')
+
+    previous = os.umask(0o027)
+    try:
+        parsing.extract_article_low_memory(html_file, assets_dir=tmp_path / 'assets')
+    finally:
+        os.umask(previous)
+
+    assets = list((tmp_path / 'assets').iterdir())
+    assert [asset.suffix for asset in assets] == ['.png']
+    assert assets[0].stat().st_mode & 0o777 == 0o640
@@ -0,0 +1,115 @@
+"""Upserting batch rows into a master CSV."""
+
+import csv
+import os
+
+import pytest
+
+pytest.importorskip('bs4')
+
+from framer_csv import batch, rows, upsert
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'malformed_unclosed_p.html')
+
+
+def _row(title, slug):
+    return {column: '' for column in upsert.FRAMER_COLUMNS} | {'Title': title, 'Slug': slug}
+
+
+def test_new_master_gets_umask_permissions(tmp_path):
+    previous = os.umask(0o027)
+    try:
+        upsert.upsert_framer_csv([_row('Een', 'een')], tmp_path / 'master.csv')
+    finally:
+        os.umask(previous)
+
+    assert (tmp_path / 'master.csv').stat().st_mode & 0o777 == 0o640
+
+
+def _slugs(master):
+    with open(master, newline='', encoding='utf-8') as f:
+        return [(row['Title'], row['Slug']) for row in csv.DictReader(f)]
+
+
+@pytest.mark.parametrize('on_collision', upsert.SLUG_COLLISION_MODES)
+def test_titles_generating_the_same_slug_collide(tmp_path, on_collision):
+    master = tmp_path / 'master.csv'
+    upsert.upsert_framer_csv([_row('AI & ML', 'ai-ml')], master)
+
+    if on_collision == 'error':
+        with pytest.raises(upsert.SlugCollisionError):
+            upsert.upsert_framer_csv([_row('AI/ML', 'ai-ml')], master, on_collision=on_collision)
+        return
+    stats = upsert.upsert_framer_csv([_row('AI/ML', 'ai-ml')], master, on_collision=on_collision)
+
+    assert stats['collisions'][0][:3] == ('ai-ml', 'AI & ML', 'AI/ML')
+    expected = {'replace': [('AI/ML', 'ai-ml')], 'suffix': [('AI & ML', 'ai-ml'), ('AI/ML', 'ai-ml-2')]}
+    assert _slugs(master) == expected[on_collision]
+
+
+@pytest.mark.parametrize('on_collision', upsert.SLUG_COLLISION_MODES)
+def test_edited_title_replaces_its_row(tmp_path, on_collision):
+    master = tmp_path / 'master.csv'
+    upsert.upsert_framer_csv([_row('Groei van AI in 2024', 'groei-van-ai')], master)
+
+    stats = upsert.upsert_framer_csv([_row('Groei van AI', 'groei-van-ai')], master, on_collision=on_collision)
+
+    assert stats['collisions'] == []
+    assert _slugs(master) == [('Groei van AI', 'groei-van-ai')]
+
+
+@pytest.mark.parametrize('on_collision', upsert.SLUG_COLLISION_MODES)
+def test_pinned_slug_replaces_its_row(tmp_path, on_collision):
+    master = tmp_path / 'master.csv'
+    upsert.upsert_framer_csv([_row('AI & ML', 'ai-ml')], master)
+
+    stats = upsert.upsert_framer_csv([_row('AI/ML', 'ai-ml')], master, on_collision=on_collision,
+                                     pinned_slugs={'ai-ml'})
+
+    assert stats['collisions'] == []
+    assert _slugs(master) == [('AI/ML', 'ai-ml')]
+
+
+def test_crash_before_upsert_is_repaired_by_next_run(tmp_path, monkeypatch):
+    html_file = tmp_path / 'artikel.html'
+    html_file.write_text(open(FIXTURE, encoding='utf-8').read(), encoding='utf-8')
+    master = tmp_path / 'master.csv'
+    jobs = [{'html_file': str(html_file), 'image_url': str(tmp_path / 'missing.jpg'), 'metadata': {}}]
+
+    def crash(*args, **kwargs):
+        raise KeyboardInterrupt
+    with monkeypatch.context() as patch:
+        patch.setattr(batch, 'upsert_framer_csv', crash)
+        with pytest.raises(KeyboardInterrupt):
+            batch.convert_batch_to_framer_csv(jobs, tmp_path / 'out.csv', use_ai=False, upsert=master,
+                                              on_slug_collision='suffix')
+    # The converted row is recorded; the next run upserts it from the manifest
+    assert os.path.exists(batch.conversion_manifest_path(tmp_path / 'out.csv'))
+    assert not master.exists()
+
+    for _ in range(2):
+        batch.convert_batch_to_framer_csv(jobs, tmp_path / 'out.csv', use_ai=False, upsert=master,
+                                          on_slug_collision='suffix')
+
+    with open(master, newline='', encoding='utf-8') as f:
+        slugs = [row['Slug'] for row in csv.DictReader(f)]
+    assert len(slugs) == 1
+
+
+def test_interrupted_rewrite_keeps_previous_csv(tmp_path):
+    output = tmp_path / 'out.csv'
+    rows.write_framer_csv([_row('Een', 'een')], output)
+    output.chmod(0o604)
+
+    def interrupted():
+        yield _row('Twee', 'twee')
+        raise KeyboardInterrupt
+    with pytest.raises(KeyboardInterrupt):
+        rows.write_framer_csv(interrupted(), output)
+
+    assert _slugs(output) == [('Een', 'een')]
+    assert os.listdir(tmp_path) == ['out.csv']
+
+    rows.write_framer_csv([_row('Twee', 'twee')], output)
+    assert _slugs(output) == [('Twee', 'twee')]
+    assert output.stat().st_mode & 0o777 == 0o604